@@ -0,0 +1,273 @@
+"""
+✿ 幽幽子的備份封存庫 ✿
+SystemBackups 的增量壓縮格式：定期一份完整基底 (full)，其餘每天只保存與前一份備份的差異 (delta)。
+
+每份備份的內容是一連串 JSON Lines 操作，以 zlib 壓縮後存成 BLOB：
+    {"s": 資料倉, "k": [guild_id], "v": 值}            設定第一層鍵
+    {"s": 資料倉, "k": [guild_id, user_id], "v": 值}   設定第二層鍵
+    {"s": 資料倉, "k": [...], "d": 1}                  刪除
+    {"s": 資料倉, "k": [], "v": 值}                    整個資料倉替換
+還原某個時間點時，從最近的完整基底開始依序套用之後的差異，全程以串流方式解壓與解析。
+舊版 SystemBackups 的整份 JSON TEXT 備份仍可透過 load_legacy_backup 讀取。
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from time import monotonic
+
+logger = logging.getLogger("SakuraBot.backup_archive")
+
+BACKUP_TABLE = "BackupArchive"
+_MISSING = object()
+_CHUNK_SIZE = 64 * 1024
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {BACKUP_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            backup_time TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK (kind IN ('full', 'delta')),
+            parent_id INTEGER,
+            op_count INTEGER NOT NULL,
+            raw_size INTEGER NOT NULL,
+            checksum TEXT NOT NULL,
+            payload BLOB NOT NULL
+        )
+    ''')
+
+
+def full_ops(snapshot: dict):
+    """完整基底：每個資料倉的每個第一層鍵一筆操作"""
+    for store, data in snapshot.items():
+        if not isinstance(data, dict):
+            yield {"s": store, "k": [], "v": data}
+            continue
+        yield {"s": store, "k": [], "v": {}}
+        for key, value in data.items():
+            yield {"s": store, "k": [key], "v": value}
+
+
+def diff_ops(previous: dict, snapshot: dict):
+    """與前一份快照比較，只輸出有變化的項目 (最多比較到第二層鍵)
+
+    快照來自寫時複製的版本，未修改的子樹與前一份是同一個物件，
+    因此大多數項目只需比較 identity，成本與當天的修改量相關。
+    """
+    for store, data in snapshot.items():
+        old = previous.get(store, _MISSING)
+        if old is data:
+            continue
+        if not isinstance(data, dict) or not isinstance(old, dict):
+            yield {"s": store, "k": [], "v": data}
+            continue
+        for key, value in data.items():
+            old_value = old.get(key, _MISSING)
+            if old_value is value:
+                continue
+            if isinstance(value, dict) and isinstance(old_value, dict):
+                for sub_key, sub_value in value.items():
+                    old_sub = old_value.get(sub_key, _MISSING)
+                    if old_sub is not sub_value and old_sub != sub_value:
+                        yield {"s": store, "k": [key, sub_key], "v": sub_value}
+                for sub_key in old_value.keys() - value.keys():
+                    yield {"s": store, "k": [key, sub_key], "d": 1}
+            elif old_value != value:
+                yield {"s": store, "k": [key], "v": value}
+        for key in old.keys() - data.keys():
+            yield {"s": store, "k": [key], "d": 1}
+
+
+def encode_ops(ops) -> tuple:
+    """以串流方式壓縮操作，回傳 (payload, 操作數, 原始大小, sha256)"""
+    compressor = zlib.compressobj(6)
+    digest = hashlib.sha256()
+    chunks, count, raw_size = [], 0, 0
+    for op in ops:
+        line = (json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        digest.update(line)
+        raw_size += len(line)
+        count += 1
+        chunks.append(compressor.compress(line))
+    chunks.append(compressor.flush())
+    return b"".join(chunks), count, raw_size, digest.hexdigest()
+
+
+def write_backup(conn: sqlite3.Connection, snapshot: dict, backup_time: str,
+                 previous: dict = None, parent_id: int = None) -> dict:
+    """寫入一份備份；提供 previous 與 parent_id 時寫入差異，否則寫入完整基底"""
+    ensure_schema(conn)
+    kind = "delta" if previous is not None and parent_id is not None else "full"
+    ops = diff_ops(previous, snapshot) if kind == "delta" else full_ops(snapshot)
+    payload, count, raw_size, checksum = encode_ops(ops)
+    cursor = conn.execute(
+        f"INSERT INTO {BACKUP_TABLE} (backup_time, kind, parent_id, op_count, raw_size, checksum, payload) "
+        f"VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (backup_time, kind, parent_id if kind == "delta" else None, count, raw_size, checksum, payload))
+    return {"id": cursor.lastrowid, "kind": kind, "ops": count, "raw_size": raw_size, "size": len(payload)}
+
+
+def list_backups(conn: sqlite3.Connection) -> list:
+    """列出所有保留中的備份 (由舊到新)"""
+    ensure_schema(conn)
+    rows = conn.execute(
+        f"SELECT id, backup_time, kind, parent_id, op_count, raw_size, length(payload), checksum "
+        f"FROM {BACKUP_TABLE} ORDER BY id").fetchall()
+    keys = ("id", "backup_time", "kind", "parent_id", "ops", "raw_size", "size", "checksum")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def backup_chain(conn: sqlite3.Connection, backup_id: int) -> list:
+    """還原 backup_id 所需的備份 id 列表：完整基底在前，依序接上差異"""
+    chain = []
+    current = backup_id
+    while current is not None:
+        row = conn.execute(f"SELECT kind, parent_id FROM {BACKUP_TABLE} WHERE id = ?", (current,)).fetchone()
+        if row is None:
+            raise LookupError(f"備份 #{current} 不存在，無法還原 #{backup_id}")
+        chain.append(current)
+        kind, parent_id = row
+        current = None if kind == "full" else parent_id
+    chain.reverse()
+    return chain
+
+
+def _read_payload(conn: sqlite3.Connection, backup_id: int):
+    """逐塊讀取 payload (Python 3.11+ 使用 blobopen，不必一次載入整個 BLOB)"""
+    if hasattr(conn, "blobopen"):
+        with conn.blobopen(BACKUP_TABLE, "payload", backup_id, readonly=True) as blob:
+            while True:
+                chunk = blob.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        return
+    row = conn.execute(f"SELECT payload FROM {BACKUP_TABLE} WHERE id = ?", (backup_id,)).fetchone()
+    payload = row[0]
+    for start in range(0, len(payload), _CHUNK_SIZE):
+        yield payload[start:start + _CHUNK_SIZE]
+
+
+def iter_backup_ops(conn: sqlite3.Connection, backup_id: int, verify: bool = True):
+    """串流解壓單一備份的操作；verify 時在讀完後比對 sha256，不符則拋出 ValueError"""
+    expected = conn.execute(f"SELECT checksum FROM {BACKUP_TABLE} WHERE id = ?", (backup_id,)).fetchone()
+    if expected is None:
+        raise LookupError(f"備份 #{backup_id} 不存在")
+    decompressor = zlib.decompressobj()
+    digest = hashlib.sha256()
+    pending = b""
+    for chunk in _read_payload(conn, backup_id):
+        pending += decompressor.decompress(chunk)
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            digest.update(line + b"\n")
+            yield json.loads(line)
+    pending += decompressor.flush()
+    for line in pending.split(b"\n"):
+        if line:
+            digest.update(line + b"\n")
+            yield json.loads(line)
+    if verify and digest.hexdigest() != expected[0]:
+        raise ValueError(f"備份 #{backup_id} 的校驗和不符，資料可能已損毀")
+
+
+def apply_op(state: dict, op: dict):
+    """把一筆操作套用到還原中的狀態"""
+    store, key = op["s"], op["k"]
+    if not key:
+        state[store] = op.get("v")
+        return
+    node = state.setdefault(store, {})
+    for k in key[:-1]:
+        node = node.setdefault(k, {})
+    if "d" in op:
+        node.pop(key[-1], None)
+    else:
+        node[key[-1]] = op["v"]
+
+
+def restore_backup(conn: sqlite3.Connection, backup_id: int, verify: bool = True) -> dict:
+    """重建 backup_id 當時的所有資料倉"""
+    state = {}
+    for chain_id in backup_chain(conn, backup_id):
+        for op in iter_backup_ops(conn, chain_id, verify):
+            apply_op(state, op)
+    return state
+
+
+def prune_backups(conn: sqlite3.Connection, keep: int) -> int:
+    """只保留最近 keep 個還原點；仍被保留的差異所依賴的完整基底不會被刪除"""
+    ids = [row[0] for row in conn.execute(f"SELECT id FROM {BACKUP_TABLE} ORDER BY id DESC LIMIT ?", (keep,))]
+    if not ids:
+        return 0
+    oldest_needed = backup_chain(conn, min(ids))[0]
+    return conn.execute(f"DELETE FROM {BACKUP_TABLE} WHERE id < ?", (oldest_needed,)).rowcount
+
+
+def load_backup(db_path: str, backup_id: int, verify: bool = True) -> tuple:
+    """開啟資料庫並重建 backup_id 的資料倉，回傳 (資料倉, 統計)；統計含各階段耗時"""
+    started = monotonic()
+    with sqlite3.connect(db_path) as conn:
+        ensure_schema(conn)
+        chain = backup_chain(conn, backup_id)
+        sizes = conn.execute(
+            f"SELECT COALESCE(SUM(length(payload)), 0), COALESCE(SUM(raw_size), 0), COALESCE(SUM(op_count), 0) "
+            f"FROM {BACKUP_TABLE} WHERE id IN ({','.join('?' * len(chain))})", chain).fetchone()
+        stores = restore_backup(conn, backup_id, verify)
+    return stores, {
+        "backup_id": backup_id,
+        "chain": chain,
+        "size": sizes[0],
+        "raw_size": sizes[1],
+        "ops": sizes[2],
+        "decode_seconds": monotonic() - started,
+    }
+
+
+def list_legacy_backups(conn: sqlite3.Connection) -> list:
+    """列出舊版 SystemBackups 的整份備份"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'SystemBackups'").fetchone()
+    if not exists:
+        return []
+    rows = conn.execute("SELECT id, created_at, length(snapshot_data) FROM SystemBackups ORDER BY id").fetchall()
+    return [{"id": row[0], "backup_time": row[1], "raw_size": row[2]} for row in rows]
+
+
+def load_legacy_backup(db_path: str, backup_id: int) -> tuple:
+    """讀取舊版 SystemBackups 的備份 (沒有校驗和，只能確認 JSON 可以解析)"""
+    started = monotonic()
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute("SELECT snapshot_data FROM SystemBackups WHERE id = ?", (backup_id,)).fetchone()
+    if row is None:
+        raise LookupError(f"舊版備份 #{backup_id} 不存在")
+    stores = json.loads(row[0])
+    stores.pop("backup_time", None)
+    return stores, {
+        "backup_id": backup_id,
+        "chain": [backup_id],
+        "size": len(row[0]),
+        "raw_size": len(row[0]),
+        "ops": len(stores),
+        "decode_seconds": monotonic() - started,
+    }
+
+
+def write_restore_file(path: str, stores: dict) -> int:
+    """將資料倉寫成資料管理器啟動時會套用的還原檔 (變更日誌格式，整份取代)，回傳寫入的位元組數
+
+    先寫暫存檔並 fsync，再以 os.replace 原子替換，寫到一半中斷也不會留下半套還原。
+    """
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for store, data in stores.items():
+            f.write(json.dumps({"s": store, "k": [], "v": data}, ensure_ascii=False, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
@@ -0,0 +1,97 @@
+"""
+✿ 幽幽子的離線備份工具 ✿
+在 Bot 停機時列出、校驗或還原 SQLite 殿堂中的備份。
+
+    python backup_tool.py list
+    python backup_tool.py verify <備份編號> [--legacy]
+    python backup_tool.py restore <備份編號> [--legacy] [--yes]
+
+restore 會把重建好的資料寫成 data/restore.pending (原子替換)，
+下次啟動時由資料管理器整份套用並寫回 JSON / YAML / SQLite，之後自動刪除。
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from time import monotonic
+
+import backup_archive
+
+DEFAULT_DB_PATH = os.path.join("config", "sakura_bot.db")
+DEFAULT_RESTORE_PATH = os.path.join("data", "restore.pending")
+
+
+def _load(args) -> tuple:
+    loader = backup_archive.load_legacy_backup if args.legacy else backup_archive.load_backup
+    return loader(args.db, args.backup_id)
+
+
+def _print_stats(stats: dict, stores: dict):
+    print(f"還原鏈: {' -> '.join(f'#{i}' for i in stats['chain'])}")
+    print(f"變更 {stats['ops']} 筆，壓縮 {stats['size'] / 1024:.1f} KiB / 原始 {stats['raw_size'] / 1024:.1f} KiB")
+    print(f"解壓與校驗耗時 {stats['decode_seconds']:.2f}s")
+    for store, data in stores.items():
+        print(f"  {store}: {len(data) if isinstance(data, dict) else '-'} 筆")
+
+
+def cmd_list(args) -> int:
+    with sqlite3.connect(args.db) as conn:
+        backups = backup_archive.list_backups(conn)
+        legacy = backup_archive.list_legacy_backups(conn)
+    for b in backups:
+        kind = "full " if b["kind"] == "full" else f"delta (#{b['parent_id']})"
+        print(f"#{b['id']:<5} {b['backup_time'][:19]}  {kind:<14} {b['ops']:>8} 筆  {b['size'] / 1024:>10.1f} KiB  {b['checksum'][:12]}")
+    for b in legacy:
+        print(f"#{b['id']:<5} {b['backup_time']}  legacy         {b['raw_size'] / 1024:>10.1f} KiB")
+    if not backups and not legacy:
+        print("沒有任何備份")
+    return 0
+
+
+def cmd_verify(args) -> int:
+    stores, stats = _load(args)
+    _print_stats(stats, stores)
+    print(f"✅ 備份 #{args.backup_id} 校驗通過")
+    return 0
+
+
+def cmd_restore(args) -> int:
+    stores, stats = _load(args)
+    _print_stats(stats, stores)
+    if not args.yes:
+        answer = input(f"確定要在下次啟動時以備份 #{args.backup_id} 取代所有數據嗎？請先確認 Bot 已停機 [y/N] ")
+        if answer.strip().lower() != "y":
+            print("已取消")
+            return 1
+    started = monotonic()
+    size = backup_archive.write_restore_file(args.restore_path, stores)
+    print(f"♻️ 已寫入 {args.restore_path} ({size / 1024:.1f} KiB，耗時 {monotonic() - started:.2f}s)")
+    print("下次啟動 Bot 時會自動套用並寫回所有資料倉")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="幽幽子的離線備份工具")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite 資料庫路徑")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="列出所有保留中的備份")
+    for name, help_text in (("verify", "解壓並校驗備份"), ("restore", "準備在下次啟動時還原備份")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("backup_id", type=int)
+        p.add_argument("--legacy", action="store_true", help="使用舊版 SystemBackups 整份備份")
+        if name == "restore":
+            p.add_argument("--yes", action="store_true", help="不再詢問確認")
+            p.add_argument("--restore-path", default=DEFAULT_RESTORE_PATH, help="還原檔輸出路徑")
+
+    args = parser.parse_args(argv)
+    handlers = {"list": cmd_list, "verify": cmd_verify, "restore": cmd_restore}
+    try:
+        return handlers[args.command](args)
+    except (LookupError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -93,7 +93,7 @@ class EconomyAdmin(commands.Cog):
 
             # [Debug 修復 #1] 徹底移除全量遞迴轉換，改為只針對「目標用戶」進行單一數值轉換
             # 原版 convert_float_to_decimal 會遍歷整個 balance 字典，當用戶量大時會嚴重阻塞 Event Loop
-            async with data_manager.balance_lock:
+            async with data_manager.locks.hold((guild_id, recipient_id)):
                 # 1. 讀取舊餘額 (float -> Decimal)
                 old_balance_float = data_manager.balance.get(guild_id, {}).get(recipient_id, 0.0)
                 old_balance = Decimal(str(old_balance_float))
@@ -106,6 +106,9 @@ class EconomyAdmin(commands.Cog):
                 if guild_id not in data_manager.balance:
                     data_manager.balance[guild_id] = {}
                 data_manager.balance[guild_id][recipient_id] = float(new_balance)
+                data_manager.mark_dirty("balance", guild_id, recipient_id)
+                data_manager.record_transaction(guild_id, recipient_id, float(new_balance - old_balance), "admin_add",
+                                                operator=str(ctx.author.id))
 
             # [Debug 修復 #2] 使用 save_all_async 確保異步保存
             await data_manager.save_all_async()
@@ -188,7 +191,7 @@ class EconomyAdmin(commands.Cog):
             recipient_id = str(member.id)
 
             # [Debug 修復 #1] 同樣移除全量遞迴轉換，效能 O(1)
-            async with data_manager.balance_lock:
+            async with data_manager.locks.hold((guild_id, recipient_id)):
                 old_balance_float = data_manager.balance.get(guild_id, {}).get(recipient_id, 0.0)
                 old_balance = Decimal(str(old_balance_float))
                 
@@ -197,6 +200,9 @@ class EconomyAdmin(commands.Cog):
                 if guild_id not in data_manager.balance:
                     data_manager.balance[guild_id] = {}
                 data_manager.balance[guild_id][recipient_id] = float(new_balance)
+                data_manager.mark_dirty("balance", guild_id, recipient_id)
+                data_manager.record_transaction(guild_id, recipient_id, float(new_balance - old_balance), "admin_set",
+                                                operator=str(ctx.author.id))
 
             await data_manager.save_all_async()
 
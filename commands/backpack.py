@@ -2,8 +2,6 @@ import discord
 from discord.ext import commands
 from discord.ui import View, Select, Button
 import logging
-import asyncio
-import os
 
 logger = logging.getLogger("SakuraBot.commands.backpack")
 # [Debug 修復] 引入專門的 Commands 錯誤日誌記錄器
@@ -91,9 +89,7 @@ class Backpack(commands.Cog):
         try:
             user_config = data_manager.user_config
             
-            config_path = os.path.join(data_manager.config_dir, "config.json")
-            config_data = await asyncio.to_thread(data_manager._load_json, config_path, {})
-            shop_data = config_data.get("shop_item", [])
+            shop_items_by_name = data_manager.config.current().shop_items_by_name
             
         except Exception as e:
             logger.error(f"載入背包數據失敗: {e}")
@@ -161,7 +157,7 @@ class Backpack(commands.Cog):
                     return
 
                 selected_item_name = self_inner.values[0]
-                item_data = next((item for item in shop_data if item.get("name") == selected_item_name), None)
+                item_data = shop_items_by_name.get(selected_item_name)
 
                 if not item_data:
                     await interaction.response.send_message("哎呀～幽幽子找不到這個東西的秘密呢...", ephemeral=True)
@@ -210,6 +206,7 @@ class Backpack(commands.Cog):
                     user_data["stamina"] = new_stamina
                     actual_recovered = new_stamina - old_stamina
 
+                    data_manager.mark_dirty("user_config", guild_id, user_id)
                     await data_manager.save_all_async()
 
                     result_embed = discord.Embed(
@@ -248,6 +245,7 @@ class Backpack(commands.Cog):
                             user_data["backpack"].pop(i)
                             break
 
+                    data_manager.mark_dirty("user_config", guild_id, user_id)
                     await data_manager.save_all_async()
 
                     success_embed = discord.Embed(
@@ -73,12 +73,15 @@ class BlackjackButtons(discord.ui.View):
     async def on_timeout(self):
         try:
             bet = None
-            async with self.data_manager.balance_lock:
+            async with self.data_manager.locks.hold((self.guild_id, self.user_id)):
                 gd = self.data_manager.blackjack_data.get(self.guild_id,{}).get(self.user_id,{})
                 if gd and gd.get("game_status") == "ongoing":
                     bet = gd["bet"]
                     self.data_manager.balance[self.guild_id][self.user_id] += bet
                     self.data_manager.blackjack_data[self.guild_id][self.user_id]["game_status"] = "ended"
+                    self.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
+                    self.data_manager.mark_dirty("blackjack_data", self.guild_id, self.user_id)
+                    self.data_manager.record_transaction(self.guild_id, self.user_id, bet, "blackjack_refund")
             if bet is not None:
                 await self.data_manager.save_all_async()
                 if self.message:
@@ -102,9 +105,12 @@ class BlackjackButtons(discord.ui.View):
             return False
         m = 3.5 if is_gambler else 2.5
         reward = round(bet * m, 2)
-        async with self.data_manager.balance_lock:
+        async with self.data_manager.locks.hold((self.guild_id, self.user_id)):
             self.data_manager.balance[self.guild_id][self.user_id] += reward
             self.data_manager.blackjack_data[self.guild_id][self.user_id]["game_status"] = "ended"
+            self.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
+            self.data_manager.mark_dirty("blackjack_data", self.guild_id, self.user_id)
+            self.data_manager.record_transaction(self.guild_id, self.user_id, reward, "blackjack_payout")
         await self.data_manager.save_all_async()
         for c in self.children: c.disabled = True
         await interaction.edit_original_response(embed=discord.Embed(
@@ -119,7 +125,7 @@ class BlackjackButtons(discord.ui.View):
     async def hit(self, button, interaction):
         try:
             await interaction.response.defer()
-            async with self.data_manager.balance_lock:
+            async with self.data_manager.locks.hold((self.guild_id, self.user_id)):
                 gd = self.data_manager.blackjack_data[self.guild_id][self.user_id]
                 pc = gd["player_cards"]
                 pc.append(self.game.draw_card())
@@ -127,6 +133,7 @@ class BlackjackButtons(discord.ui.View):
                 gd["player_cards"] = pc
                 bet = gd["bet"]; is_gambler = gd["is_gambler"]
                 if pt > 21: gd["game_status"] = "ended"
+                self.data_manager.mark_dirty("blackjack_data", self.guild_id, self.user_id)
             
             # 鎖釋放後才執行 I/O
             if pt > 21:
@@ -154,7 +161,7 @@ class BlackjackButtons(discord.ui.View):
     async def stand(self, button, interaction):
         try:
             await interaction.response.defer()
-            async with self.data_manager.balance_lock:
+            async with self.data_manager.locks.hold((self.guild_id, self.user_id)):
                 gd = self.data_manager.blackjack_data[self.guild_id][self.user_id]
                 pc = gd["player_cards"]; dc = gd["dealer_cards"]
                 bet = gd["bet"]; ig = gd["is_gambler"]
@@ -162,6 +169,10 @@ class BlackjackButtons(discord.ui.View):
                 self.game.dealer_play()
                 result, reward = self.game.settle_game(pc, dc, bet, ig)
                 self.data_manager.balance[self.guild_id][self.user_id] += reward
+                self.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
+                self.data_manager.mark_dirty("blackjack_data", self.guild_id, self.user_id)
+                if reward:
+                    self.data_manager.record_transaction(self.guild_id, self.user_id, reward, "blackjack_payout")
             
             await self.data_manager.save_all_async()
             for c in self.children: c.disabled = True
@@ -191,7 +202,7 @@ class BlackjackButtons(discord.ui.View):
             player_total = 0
             result = reward = None
             
-            async with self.data_manager.balance_lock:
+            async with self.data_manager.locks.hold((self.guild_id, self.user_id)):
                 gd = self.data_manager.blackjack_data[self.guild_id][self.user_id]
                 if gd["double_down_used"]:
                     error_type = "used"
@@ -207,6 +218,7 @@ class BlackjackButtons(discord.ui.View):
                         gd["bet"] = doubled_bet
                         gd["double_down_used"] = True
                         self.data_manager.balance[self.guild_id][self.user_id] -= bet
+                        self.data_manager.record_transaction(self.guild_id, self.user_id, -bet, "blackjack_bet", double_down=True)
                         
                         pc = gd["player_cards"]
                         dc = gd["dealer_cards"]
@@ -219,6 +231,11 @@ class BlackjackButtons(discord.ui.View):
                             self.game.dealer_play()
                             result, reward = self.game.settle_game(pc, dc, doubled_bet, ig)
                             self.data_manager.balance[self.guild_id][self.user_id] += reward
+                            if reward:
+                                self.data_manager.record_transaction(self.guild_id, self.user_id, reward, "blackjack_payout")
+
+                        self.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
+                        self.data_manager.mark_dirty("blackjack_data", self.guild_id, self.user_id)
 
             # 鎖釋放後，處理錯誤訊息
             if error_type == "used":
@@ -287,7 +304,7 @@ class Blackjack(commands.Cog):
             uid = str(ctx.author.id); gid = str(ctx.guild.id)
 
             reward = None
-            async with dm.balance_lock:
+            async with dm.locks.hold((gid, uid)):
                 if dm.blackjack_data.get(gid,{}).get(uid,{}).get("game_status") == "ongoing":
                     await ctx.respond(embed=discord.Embed(
                         title="🌸 靈魂還在跳舞！🌸",
@@ -306,6 +323,7 @@ class Blackjack(commands.Cog):
                 game = BlackjackGame(); game.shuffle_deck()
                 pc, dc = game.deal_initial_cards()
                 dm.balance.setdefault(gid,{})[uid] = ub - bet
+                dm.record_transaction(gid, uid, -bet, "blackjack_bet")
                 
                 # [Debug 修復 #2] 直接讀取記憶體，消除同步 I/O 阻塞
                 is_gambler = dm.user_config.get(gid, {}).get(uid, {}).get("job") == "賭徒"
@@ -320,6 +338,9 @@ class Blackjack(commands.Cog):
                     reward = round(bet * m, 2)
                     dm.balance[gid][uid] += reward
                     dm.blackjack_data[gid][uid]["game_status"] = "ended"
+                    dm.record_transaction(gid, uid, reward, "blackjack_payout")
+                dm.mark_dirty("balance", gid, uid)
+                dm.mark_dirty("blackjack_data", gid, uid)
 
             await dm.save_all_async()
 
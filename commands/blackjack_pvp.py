@@ -202,7 +202,7 @@ class ChallengeView(discord.ui.View):
         challenger_actual_bet = self.bet_amount * 3 if challenger_job == "賭徒" else self.bet_amount
         opponent_actual_bet = self.bet_amount * 3 if opponent_job == "賭徒" else self.bet_amount
 
-        async with self.cog.data_manager.balance_lock:
+        async with self.cog.data_manager.locks.hold((guild_id, challenger_id), (guild_id, opponent_id)):
             balance = self.cog.data_manager.balance
             if balance.get(guild_id, {}).get(challenger_id, 0.0) < challenger_actual_bet:
                 await interaction.followup.send(
@@ -216,6 +216,10 @@ class ChallengeView(discord.ui.View):
                 return
             balance[guild_id][challenger_id] -= challenger_actual_bet
             balance[guild_id][opponent_id] -= opponent_actual_bet
+            self.cog.data_manager.mark_dirty("balance", guild_id, challenger_id)
+            self.cog.data_manager.mark_dirty("balance", guild_id, opponent_id)
+            self.cog.data_manager.record_transaction(guild_id, challenger_id, -challenger_actual_bet, "pvp_bet", opponent=opponent_id)
+            self.cog.data_manager.record_transaction(guild_id, opponent_id, -opponent_actual_bet, "pvp_bet", opponent=challenger_id)
 
         await self.cog.data_manager.save_all_async()
 
@@ -302,7 +306,7 @@ class LoanConfirmView(discord.ui.View):
             server_vault = self.cog.data_manager.server_vault
             balance = self.cog.data_manager.balance
 
-            async with self.cog.data_manager.balance_lock:
+            async with self.cog.data_manager.locks.hold((guild_id, user_id), (guild_id,)):
                 # 1. 修改國庫
                 if guild_id not in server_vault: server_vault[guild_id] = {"vault": {"total": 0.0}}
                 server_vault[guild_id]["vault"]["total"] -= self.loan_amount
@@ -334,6 +338,12 @@ class LoanConfirmView(discord.ui.View):
                     }
                 personal_bank[guild_id][user_id]["loan"] = loan_data
 
+                self.cog.data_manager.mark_dirty("server_vault", guild_id)
+                self.cog.data_manager.mark_dirty("balance", guild_id, user_id)
+                self.cog.data_manager.mark_dirty("personal_bank", guild_id, user_id)
+                # 與私人銀行的借款同一種交易，以 purpose 區分來源
+                self.cog.data_manager.record_transaction(guild_id, user_id, self.loan_amount, "borrow", purpose="blackjack_pvp")
+
             # [終極優化] 鎖釋放後，呼叫一次 save_all_async，三個經濟檔案會一起被深拷貝並安全寫入！
             await self.cog.data_manager.save_all_async()
 
@@ -428,7 +438,7 @@ class PVPGameView(discord.ui.View):
         p1_job = self.get_player_job(self.game.player1_id)
         p2_job = self.get_player_job(self.game.player2_id)
 
-        async with self.cog.data_manager.balance_lock:
+        async with self.cog.data_manager.locks.hold((self.guild_id, self.game.player1_id), (self.guild_id, self.game.player2_id)):
             balance = self.cog.data_manager.balance
             if winner_id:
                 winner_job = self.get_player_job(winner_id)
@@ -441,10 +451,16 @@ class PVPGameView(discord.ui.View):
                 else:
                     payout = total_pool
                 balance[self.guild_id][winner_id] += payout
+                self.cog.data_manager.mark_dirty("balance", self.guild_id, winner_id)
+                self.cog.data_manager.record_transaction(self.guild_id, winner_id, payout, "pvp_payout", opponent=loser_id)
                 win_amount = payout
             else:
                 balance[self.guild_id][self.game.player1_id] += self.game.actual_bet_p1
                 balance[self.guild_id][self.game.player2_id] += self.game.actual_bet_p2
+                self.cog.data_manager.mark_dirty("balance", self.guild_id, self.game.player1_id)
+                self.cog.data_manager.mark_dirty("balance", self.guild_id, self.game.player2_id)
+                self.cog.data_manager.record_transaction(self.guild_id, self.game.player1_id, self.game.actual_bet_p1, "pvp_refund")
+                self.cog.data_manager.record_transaction(self.guild_id, self.game.player2_id, self.game.actual_bet_p2, "pvp_refund")
                 win_amount = None
 
         await self.cog.data_manager.save_all_async()
@@ -582,8 +598,10 @@ class PVPGameView(discord.ui.View):
         p2_job = self.get_player_job(self.game.player2_id)
         total_pool = self.game.actual_bet_p1 + self.game.actual_bet_p2
 
-        async with self.cog.data_manager.balance_lock:
+        async with self.cog.data_manager.locks.hold((self.guild_id, self.game.player1_id), (self.guild_id, self.game.player2_id)):
             self.cog.data_manager.balance[self.guild_id][winner_id] += total_pool
+            self.cog.data_manager.mark_dirty("balance", self.guild_id, winner_id)
+            self.cog.data_manager.record_transaction(self.guild_id, winner_id, total_pool, "pvp_payout", reason="timeout")
 
         await self.cog.data_manager.save_all_async()
 
@@ -1,8 +1,7 @@
 import discord
 from discord.ext import commands
 import logging
-import asyncio
-import os
+from collections.abc import Mapping
 
 logger = logging.getLogger("SakuraBot.commands.choose_jobs")
 # [Debug 修復] 引入專門的 Commands 錯誤日誌記錄器
@@ -24,13 +23,10 @@ class ChooseJob(commands.Cog):
             user_id = str(ctx.user.id)
             user_config = self.bot.data_manager.user_config
 
-            config_path = os.path.join(self.bot.data_manager.config_dir, "config.json")
-            config_data = await asyncio.to_thread(self.bot.data_manager._load_json, config_path, {})
-            
-            jobs_list = config_data.get("jobs", [])
-            jobs_data = jobs_list[0] if isinstance(jobs_list, list) and jobs_list else jobs_list if isinstance(jobs_list, dict) else {}
+            # 職業表取自共用設定快取 (舊版陣列格式已在快取中攤平)
+            jobs_data = self.bot.data_manager.config.current().jobs
 
-            if not isinstance(jobs_data, dict) or not jobs_data:
+            if not jobs_data:
                 await ctx.respond("職業數據尚未正確配置！", ephemeral=True)
                 return
 
@@ -40,7 +36,7 @@ class ChooseJob(commands.Cog):
             current_sub_job = user_info.get("sub_job")
 
             # 計算 IT 程序員人數 (僅計算正職)
-            it_count = sum(1 for u_info in user_config.get(guild_id, {}).values() if isinstance(u_info, dict) and u_info.get("job") == "IT程序員")
+            it_count = sum(1 for u_info in user_config.get(guild_id, {}).values() if isinstance(u_info, Mapping) and u_info.get("job") == "IT程序員")
 
             options = []
             for job, data in jobs_data.items():
@@ -123,6 +119,7 @@ class ChooseJob(commands.Cog):
                             msg = f"你已選擇 **{chosen_job}** 作為你的正職！"
                             color = discord.Color.green()
 
+                        self.bot.data_manager.mark_dirty("user_config", guild_id, user_id)
                         await self.bot.data_manager.save_all_async()
 
                         embed = discord.Embed(title="🌸 靈魂簽約成功！～", description=msg, color=color)
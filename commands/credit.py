@@ -50,8 +50,8 @@ class Credit(commands.Cog):
         """每 7 天無逾期記錄可自動 +1 信譽。"""
         need_save = False
         
-        # [Debug 修復] 使用 balance_lock 保護記憶體修改
-        async with self.data_manager.balance_lock:
+        # [Debug 修復] 使用帳戶鎖保護記憶體修改
+        async with self.data_manager.locks.hold((guild_id, user_id)):
             record = self.data_manager.credit.setdefault(guild_id, {}).setdefault(user_id, {"score": 10})
             score = record.get("score", 10)
 
@@ -72,6 +72,7 @@ class Credit(commands.Cog):
                 score = min(10, score + 1)
                 record["score"] = score
                 record["last_time_recovery"] = now.isoformat()
+                self.data_manager.mark_dirty("credit", guild_id, user_id)
                 need_save = True
                 logger.info(f"💳 時間恢復: {user_id} 信譽 +1 → {score}")
 
@@ -86,11 +87,12 @@ class Credit(commands.Cog):
     # ──────────────────────────────────────────────────────
     async def recover_on_repay(self, guild_id: str, user_id: str) -> tuple:
         """還清借貸後信譽 +1。回傳 (old_score, new_score)。"""
-        async with self.data_manager.balance_lock:
+        async with self.data_manager.locks.hold((guild_id, user_id)):
             record = self.data_manager.credit.setdefault(guild_id, {}).setdefault(user_id, {"score": 10})
             old = record.get("score", 10)
             new = min(10, old + 1)
             record["score"] = new
+            self.data_manager.mark_dirty("credit", guild_id, user_id)
             logger.info(f"💳 還款恢復: {user_id} 信譽 {old}→{new}")
             
         await self.data_manager.save_all_async()
@@ -103,7 +105,7 @@ class Credit(commands.Cog):
         """非賭徒職業工作成功後信譽 +1（每日限一次）。回傳 (old_score, new_score, recovered: bool)。"""
         need_save = False
         
-        async with self.data_manager.balance_lock:
+        async with self.data_manager.locks.hold((guild_id, user_id)):
             record = self.data_manager.credit.setdefault(guild_id, {}).setdefault(user_id, {"score": 10})
             
             if job in GAMBLER_JOBS:
@@ -125,6 +127,7 @@ class Credit(commands.Cog):
             new = min(10, old + 1)
             record["score"] = new
             record["last_work_recovery"] = now.isoformat()
+            self.data_manager.mark_dirty("credit", guild_id, user_id)
             need_save = True
             logger.info(f"💳 工作恢復: {user_id} 信譽 {old}→{new}")
 
@@ -0,0 +1,100 @@
+import discord
+from discord.ext import commands
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+
+logger = logging.getLogger("SakuraBot.commands.data_stats")
+
+AUTHOR_ID = int(os.getenv("AUTHOR_ID", 0))
+LOCAL_TIMEZONE = timezone(timedelta(hours=8))
+
+
+def _size(num) -> str:
+    if num is None:
+        return "-"
+    for unit in ("B", "KiB", "MiB"):
+        if num < 1024:
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} GiB"
+
+
+class DataStats(commands.Cog):
+    """
+    ✿ 幽幽子的花園盤點 ✿
+    看看每個資料倉有多少筆、吃掉多少記憶體與磁碟，以及最近一次寫入花了多久 (僅限主人)
+    """
+
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+
+    @discord.slash_command(name="data_stats", description="查看資料倉的筆數、記憶體與磁碟用量 (僅限主人)")
+    async def data_stats(self, ctx: discord.ApplicationContext):
+        if ctx.user.id != AUTHOR_ID:
+            await ctx.respond("嘻嘻，花園的帳目只給主人看哦～", ephemeral=True)
+            return
+
+        await ctx.defer(ephemeral=True)
+        dm = self.bot.data_manager
+        try:
+            stats = await dm.data_stats()
+        except Exception as e:
+            logger.error(f"❌ 資料統計失敗: {e}", exc_info=True)
+            await ctx.followup.send(f"❌ 幽幽子數不清了：`{e}`", ephemeral=True)
+            return
+
+        embed = discord.Embed(title="🌸 花園資料盤點", color=discord.Color.from_rgb(255, 182, 193))
+        total_memory = 0
+        # 記憶體用量由大到小排列，一眼看出是誰在吃記憶體
+        ordered = sorted(stats["stores"].items(), key=lambda item: item[1]["memory_bytes"] or 0, reverse=True)
+        for store, info in ordered:
+            if not info["loaded"]:
+                embed.add_field(name=f"💤 {store}", value=f"尚未載入\n磁碟 {_size(info['disk_bytes'])}", inline=True)
+                continue
+            total_memory += info["memory_bytes"] or 0
+            lines = [
+                f"筆數 {info['entries']:,}" + (f" / {info['nested_entries']:,}" if info["nested_entries"] else ""),
+                f"記憶體 ~{_size(info['memory_bytes'])}",
+                f"磁碟 {_size(info['disk_bytes'])}",
+            ]
+            last_save = info["last_save"]
+            if last_save:
+                at = datetime.fromtimestamp(last_save["at"], LOCAL_TIMEZONE).strftime("%m-%d %H:%M:%S")
+                lines.append(f"寫入 {last_save['seconds'] * 1000:.1f} ms ({last_save['mode']}) @ {at}")
+            else:
+                lines.append("本次啟動尚未寫入")
+            saves = stats["io"].get(f"save:{store}")
+            if saves:
+                lines.append(f"寫入 p95 {saves['p95'] * 1000:.1f} ms ({saves['count']} 次)")
+            embed.add_field(name=f"📦 {store}", value="\n".join(lines), inline=True)
+
+        archive = stats["transaction_archive"]
+        database = stats["database"]
+        retention = stats["retention"]
+        embed.add_field(
+            name="🗂️ 其他",
+            value=(
+                f"記憶體合計 ~{_size(total_memory)}\n"
+                f"變更日誌 {_size(stats['mutation_log_bytes'])} · 資料庫 {_size(stats['database_bytes'])}\n"
+                f"交易封存 {archive['segments']} 段 / {archive['records']:,} 筆 / {_size(archive['bytes'])}\n"
+                f"待寫交易 {stats['pending_transactions']} 筆 · 髒資料倉 {', '.join(stats['dirty_stores']) or '無'}\n"
+                f"資料庫寫入 {database['jobs']:,} 件 / {database['batches']:,} 批 (最大 {database['largest_batch']}，"
+                f"排隊 {database['queued']}) · 讀取 {database['reads']:,} 次\n"
+                f"過期訊息清掃 {retention['runs']} 次 / 共刪除 {retention['purged']:,} 條 / 回收空間 {retention['vacuums']} 次"
+            ),
+            inline=False
+        )
+        io_lines = [
+            f"{name:<13} {s['count']:>6} {s['p50'] * 1000:>7.1f} {s['p95'] * 1000:>7.1f} {s['p99'] * 1000:>7.1f} {_size(s['bytes']):>10}"
+            for name, s in stats["io"].items() if ":" not in name
+        ]
+        if io_lines:
+            header = f"{'操作':<11} {'次數':>4} {'p50ms':>7} {'p95ms':>7} {'p99ms':>7} {'位元組':>7}"
+            embed.add_field(name="⏱️ 讀寫耗時", value="```\n" + "\n".join([header] + io_lines) + "\n```", inline=False)
+        await ctx.followup.send(embed=embed, ephemeral=True)
+
+
+def setup(bot: discord.Bot):
+    bot.add_cog(DataStats(bot))
+    logger.info("花園盤點模組已綻放")
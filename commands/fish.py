@@ -159,8 +159,9 @@ class FishingButtons(discord.ui.View):
             }
 
             fishing_data = self.data_manager.fishingbackpack
-            async with self.data_manager.balance_lock:
+            async with self.data_manager.locks.hold((guild_id, user_id)):
                 fishing_data.setdefault(user_id, {}).setdefault(guild_id, {"fishes": []})["fishes"].append(fish_record)
+                self.data_manager.mark_dirty("fishingbackpack", user_id, guild_id)
             
             await self.data_manager.save_all_async()
 
@@ -259,22 +260,20 @@ class Fish(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.rarity_weights_cache = None
+        self.rarity_weights_source = None
 
     def get_fish_data(self) -> Optional[List[dict]]:
-        try:
-            config_path = f"{self.bot.data_manager.config_dir}/config.json"
-            config_data = self.bot.data_manager._load_json(config_path, {})
-            return config_data.get("fish")
-        except Exception as e:
-            logger.error(f"讀取魚資料失敗: {e}")
-            return None
+        # 取自共用設定快取，config.json 被修改時會自動換成新的列表
+        return self.bot.data_manager.config.current().fish or None
 
     def calculate_rarity_weights(self, fish_data: list) -> dict:
-        if self.rarity_weights_cache:
+        # 設定重新載入後魚種列表會是新的物件，權重快取隨之失效
+        if self.rarity_weights_cache and self.rarity_weights_source is fish_data:
             return self.rarity_weights_cache
         actual_rarities = set(fish.get("rarity", "common").lower() for fish in fish_data)
         final_weights = {r: self.DEFAULT_RARITY_WEIGHTS.get(r, 0.5) for r in actual_rarities}
         self.rarity_weights_cache = final_weights
+        self.rarity_weights_source = fish_data
         return final_weights
 
     def generate_fish_data(self, fish_data: list, main_job: str = "無職業", sub_job: str = "無副職") -> dict:
@@ -291,9 +290,13 @@ class Fish(commands.Cog):
             rarity_weights["deify"] = rarity_weights.get("deify", 1.0) * 5.0
             rarity_weights["unknown"] = rarity_weights.get("unknown", 0.5) * 4.0
 
-        rarity_pools = {}
-        for fish in fish_data:
-            rarity_pools.setdefault(fish.get("rarity", "common").lower(), []).append(fish)
+        config = self.bot.data_manager.config.current()
+        if fish_data is config.fish:
+            rarity_pools = config.fish_by_rarity
+        else:
+            rarity_pools = {}
+            for fish in fish_data:
+                rarity_pools.setdefault(fish.get("rarity", "common").lower(), []).append(fish)
 
         rarities = list(rarity_weights.keys())
         weights = [rarity_weights[r] for r in rarities]
@@ -380,7 +383,7 @@ class Fish(commands.Cog):
         commands_error_logger = logging.getLogger("SakuraBot.CommandsError")
         
         try:
-            fish_data = await asyncio.to_thread(self.get_fish_data)
+            fish_data = self.get_fish_data()
             if not fish_data:
                 await ctx.respond(
                     embed=discord.Embed(
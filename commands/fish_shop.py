@@ -359,8 +359,8 @@ class FishShop(commands.Cog):
             if price == 0:
                 return {"success": False, "message": "櫻花漁獲資料錯誤，幽幽子暫時無法售出！"}
 
-            # Step 2: 取 balance_lock，同時修改 balance (加錢) 和 fishingbackpack (移除魚)
-            async with self.data_manager.balance_lock:
+            # Step 2: 取該帳戶的鎖，同時修改 balance (加錢) 和 fishingbackpack (移除魚)
+            async with self.data_manager.locks.hold((guild_id_str, user_id_str)):
                 # 加錢
                 if guild_id_str not in self.data_manager.balance:
                     self.data_manager.balance[guild_id_str] = {}
@@ -371,6 +371,10 @@ class FishShop(commands.Cog):
                 # 移除魚
                 user_fishes.pop(fish_index)
 
+                self.data_manager.mark_dirty("balance", guild_id_str, user_id_str)
+                self.data_manager.mark_dirty("fishingbackpack", user_id_str, guild_id_str)
+                self.data_manager.record_transaction(guild_id_str, user_id_str, price, "fish_sale", item=fish.get("name"))
+
             # Step 3: 鎖釋放後，統一呼叫 save_all_async 保存所有數據 (包含 balance 和 fishingbackpack)
             await self.data_manager.save_all_async()
 
@@ -130,7 +130,7 @@ class QuizButton(discord.ui.Button):
                 guild_id = str(self.quiz_view.ctx.guild.id)
                 user_id = str(interaction.user.id)
 
-                async with data_manager.balance_lock:
+                async with data_manager.locks.hold((guild_id, user_id)):
                     if guild_id not in data_manager.balance:
                         data_manager.balance[guild_id] = {}
                     if user_id not in data_manager.balance[guild_id]:
@@ -139,6 +139,8 @@ class QuizButton(discord.ui.Button):
                     old_balance = data_manager.balance[guild_id][user_id]
                     data_manager.balance[guild_id][user_id] += final_reward
                     new_balance = data_manager.balance[guild_id][user_id]
+                    data_manager.mark_dirty("balance", guild_id, user_id)
+                    data_manager.record_transaction(guild_id, user_id, final_reward, "quiz_reward")
 
                 await data_manager.save_all_async()
 
@@ -0,0 +1,49 @@
+import discord
+from discord.ext import commands
+import logging
+import os
+
+logger = logging.getLogger("SakuraBot.commands.reload_easter_eggs")
+
+AUTHOR_ID = int(os.getenv("AUTHOR_ID", 0))
+
+
+class ReloadEasterEggs(commands.Cog):
+    """
+    ✿ 幽幽子的彩蛋換季 ✿
+    不必重啟就讓 config/on_message.json 的修改生效 (僅限主人)
+    """
+
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+
+    @discord.slash_command(name="reload_easter_eggs", description="重新載入訊息彩蛋設定 (僅限主人)")
+    async def reload_easter_eggs(self, ctx: discord.ApplicationContext):
+        if ctx.user.id != AUTHOR_ID:
+            await ctx.respond("嘻嘻，彩蛋要藏在哪裡只有主人能決定哦～", ephemeral=True)
+            return
+
+        on_message = self.bot.get_cog("OnMessage")
+        if on_message is None:
+            await ctx.respond("❌ 訊息處理模組尚未載入呢～", ephemeral=True)
+            return
+
+        await ctx.defer(ephemeral=True)
+        try:
+            result = await on_message.reload_easter_eggs(force=True)
+        except ValueError as e:
+            await ctx.followup.send(f"⚠️ 設定檔有問題，幽幽子繼續使用舊的彩蛋：\n```\n{str(e)[:1800]}\n```", ephemeral=True)
+            return
+        except Exception as e:
+            logger.error(f"❌ 重新載入彩蛋設定失敗: {e}", exc_info=True)
+            await ctx.followup.send(f"❌ 幽幽子手滑了：`{e}`", ephemeral=True)
+            return
+        await ctx.followup.send(
+            f"🌸 彩蛋已換季：{result['triggers']} 個觸發詞，耗時 {result['seconds'] * 1000:.1f} ms",
+            ephemeral=True
+        )
+
+
+def setup(bot: discord.Bot):
+    bot.add_cog(ReloadEasterEggs(bot))
+    logger.info("彩蛋換季模組已綻放")
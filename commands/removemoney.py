@@ -89,7 +89,7 @@ class RemoveMoney(commands.Cog):
             recipient_id = str(member.id)
 
             # 鎖內只做記憶體操作
-            async with self.data_manager.balance_lock:
+            async with self.data_manager.locks.hold((guild_id, recipient_id)):
                 if guild_id not in self.data_manager.balance:
                     self.data_manager.balance[guild_id] = {}
                 if recipient_id not in self.data_manager.balance[guild_id]:
@@ -98,6 +98,9 @@ class RemoveMoney(commands.Cog):
                 current_balance = Decimal(str(self.data_manager.balance[guild_id][recipient_id]))
                 new_balance = max(current_balance - amount_decimal, Decimal("0.00"))
                 self.data_manager.balance[guild_id][recipient_id] = float(new_balance)
+                self.data_manager.mark_dirty("balance", guild_id, recipient_id)
+                self.data_manager.record_transaction(guild_id, recipient_id, float(new_balance - current_balance), "admin_remove",
+                                                     operator=str(ctx.author.id))
 
             # 鎖釋放後再保存
             await self.data_manager.save_all_async()
@@ -156,6 +156,7 @@ class ConfirmResetView(discord.ui.View):
             # 修改記憶體
             user_config[self.guild_id][self.user_id]["job"] = None
             user_config[self.guild_id][self.user_id]["work_cooldown"] = None
+            self.parent_cog.data_manager.mark_dirty("user_config", self.guild_id, self.user_id)
 
             # [Debug 修復 #2] 鎖釋放後，統一呼叫 save_all_async 保存
             await self.parent_cog.data_manager.save_all_async()
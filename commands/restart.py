@@ -93,8 +93,8 @@ class RestartCog(commands.Cog):
                 discord.Color.orange()
             )
 
-            # 2. 保存所有數據
-            await self.bot.data_manager.save_all_async()
+            # 2. 立即寫入所有尚未落盤的數據
+            await self.bot.data_manager.flush()
             logger.info("所有冥界記憶已封存完畢")
 
             await asyncio.sleep(2)
@@ -105,6 +105,8 @@ class RestartCog(commands.Cog):
             await self.bot.close()
             
             logger.info("幽幽子即將重生，靈魂歸於寂靜後再度甦醒")
+            # 進程替換不會經過 main.py 的收尾，先關閉交易封存分段的 mmap
+            self.bot.data_manager.txn_archive.close()
             
             # 4. 執行進程替換 (重啟)
             # 注意：os.execv 在 Linux/Docker 下表現完美。
@@ -0,0 +1,157 @@
+import discord
+from discord.ext import commands
+import logging
+import asyncio
+import os
+import sqlite3
+from time import monotonic
+
+import backup_archive
+
+logger = logging.getLogger("SakuraBot.commands.restore_backup")
+
+AUTHOR_ID = int(os.getenv("AUTHOR_ID", 0))
+
+
+class ConfirmRestoreView(discord.ui.View):
+    """還原前的最後確認：只有主人可以按下"""
+
+    def __init__(self, cog, backup_id: int, legacy: bool):
+        super().__init__(timeout=60)
+        self.cog = cog
+        self.backup_id = backup_id
+        self.legacy = legacy
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == AUTHOR_ID
+
+    @discord.ui.button(label="確認還原", style=discord.ButtonStyle.danger, emoji="♻️")
+    async def confirm(self, button, interaction):
+        for item in self.children:
+            item.disabled = True
+        await interaction.response.edit_message(view=self)
+        self.stop()
+        await self.cog.run_restore(interaction, self.backup_id, self.legacy)
+
+    @discord.ui.button(label="取消", style=discord.ButtonStyle.secondary, emoji="🌸")
+    async def cancel(self, button, interaction):
+        for item in self.children:
+            item.disabled = True
+        await interaction.response.edit_message(content="幽幽子把備份收回去了～", embed=None, view=self)
+        self.stop()
+
+
+class RestoreBackup(commands.Cog):
+    """
+    ✿ 幽幽子的記憶回溯 ✿
+    從 SQLite 殿堂中取出指定的備份，校驗後整份換回花園 (僅限主人)
+    """
+
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+        self._restoring = False
+
+    @discord.slash_command(name="restore_backup", description="從備份還原所有數據 (僅限主人)")
+    async def restore_backup(
+        self,
+        ctx: discord.ApplicationContext,
+        backup_id: int = discord.Option(
+            discord.SlashCommandOptionType.integer,
+            description="要還原的備份編號 (留空則列出所有備份)",
+            required=False,
+            default=None
+        ),
+        legacy: bool = discord.Option(
+            bool,
+            description="從舊版 SystemBackups 整份備份還原",
+            required=False,
+            default=False
+        ),
+    ):
+        if ctx.user.id != AUTHOR_ID:
+            await ctx.respond("嘻嘻，只有主人才能讓時光倒流哦～", ephemeral=True)
+            logger.warning(f"⚠️ {ctx.user.name} (ID:{ctx.user.id}) 嘗試使用 restore_backup 但權限不足")
+            return
+
+        dm = self.bot.data_manager
+        if backup_id is None:
+            await ctx.respond(embed=await asyncio.to_thread(self._list_embed, dm.db_path), ephemeral=True)
+            return
+
+        embed = discord.Embed(
+            title="⚠️ 確認還原備份",
+            description=(
+                f"即將以{'舊版' if legacy else ''}備份 **#{backup_id}** 取代目前所有數據。\n"
+                "還原期間修改類指令會暫停，備份之後的所有變更都會消失！"
+            ),
+            color=discord.Color.orange()
+        )
+        await ctx.respond(embed=embed, view=ConfirmRestoreView(self, backup_id, legacy), ephemeral=True)
+
+    @staticmethod
+    def _list_embed(db_path: str) -> discord.Embed:
+        with sqlite3.connect(db_path) as conn:
+            backups = backup_archive.list_backups(conn)
+            legacy = backup_archive.list_legacy_backups(conn)
+        lines = [
+            f"`#{b['id']}` {b['backup_time'][:19]} {'完整' if b['kind'] == 'full' else '差異'} "
+            f"{b['ops']} 筆 · {b['size'] / 1024:.1f} KiB"
+            for b in backups
+        ] or ["(沒有任何備份)"]
+        embed = discord.Embed(title="🌸 保留中的備份", description="\n".join(lines), color=discord.Color.from_rgb(255, 182, 193))
+        if legacy:
+            embed.add_field(
+                name="舊版整份備份 (legacy=True)",
+                value="\n".join(f"`#{b['id']}` {b['backup_time']} · {b['raw_size'] / 1024:.1f} KiB" for b in legacy),
+                inline=False
+            )
+        return embed
+
+    async def run_restore(self, interaction: discord.Interaction, backup_id: int, legacy: bool):
+        if self._restoring:
+            await interaction.followup.send("幽幽子正在還原另一份備份，請稍候～", ephemeral=True)
+            return
+
+        dm = self.bot.data_manager
+        self._restoring = True
+        dm.is_backing_up = True
+        logger.info(f"♻️ 開始還原備份 #{backup_id} (legacy={legacy})，修改類指令已暫停")
+        try:
+            # 1. 串流解壓並校驗 (背景執行緒)
+            if legacy:
+                stores, stats = await asyncio.to_thread(backup_archive.load_legacy_backup, dm.db_path, backup_id)
+            else:
+                stores, stats = await asyncio.to_thread(backup_archive.load_backup, dm.db_path, backup_id)
+
+            # 2. 原子替換記憶體中的資料倉並完整寫回
+            started = monotonic()
+            failed = await dm.replace_all(stores)
+            swap_seconds = monotonic() - started
+
+            embed = discord.Embed(
+                title="✅ 備份還原完成" if not failed else "⚠️ 備份已還原，但部分寫入失敗",
+                description=(
+                    f"備份 **#{backup_id}** (還原鏈 {' → '.join(f'#{i}' for i in stats['chain'])})\n"
+                    f"變更 {stats['ops']} 筆，壓縮 {stats['size'] / 1024:.1f} KiB / 原始 {stats['raw_size'] / 1024:.1f} KiB\n"
+                    f"解壓與校驗 {stats['decode_seconds']:.2f}s，替換與寫回 {swap_seconds:.2f}s"
+                    + (f"\n寫入失敗的資料倉 (稍後重試): {', '.join(failed)}" if failed else "")
+                ),
+                color=discord.Color.green() if not failed else discord.Color.orange()
+            )
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            logger.info(f"✅ 備份 #{backup_id} 還原完成 (解壓 {stats['decode_seconds']:.2f}s，替換 {swap_seconds:.2f}s)")
+        except (LookupError, ValueError) as e:
+            await interaction.followup.send(f"❌ 無法還原：{e}", ephemeral=True)
+            logger.error(f"❌ 備份 #{backup_id} 還原失敗: {e}")
+        except Exception as e:
+            await interaction.followup.send(f"❌ 還原過程發生錯誤：`{e}`", ephemeral=True)
+            logger.error(f"❌ 備份 #{backup_id} 還原失敗: {e}", exc_info=True)
+        finally:
+            dm.is_backing_up = False
+            self._restoring = False
+            logger.info("🔓 還原程序結束，指令恢復正常。")
+
+
+def setup(bot: discord.Bot):
+    bot.add_cog(RestoreBackup(bot))
+    logger.info("記憶回溯模組已綻放")
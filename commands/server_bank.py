@@ -1,4 +1,3 @@
-import os
 import logging
 import asyncio
 from datetime import datetime, timedelta
@@ -83,9 +82,10 @@ class ServerBank(commands.Cog):
                         if penalty_cycles > last_penalty_cycle:
                             updates_to_apply.append(("penalty", guild_id, user_id, loan, penalty_cycles, last_penalty_cycle, days_overdue, guild))
 
-            # 一次性獲取鎖，批量修改記憶體
+            # 一次性獲取所有相關帳戶與伺服器的鎖，批量修改記憶體 (信譽歸零會寫入伺服器黑名單)
             if updates_to_apply:
-                async with self.data_manager.balance_lock:
+                lock_keys = {(u[1], u[2]) for u in updates_to_apply} | {(u[1],) for u in updates_to_apply}
+                async with self.data_manager.locks.hold(*lock_keys):
                     balance = self.data_manager.balance
                     for update in updates_to_apply:
                         if update[0] == "force_repay":
@@ -112,6 +112,7 @@ class ServerBank(commands.Cog):
             if current_cycle == 1: loan["amount"] *= 2
             else: loan["amount"] *= 4
         loan["last_penalty_cycle"] = penalty_cycles
+        self.data_manager.mark_dirty("personal_bank", guild_id, user_id)
 
     async def _force_repay_in_lock(self, guild_id, user_id, loan, days_overdue, guild):
         """在鎖內執行強制還款"""
@@ -134,6 +135,9 @@ class ServerBank(commands.Cog):
             personal_bank[guild_id][user_id]["balance"] -= deducted_bank
         
         personal_bank[guild_id][user_id]["loan"] = None
+        self.data_manager.mark_dirty("balance", guild_id, user_id)
+        self.data_manager.mark_dirty("personal_bank", guild_id, user_id)
+        self.data_manager.record_transaction(guild_id, user_id, deducted_hand + deducted_bank, "repay", forced=True)
         
         # 調整信譽
         self.adjust_credit(guild_id, user_id, -1, "逾期30天強制還款")
@@ -176,17 +180,8 @@ class ServerBank(commands.Cog):
         else: return f"{num:.2f}"
 
     async def log_transaction(self, guild_id: str, user_id: str, amount: float, transaction_type: str):
-        """記錄交易 (使用 to_thread 因為 transactions.json 未納入 DataManager)"""
-        path = os.path.join(self.data_manager.economy_dir, "transactions.json")
-        try:
-            transactions = await asyncio.to_thread(self.data_manager._load_json, path, {})
-            transactions.setdefault(guild_id, []).append({
-                "user_id": user_id, "amount": float(amount),
-                "type": transaction_type, "timestamp": datetime.now(self.tz).isoformat()
-            })
-            await asyncio.to_thread(self.data_manager._save_json, path, transactions)
-        except Exception as e:
-            logger.error(f"❌ 交易記錄失敗: {e}")
+        """記錄交易 (追加到資料管理器的共用交易日誌)"""
+        self.data_manager.record_transaction(guild_id, user_id, amount, transaction_type)
 
     def is_blacklisted(self, guild_id: str, user_id: str) -> bool:
         return user_id in self.data_manager.server_vault.get(guild_id, {}).get("blacklist", [])
@@ -196,11 +191,14 @@ class ServerBank(commands.Cog):
         sv.setdefault(guild_id, {}).setdefault("blacklist", [])
         if user_id not in sv[guild_id]["blacklist"]:
             sv[guild_id]["blacklist"].append(user_id)
+            self.data_manager.mark_dirty("server_vault", guild_id)
 
     def remove_from_blacklist(self, guild_id: str, user_id: str):
         sv = self.data_manager.server_vault
         bl = sv.get(guild_id, {}).get("blacklist", [])
-        if user_id in bl: bl.remove(user_id)
+        if user_id in bl:
+            bl.remove(user_id)
+            self.data_manager.mark_dirty("server_vault", guild_id)
 
     def get_credit(self, guild_id: str, user_id: str) -> int:
         return self.data_manager.credit.get(guild_id, {}).get(user_id, {}).get("score", 10)
@@ -211,6 +209,7 @@ class ServerBank(commands.Cog):
         old = credit_data[guild_id][user_id].get("score", 10)
         new = max(0, min(10, old + delta))
         credit_data[guild_id][user_id]["score"] = new
+        self.data_manager.mark_dirty("credit", guild_id, user_id)
         if new <= 0: self.add_to_blacklist(guild_id, user_id)
         elif old <= 0 and new > 0: self.remove_from_blacklist(guild_id, user_id)
         return old, new
@@ -223,6 +222,7 @@ class ServerBank(commands.Cog):
         
         # 初始化國庫 (若需要)
         if self.initialize_server_vault(guild_id, owner_id):
+            self.data_manager.mark_dirty("server_vault", guild_id)
             await self.data_manager.save_all_async()
 
         balance = self.data_manager.balance
@@ -346,7 +346,7 @@ class BankButtonsView(View):
 
         amount_with_interest = round(loan["amount"] * (1 + loan["interest_rate"]), 2)
 
-        async with self.cog.data_manager.balance_lock:
+        async with self.cog.data_manager.locks.hold((self.guild_id, self.user_id), (self.guild_id,)):
             balance = self.cog.data_manager.balance
             user_balance = balance.get(self.guild_id, {}).get(self.user_id, 0.0)
             if user_balance < amount_with_interest:
@@ -357,6 +357,9 @@ class BankButtonsView(View):
             personal_bank[self.guild_id][self.user_id]["loan"] = None
             if self.guild_id in server_vault and "vault" in server_vault[self.guild_id]:
                 server_vault[self.guild_id]["vault"]["total"] += loan["amount"]
+                self.cog.data_manager.mark_dirty("server_vault", self.guild_id)
+            self.cog.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
+            self.cog.data_manager.mark_dirty("personal_bank", self.guild_id, self.user_id)
 
         await self.cog.data_manager.save_all_async()
         await self.cog.log_transaction(self.guild_id, self.user_id, amount_with_interest, "repay")
@@ -394,7 +397,7 @@ class DepositModal(Modal):
             await interaction.followup.send("金額格式錯誤!", ephemeral=True)
             return
 
-        async with self.cog.data_manager.balance_lock:
+        async with self.cog.data_manager.locks.hold((self.guild_id, self.user_id)):
             balance = self.cog.data_manager.balance
             personal_bank = self.cog.data_manager.personal_bank
             user_balance = balance.get(self.guild_id, {}).get(self.user_id, 0.0)
@@ -405,6 +408,8 @@ class DepositModal(Modal):
 
             balance[self.guild_id][self.user_id] -= amount
             personal_bank.setdefault(self.guild_id, {}).setdefault(self.user_id, {"balance": 0.0, "loan": None})["balance"] += amount
+            self.cog.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
+            self.cog.data_manager.mark_dirty("personal_bank", self.guild_id, self.user_id)
 
         await self.cog.data_manager.save_all_async()
         await self.cog.log_transaction(self.guild_id, self.user_id, amount, "deposit")
@@ -430,7 +435,7 @@ class WithdrawModal(Modal):
             await interaction.followup.send("金額格式錯誤!", ephemeral=True)
             return
 
-        async with self.cog.data_manager.balance_lock:
+        async with self.cog.data_manager.locks.hold((self.guild_id, self.user_id)):
             balance = self.cog.data_manager.balance
             personal_bank = self.cog.data_manager.personal_bank
             bank_balance = personal_bank.get(self.guild_id, {}).get(self.user_id, {}).get("balance", 0.0)
@@ -442,6 +447,8 @@ class WithdrawModal(Modal):
             personal_bank[self.guild_id][self.user_id]["balance"] -= amount
             balance.setdefault(self.guild_id, {}).setdefault(self.user_id, 0.0)
             balance[self.guild_id][self.user_id] += amount
+            self.cog.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
+            self.cog.data_manager.mark_dirty("personal_bank", self.guild_id, self.user_id)
 
         await self.cog.data_manager.save_all_async()
         await self.cog.log_transaction(self.guild_id, self.user_id, amount, "withdraw")
@@ -485,7 +492,7 @@ class BorrowModal(Modal):
         interest_rate = calculate_interest_rate(amount)
         credit_penalty_applied = False
 
-        async with self.cog.data_manager.balance_lock:
+        async with self.cog.data_manager.locks.hold((self.guild_id, self.user_id), (self.guild_id,)):
             balance = self.cog.data_manager.balance
             personal_bank = self.cog.data_manager.personal_bank
             
@@ -520,6 +527,10 @@ class BorrowModal(Modal):
                 }
             personal_bank[self.guild_id][self.user_id]["loan"] = loan_data
 
+            self.cog.data_manager.mark_dirty("server_vault", self.guild_id)
+            self.cog.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
+            self.cog.data_manager.mark_dirty("personal_bank", self.guild_id, self.user_id)
+
         await self.cog.data_manager.save_all_async()
         await self.cog.log_transaction(self.guild_id, self.user_id, amount, "borrow")
         await self.view.update_main_embed(interaction)
@@ -1,13 +1,9 @@
 import discord
 from discord.ext import commands
 from discord.ui import View, Button, Modal, InputText
-import asyncio
 import math
 import logging
-import os
-from datetime import datetime
 from decimal import Decimal
-from zoneinfo import ZoneInfo
 
 logger = logging.getLogger("SakuraBot.Shop")
 
@@ -36,12 +32,8 @@ class Shop(commands.Cog):
             return
 
         try:
-            # [Debug 修復 #2] 使用 to_thread 包裝同步 I/O，避免阻塞 Event Loop
-            config_path = os.path.join(self.data_manager.config_dir, "config.json")
-            config = await asyncio.to_thread(
-                self.data_manager._load_json, config_path, {}
-            )
-            shop_items = config.get("shop_item", [])
+            # 商品列表取自共用設定快取，不再每次讀檔
+            shop_items = self.data_manager.config.current().shop_items
 
             if not shop_items:
                 embed = discord.Embed(
@@ -197,7 +189,7 @@ class BuyModal(Modal):
             guild_id, user_id = str(self.ctx.guild.id), str(self.ctx.author.id)
 
             # 鎖內純記憶體讀取
-            async with self.data_manager.balance_lock:
+            async with self.data_manager.locks.hold((guild_id, user_id)):
                 balance = self.data_manager.balance
                 balance.setdefault(guild_id, {}).setdefault(user_id, 0.0)
                 user_balance = balance[guild_id][user_id]
@@ -253,7 +245,7 @@ class ConfirmBuyView(View):
         await interaction.response.defer()
 
         # 鎖內純記憶體操作
-        async with self.data_manager.balance_lock:
+        async with self.data_manager.locks.hold((self.guild_id, self.user_id)):
             balance = self.data_manager.balance
             balance.setdefault(self.guild_id, {}).setdefault(self.user_id, 0.0)
             user_balance = balance[self.guild_id][self.user_id]
@@ -264,12 +256,13 @@ class ConfirmBuyView(View):
 
             balance[self.guild_id][self.user_id] -= self.total_price
             new_balance = balance[self.guild_id][self.user_id]
+            self.data_manager.mark_dirty("balance", self.guild_id, self.user_id)
 
         # 鎖外保存
         await self.data_manager.save_all_async()
 
         # 非同步記錄交易
-        await self._record_transaction()
+        self._record_transaction()
 
         success_embed = discord.Embed(
             title="🎉 購買成功!",
@@ -285,19 +278,12 @@ class ConfirmBuyView(View):
         for item in self.children: item.disabled = True
         logger.info(f"💰 {interaction.user.name} 購買了 {self.quantity} 個 {self.item.get('name')}")
 
-    async def _record_transaction(self):
-        """非同步記錄交易"""
-        path = os.path.join(self.data_manager.economy_dir, "transactions.json")
-        try:
-            transactions = await asyncio.to_thread(self.data_manager._load_json, path, {})
-            transactions.setdefault(self.guild_id, []).append({
-                "user_id": self.user_id, "amount": -self.total_price,
-                "type": "shop_purchase", "item": self.item.get("name"),
-                "quantity": self.quantity, "timestamp": datetime.now(ZoneInfo("Asia/Taipei")).isoformat()
-            })
-            await asyncio.to_thread(self.data_manager._save_json, path, transactions)
-        except Exception as e:
-            logger.error(f"❌ 交易記錄失敗: {e}")
+    def _record_transaction(self):
+        """記錄交易 (追加到共用的交易日誌，不再重寫整個檔案)"""
+        self.data_manager.record_transaction(
+            self.guild_id, self.user_id, -self.total_price, "shop_purchase",
+            item=self.item.get("name"), quantity=self.quantity
+        )
 
     @discord.ui.button(label="取消", style=discord.ButtonStyle.red, emoji="❌")
     async def cancel(self, button, interaction):
@@ -349,6 +335,7 @@ class UseOrBackpackView(View):
             # 將物品加入背包 (只記錄 name，與 backpack.py 的讀取邏輯一致)
             item_record = {"name": self.item.get("name", "未知物品")}
             user_config[self.guild_id][self.user_id]["backpack"].append(item_record)
+            self.cog.data_manager.mark_dirty("user_config", self.guild_id, self.user_id)
             
             # 統一保存
             await self.cog.data_manager.save_all_async()
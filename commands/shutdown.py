@@ -109,11 +109,11 @@ class ShutdownCog(commands.Cog):
                 discord.Color.from_rgb(205, 133, 232)
             )
 
-            # 2. 保存數據
+            # 2. 立即寫入所有尚未落盤的數據
             data_manager = getattr(self.bot, "data_manager", None)
             if data_manager:
                 try:
-                    await data_manager.save_all_async()
+                    await data_manager.flush()
                     logger.info("💾 所有數據已保存")
                 except Exception as e:
                     logger.error(f"❌ 數據保存失敗: {e}")
@@ -81,12 +81,15 @@ class Tax(commands.Cog):
             tax_targets = {}  # user_id -> (balance, tax_rate, tax_amount, new_balance)
             total_tax = 0.0
 
-            async with self.data_manager.balance_lock:
+            # 鎖住國庫與伺服器內所有帳戶；取鎖期間才出現的新帳戶不在本次徵稅範圍內
+            taxed_uids = set(self.data_manager.balance[guild_id])
+            lock_keys = [(guild_id,)] + [(guild_id, uid) for uid in taxed_uids]
+            async with self.data_manager.locks.hold(*lock_keys):
                 balance = self.data_manager.balance
                 
                 # 1. 計算並扣除用戶稅金
-                for taxed_uid, user_balance in list(balance[guild_id].items()):
-                    if taxed_uid == user_id: continue
+                for taxed_uid, user_balance in list(balance.get(guild_id, {}).items()):
+                    if taxed_uid == user_id or taxed_uid not in taxed_uids: continue
                     if not isinstance(user_balance, (int, float)) or user_balance <= 0: continue
 
                     tax_rate   = get_tax_rate(user_balance)
@@ -94,6 +97,8 @@ class Tax(commands.Cog):
                     new_bal    = round(user_balance - tax_amount, 2)
 
                     balance[guild_id][taxed_uid] = new_bal
+                    self.data_manager.mark_dirty("balance", guild_id, taxed_uid)
+                    self.data_manager.record_transaction(guild_id, taxed_uid, -tax_amount, "tax", rate=tax_rate)
                     tax_targets[taxed_uid] = (user_balance, tax_rate, tax_amount, new_bal)
                     total_tax += tax_amount
 
@@ -107,6 +112,7 @@ class Tax(commands.Cog):
                         vault["contributions"][taxed_uid] = round(
                             vault["contributions"].get(taxed_uid, 0.0) + tax_amount, 2
                         )
+                    self.data_manager.mark_dirty("server_vault", guild_id)
 
             if not tax_targets:
                 await ctx.followup.send(
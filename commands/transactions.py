@@ -0,0 +1,207 @@
+import discord
+from discord.ext import commands
+from discord.ui import View, Button
+import asyncio
+import logging
+from datetime import datetime
+from time import time
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger("SakuraBot.commands.transactions")
+
+HISTORY_COLOR = discord.Color.from_rgb(255, 182, 193)
+PAGE_SIZE = 10
+TZ = ZoneInfo("Asia/Taipei")
+
+TRANSACTION_TYPES = {
+    "shop_purchase": "🍡 商店購買",
+    "deposit": "🏦 存款",
+    "withdraw": "💸 提款",
+    "borrow": "📜 借款",
+    "repay": "✅ 還款",
+    "work_salary": "💼 工作薪資",
+    "fish_sale": "🐟 賣魚",
+    "quiz_reward": "📝 問答獎勵",
+    "tax": "🏛️ 稅金",
+    "blackjack_bet": "🃏 21點下注",
+    "blackjack_payout": "🃏 21點獎金",
+    "blackjack_refund": "🃏 21點退注",
+    "pvp_bet": "⚔️ 對賭下注",
+    "pvp_payout": "⚔️ 對賭獎金",
+    "pvp_refund": "⚔️ 對賭退注",
+    "admin_add": "🛠️ 管理員增加",
+    "admin_set": "🛠️ 管理員設定",
+    "admin_remove": "🛠️ 管理員扣除",
+}
+
+
+def _type_option():
+    return discord.Option(
+        str,
+        description="只顯示某種交易",
+        choices=[discord.OptionChoice(name=label, value=key) for key, label in TRANSACTION_TYPES.items()],
+        required=False,
+        default=None
+    )
+
+
+def _days_option():
+    return discord.Option(
+        int,
+        description="只顯示最近幾天的紀錄 (留空為全部)",
+        min_value=1,
+        max_value=3650,
+        required=False,
+        default=None
+    )
+
+
+class TransactionPagesView(View):
+    """以 (ts, id) 游標翻頁：每頁只向資料庫要 PAGE_SIZE + 1 筆"""
+
+    def __init__(self, ctx, data_manager, guild_id: str, target: discord.abc.User,
+                 transaction_type: str = None, since: float = None):
+        super().__init__(timeout=180)
+        self.ctx, self.data_manager = ctx, data_manager
+        self.guild_id, self.target = guild_id, target
+        self.transaction_type, self.since = transaction_type, since
+        # cursors[i] 為第 i 頁的起點 (第一頁為 None)
+        self.cursors = [None]
+        self.rows = []
+        self.has_next = False
+        self.message = None
+
+    @property
+    def page(self) -> int:
+        return len(self.cursors)
+
+    async def load_page(self):
+        rows = await asyncio.to_thread(
+            self.data_manager.query_transactions, self.guild_id, self.target.id,
+            self.transaction_type, self.since, None, self.cursors[-1], PAGE_SIZE + 1
+        )
+        self.has_next = len(rows) > PAGE_SIZE
+        self.rows = rows[:PAGE_SIZE]
+        self.update_buttons()
+
+    def get_embed(self) -> discord.Embed:
+        filters = []
+        if self.transaction_type:
+            filters.append(TRANSACTION_TYPES.get(self.transaction_type, self.transaction_type))
+        if self.since is not None:
+            filters.append(f"自 {datetime.fromtimestamp(self.since, TZ):%Y-%m-%d} 起")
+        embed = discord.Embed(
+            title=f"📒 {self.target.display_name} 的交易紀錄",
+            description=("篩選: " + "、".join(filters)) if filters else "幽幽子翻開了帳本～錢都跑去哪裡了呢？",
+            color=HISTORY_COLOR
+        )
+        if not self.rows:
+            embed.add_field(name="空空如也", value="這段時間沒有任何交易哦～", inline=False)
+        for row in self.rows:
+            when = datetime.fromtimestamp(row["ts"], TZ).strftime("%Y-%m-%d %H:%M")
+            label = TRANSACTION_TYPES.get(row["type"], row["type"])
+            details = row["details"]
+            extra = f"\n{details['item']} × {details.get('quantity', 1)}" if details.get("item") else ""
+            embed.add_field(
+                name=f"{label} · {when}",
+                value=f"`{row['amount']:+,.2f}` 幽靈幣{extra}",
+                inline=False
+            )
+        embed.set_footer(text=f"第 {self.page} 頁 · 幽幽子")
+        return embed
+
+    def update_buttons(self):
+        self.clear_items()
+        if self.page > 1:
+            prev_btn = Button(label="上一頁", style=discord.ButtonStyle.secondary, emoji="⬅️")
+            prev_btn.callback = self.prev_page
+            self.add_item(prev_btn)
+        if self.has_next:
+            next_btn = Button(label="下一頁", style=discord.ButtonStyle.secondary, emoji="➡️")
+            next_btn.callback = self.next_page
+            self.add_item(next_btn)
+
+    async def _check_owner(self, interaction) -> bool:
+        if interaction.user.id != self.ctx.author.id:
+            await interaction.response.send_message("這不是你打開的帳本哦!", ephemeral=True)
+            return False
+        return True
+
+    async def prev_page(self, interaction):
+        if not await self._check_owner(interaction): return
+        if self.page > 1:
+            self.cursors.pop()
+            await self.load_page()
+            await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+    async def next_page(self, interaction):
+        if not await self._check_owner(interaction): return
+        if self.has_next and self.rows:
+            last = self.rows[-1]
+            self.cursors.append((last["ts"], last["id"]))
+            await self.load_page()
+            await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+    async def on_timeout(self):
+        for item in self.children: item.disabled = True
+        if self.message:
+            try: await self.message.edit(view=self)
+            except: pass
+
+
+class Transactions(commands.Cog):
+    """
+    ✿ 幽幽子的帳本 ✿
+    翻閱各種經濟活動留下的交易紀錄，回答「我的錢都去哪了」
+    """
+
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+        self.data_manager = bot.data_manager
+
+    @discord.slash_command(name="transactions", description="📒 查看你在這個伺服器的交易紀錄")
+    async def transactions(
+        self,
+        ctx: discord.ApplicationContext,
+        transaction_type: str = _type_option(),
+        days: int = _days_option(),
+    ):
+        await self._show_history(ctx, ctx.author, transaction_type, days)
+
+    @discord.slash_command(name="user_transactions", description="📒 查看指定成員的交易紀錄 (僅限管理員)")
+    async def user_transactions(
+        self,
+        ctx: discord.ApplicationContext,
+        member: discord.Member,
+        transaction_type: str = _type_option(),
+        days: int = _days_option(),
+    ):
+        # 私訊中的 ctx.author 是 User，沒有 guild_permissions，必須先確認在伺服器內
+        if not ctx.guild:
+            await ctx.respond("❌ 這個命令只能在伺服器裡用唷～", ephemeral=True)
+            return
+        if not ctx.author.guild_permissions.administrator:
+            await ctx.respond("呼呼～只有管理員才能翻看別人的帳本哦!", ephemeral=True)
+            return
+        await self._show_history(ctx, member, transaction_type, days)
+
+    async def _show_history(self, ctx, target, transaction_type, days):
+        if not ctx.guild:
+            await ctx.respond("❌ 這個命令只能在伺服器裡用唷～", ephemeral=True)
+            return
+        try:
+            # 先把剛產生、還在緩衝區的交易寫入，確保查得到最新的紀錄
+            await self.data_manager.flush_transactions()
+            since = time() - days * 86400 if days else None
+            view = TransactionPagesView(ctx, self.data_manager, str(ctx.guild.id), target, transaction_type, since)
+            await view.load_page()
+            await ctx.respond(embed=view.get_embed(), view=view, ephemeral=True)
+            view.message = await ctx.interaction.original_response()
+        except Exception as e:
+            logger.error(f"❌ 交易紀錄查詢失敗: {e}", exc_info=True)
+            await ctx.respond("❌ 幽幽子翻不開帳本了，請稍後再試～", ephemeral=True)
+
+
+def setup(bot: discord.Bot):
+    bot.add_cog(Transactions(bot))
+    logger.info("帳本模組已綻放")
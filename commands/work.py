@@ -1,9 +1,7 @@
 import discord
 from discord.ext import commands
-import asyncio
 import random
 import logging
-import os
 from datetime import datetime, timedelta 
 
 logger = logging.getLogger("SakuraBot.Work")
@@ -60,12 +58,8 @@ class Work(commands.Cog):
             # [Debug 修復] 徹底移除硬碟讀寫！直接引用記憶體中的 user_config
             user_config = self.data_manager.user_config
             
-            # [Debug 修復] 使用 to_thread 讀取靜態設定檔，確保路徑正確
-            config_path = os.path.join(self.data_manager.config_dir, "config.json")
-            config_data = await asyncio.to_thread(
-                self.data_manager._load_json, config_path, {}
-            )
-            jobs_data = config_data.get("jobs", {})
+            # 靜態設定直接取自共用快取，不再每次讀檔
+            jobs_data = self.data_manager.config.current().jobs
 
             user_info = user_config.setdefault(guild_id, {}).setdefault(user_id, {})
             
@@ -168,8 +162,8 @@ class Work(commands.Cog):
             # 計算報酬
             reward = random.randint(job_data["min"], job_data["max"])
 
-            # [Debug 修復] balance_lock 內只做記憶體操作
-            async with self.data_manager.balance_lock:
+            # [Debug 修復] 帳戶鎖內只做記憶體操作
+            async with self.data_manager.locks.hold((guild_id, user_id)):
                 balance = self.data_manager.balance
                 balance.setdefault(guild_id, {}).setdefault(user_id, 0.0)
                 old_balance = balance[guild_id][user_id]
@@ -181,6 +175,9 @@ class Work(commands.Cog):
                 user_info["work_cooldown"] = (now + timedelta(seconds=WORK_COOLDOWN_SECONDS)).isoformat()
                 
                 final_stamina = user_info["stamina"]
+                self.data_manager.mark_dirty("balance", guild_id, user_id)
+                self.data_manager.mark_dirty("user_config", guild_id, user_id)
+                self.data_manager.record_transaction(guild_id, user_id, reward, "work_salary", job=job_name)
 
             # [Debug 修復] 鎖釋放後，統一呼叫 save_all_async 保存所有數據
             await self.data_manager.save_all_async()
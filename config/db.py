@@ -3,12 +3,14 @@ import os
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 
-DB_PATH = "example.db"
+# 預設直接管理 Bot 使用的資料庫 (與本檔同目錄的 sakura_bot.db)；結構由 Bot 的 db_migrations 維護
+DB_PATH = os.getenv("SAKURA_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sakura_bot.db"))
 
 def init_db():
     try:
         conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
+        # 與 db_migrations 第 3 版相同的結構；舊版 (user_id 為主鍵) 的資料庫請先啟動一次 Bot 完成遷移
         c.execute("""
             CREATE TABLE IF NOT EXISTS BackgroundInfo (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -16,6 +18,7 @@ def init_db():
                 info TEXT NOT NULL
             )
         """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_backgroundinfo_user ON BackgroundInfo (user_id, id)")
         conn.commit()
         conn.close()
     except sqlite3.Error as e:
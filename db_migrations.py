@@ -0,0 +1,105 @@
+"""
+✿ 幽幽子的資料庫年輪 ✿
+config/sakura_bot.db 的版本化結構遷移。
+
+目前版本記在 PRAGMA user_version，每次套用的紀錄另外寫進 SchemaMigrations 供人工查看。
+新增遷移時在 MIGRATIONS 末尾加一筆 (版本號遞增)，已發佈的遷移不要再修改；
+每個遷移都必須可以在「表格已經存在」的舊資料庫上安全執行 (早期版本沒有記錄 user_version)。
+"""
+import logging
+import sqlite3
+from time import time
+
+logger = logging.getLogger("SakuraBot.db_migrations")
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _baseline(conn: sqlite3.Connection):
+    """版本 1：經濟系統改版之前就存在的 AI 對話表格 (BackgroundInfo 為當時每人一筆的結構，由版本 5 統一)"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS UserMessages (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, message TEXT, repeat_count INTEGER DEFAULT 0, is_permanent BOOLEAN DEFAULT FALSE, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS BackgroundInfo (user_id TEXT PRIMARY KEY, info TEXT)''')
+
+
+def _transactions(conn: sqlite3.Connection):
+    """版本 2：經濟交易日誌 (原本在 data/economy/transactions.json)"""
+    # 只追加，寫入成本與歷史長度無關
+    conn.execute('''CREATE TABLE IF NOT EXISTS Transactions (id INTEGER PRIMARY KEY AUTOINCREMENT, guild_id TEXT NOT NULL, user_id TEXT NOT NULL, amount REAL NOT NULL, type TEXT NOT NULL, ts REAL NOT NULL, details TEXT)''')
+    # 依 (伺服器, 用戶, 時間) 排序的索引：查詢個人紀錄只需掃描該用戶的一段範圍
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_transactions_user_ts ON Transactions (guild_id, user_id, ts, id)''')
+
+
+def _storage_meta(conn: sqlite3.Connection):
+    """版本 3：鍵值表，記錄經濟資料的匯入時間、交易封存的高水位等"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS StorageMeta (key TEXT PRIMARY KEY, value TEXT)''')
+
+
+def _user_message_indexes(conn: sqlite3.Connection):
+    """版本 4：UserMessages 的三種查詢各有一個索引，查詢成本不再隨表格大小成長"""
+    # record_message：找同一用戶尚未轉為永久的同一句話
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_usermessages_user_message ON UserMessages (user_id, message, is_permanent)''')
+    # 產生 AI 回應：某用戶最近的 20 句
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_usermessages_user_created ON UserMessages (user_id, created_at)''')
+    # 清理過期訊息：只索引非永久訊息 (部分索引)，條件必須與清理語句的 is_permanent = FALSE 一致
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_usermessages_expiry ON UserMessages (created_at) WHERE is_permanent = FALSE''')
+
+
+def _unify_background_info(conn: sqlite3.Connection):
+    """版本 5：統一 BackgroundInfo 的結構
+
+    Bot 原本以 user_id 為主鍵 (每人一筆)，config/db.py 的管理工具則是自動編號、每人可以有多筆；
+    讀取端本來就會把同一用戶的多筆資訊串接起來，因此統一為管理工具的多筆結構，並為 user_id 建索引。
+    """
+    columns = _columns(conn, "BackgroundInfo")
+    if columns and "id" not in columns:
+        conn.execute("ALTER TABLE BackgroundInfo RENAME TO BackgroundInfo_legacy")
+        columns = []
+    if not columns:
+        conn.execute('''CREATE TABLE BackgroundInfo (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, info TEXT NOT NULL)''')
+    if _columns(conn, "BackgroundInfo_legacy"):
+        moved = conn.execute(
+            "INSERT INTO BackgroundInfo (user_id, info) SELECT user_id, info FROM BackgroundInfo_legacy "
+            "WHERE user_id IS NOT NULL AND info IS NOT NULL ORDER BY rowid").rowcount
+        conn.execute("DROP TABLE BackgroundInfo_legacy")
+        logger.info(f"📜 已將 {moved} 筆背景資訊轉換為多筆結構")
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_backgroundinfo_user ON BackgroundInfo (user_id, id)''')
+
+
+# (版本, 說明, 遷移函式)
+MIGRATIONS = [
+    (1, "baseline tables", _baseline),
+    (2, "Transactions journal", _transactions),
+    (3, "StorageMeta", _storage_meta),
+    (4, "UserMessages indexes", _user_message_indexes),
+    (5, "unify BackgroundInfo schema", _unify_background_info),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> tuple:
+    """把資料庫升級到最新版本，回傳 (原版本, 新版本)
+
+    必須在交易中呼叫 (例如資料庫侍從的寫入工作)：任何一步失敗時整批回滾，user_version 維持原值。
+    """
+    current = schema_version(conn)
+    if current > LATEST_VERSION:
+        # 降版執行：不動結構，由呼叫端決定要不要繼續
+        logger.warning(f"⚠️ 資料庫結構版本 {current} 比程式認得的 {LATEST_VERSION} 新，略過遷移")
+        return current, current
+    conn.execute('''CREATE TABLE IF NOT EXISTS SchemaMigrations (version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at REAL NOT NULL)''')
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        apply(conn)
+        conn.execute("INSERT OR REPLACE INTO SchemaMigrations (version, description, applied_at) VALUES (?, ?, ?)",
+                     (version, description, time()))
+        # PRAGMA 不接受參數；version 來自上方的常數
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+        logger.info(f"🪵 資料庫結構已升級到第 {version} 版：{description}")
+    return current, max(current, LATEST_VERSION)
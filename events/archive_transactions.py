@@ -0,0 +1,50 @@
+import discord
+from discord.ext import commands, tasks
+import logging
+import asyncio
+from datetime import time, timezone, timedelta
+from time import monotonic
+
+logger = logging.getLogger("SakuraBot.events.archive_transactions")
+
+LOCAL_TIMEZONE = timezone(timedelta(hours=8))
+
+
+class TransactionArchiver(commands.Cog):
+    """
+    ✿ 幽幽子的帳本整理 ✿
+    每天把過了保留期的交易紀錄收進封存分段檔，讓帳本只留下近期的頁面
+    """
+
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+        self.archive_task.start()
+
+    def cog_unload(self):
+        self.archive_task.cancel()
+
+    @tasks.loop(time=time(4, 30, tzinfo=LOCAL_TIMEZONE))
+    async def archive_task(self):
+        """每天凌晨 4:30 (避開 4:00 的在線備份) 封存舊交易"""
+        dm = getattr(self.bot, "data_manager", None)
+        if dm is None:
+            return
+        started = monotonic()
+        try:
+            await dm.flush_transactions()
+            stats = await asyncio.to_thread(dm.archive_transactions)
+        except Exception as e:
+            logger.error(f"❌ 交易封存失敗: {e}", exc_info=True)
+            return
+        if stats["records"]:
+            archive = await asyncio.to_thread(dm.txn_archive.stats)
+            logger.info(
+                f"📦 已封存 {stats['records']} 筆超過 {dm.txn_archive_days} 天的交易 ({stats['segments']} 個新分段，"
+                f"耗時 {monotonic() - started:.2f}s)；封存庫共 {archive['segments']} 段 / {archive['records']} 筆 / "
+                f"{archive['bytes'] / 1024 / 1024:.1f} MiB"
+            )
+
+
+def setup(bot: discord.Bot):
+    bot.add_cog(TransactionArchiver(bot))
+    logger.info("帳本整理模組已綻放")
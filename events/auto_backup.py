@@ -1,17 +1,23 @@
 import discord
 from discord.ext import commands, tasks
 import logging
-import json
 import sqlite3
 import asyncio
 import os
 from datetime import datetime, time, timezone, timedelta
+from time import monotonic
+
+import backup_archive
 
 logger = logging.getLogger("SakuraBot.events.auto_backup")
 
 AUTHOR_ID = int(os.getenv("AUTHOR_ID", 0))
 LOCAL_TIMEZONE = timezone(timedelta(hours=8))
 
+# 保留的還原點數量，以及每隔幾份差異就重新寫一份完整基底
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", 7))
+BACKUP_FULL_EVERY = int(os.getenv("BACKUP_FULL_EVERY", 7))
+
 
 class AutoBackup(commands.Cog):
     """
@@ -21,6 +27,11 @@ class AutoBackup(commands.Cog):
 
     def __init__(self, bot: discord.Bot):
         self.bot = bot
+        self._backup_running = False
+        # 前一份備份的快照 (寫時複製版本，與目前資料共用未修改的子樹) 與其 id，用於計算差異
+        self._last_snapshot = None
+        self._last_backup_id = None
+        self._chain_length = 0
         
         # 策略：每天凌晨 4:00 觸發在線備份 (不關機)
         self.backup_task.start()
@@ -37,24 +48,31 @@ class AutoBackup(commands.Cog):
         await self._execute_online_backup()
 
     async def _execute_online_backup(self):
-        """執行在線備份 (不關機)"""
+        """執行在線備份 (不關機，也不暫停任何指令)"""
         if not hasattr(self.bot, 'data_manager'):
             return
+        if self._backup_running:
+            logger.warning("⚠️ 上一次在線備份尚未完成，略過本次備份")
+            return
 
         dm = self.bot.data_manager
+        self._backup_running = True
         
         try:
-            # 1. 開啟備份標記，攔截修改類指令
-            dm.is_backing_up = True
-            logger.info("🔒 數據庫已進入備份保護模式，修改類指令已暫停。")
-
-            # 2. 確保記憶體中的最新數據寫入 JSON (雙重保險)
-            await dm.save_all_async()
-            
-            # 3. 將數據快照寫入 SQLite
-            await asyncio.to_thread(self._save_snapshot_to_sqlite)
+            # 1. 在事件循環中同步取得已載入資料倉的唯讀版本 (中間沒有 await，因此是同一時間點的一致快照)
+            #    尚未載入的冷資料倉不強迫載入，稍後在背景執行緒中直接讀取磁碟上的檔案
+            started = monotonic()
+            stores = dm.snapshot([store for store in dm.store_files if dm.is_loaded(store)])
+            cold = [store for store in dm.store_files if store not in stores]
+            logger.info(f"📸 已擷取時間點快照 ({len(stores)} 個資料倉，耗時 {(monotonic() - started) * 1000:.1f} ms)，指令照常運作")
+
+            # 2. 序列化與寫入 SQLite 全部在背景執行緒進行，期間指令可以繼續修改即時資料
+            await asyncio.to_thread(self._save_snapshot_to_sqlite, stores, cold)
             
-            logger.info("✅ 在線備份成功完成！數據已安全封存於 SQLite。")
+            # 3. 順便把髒資料寫回檔案 (不影響快照內容)
+            await dm.flush()
+
+            logger.info(f"✅ 在線備份成功完成！數據已安全封存於 SQLite。(總耗時 {monotonic() - started:.2f}s)")
             
             # 4. 發送私訊通知給主人 (可選)
             if AUTHOR_ID:
@@ -68,51 +86,45 @@ class AutoBackup(commands.Cog):
         except Exception as e:
             logger.error(f"❌ 在線備份過程發生錯誤: {e}", exc_info=True)
         finally:
-            # 5. [關鍵] 無論成功或失敗，都必須關閉備份標記，恢復指令功能
-            dm.is_backing_up = False
-            logger.info("🔓 數據庫備份保護模式已解除，指令恢復正常。")
-
-    def _save_snapshot_to_sqlite(self):
-        """同步方法：將所有數據打包並寫入 SQLite"""
-        dm = self.bot.data_manager
-        db_path = dm.db_path
+            self._backup_running = False
 
-        snapshot = {
-            "backup_time": datetime.now(LOCAL_TIMEZONE).isoformat(),
-            "balance": dm.balance,
-            "blackjack_data": dm.blackjack_data,
-            "invalid_bet_count": dm.invalid_bet_count,
-            "bot_status": dm.bot_status,
-            "dm_messages": dm.dm_messages,
-            "fishingbackpack": dm.fishingbackpack,
-            "user_config": dm.user_config
-        }
+    def _save_snapshot_to_sqlite(self, stores: dict, cold: list = ()):
+        """同步方法：將快照以增量壓縮格式寫入 SQLite (完整基底 + 每日差異)
 
-        json_payload = json.dumps(snapshot, ensure_ascii=False, indent=None)
+        cold 為未載入的冷資料倉，直接從磁碟讀取後併入快照。
+        """
+        dm = self.bot.data_manager
+        for store in cold:
+            stores[store] = dm.read_store_file(store)
+        backup_time = datetime.now(LOCAL_TIMEZONE).isoformat()
+
+        def write(conn):
+            backup_archive.ensure_schema(conn)
+            previous, parent_id = self._last_snapshot, self._last_backup_id
+            # 重啟後沒有前一份快照、基底已被清除、或差異鏈過長時改寫完整基底
+            if (previous is None or self._chain_length >= BACKUP_FULL_EVERY or
+                    conn.execute(f"SELECT 1 FROM {backup_archive.BACKUP_TABLE} WHERE id = ?", (parent_id,)).fetchone() is None):
+                previous = parent_id = None
+            result = backup_archive.write_backup(conn, stores, backup_time, previous, parent_id)
+            return result, backup_archive.prune_backups(conn, BACKUP_KEEP)
 
         try:
-            with sqlite3.connect(db_path, check_same_thread=False) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS SystemBackups (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        snapshot_data TEXT NOT NULL
-                    )
-                ''')
-                cursor.execute('INSERT INTO SystemBackups (snapshot_data) VALUES (?)', (json_payload,))
-                
-                # 清理舊備份，只保留最近 7 份
-                cursor.execute('''
-                    DELETE FROM SystemBackups 
-                    WHERE id NOT IN (SELECT id FROM SystemBackups ORDER BY created_at DESC LIMIT 7)
-                ''')
-                conn.commit()
-                logger.info(f"SQLite 備份成功。目前保留了 {cursor.execute('SELECT COUNT(*) FROM SystemBackups').fetchone()[0]} 份快照。")
+            # 交給共用的寫入執行緒，與交易日誌等其他寫入排隊，不再另開連線搶資料庫鎖
+            started = monotonic()
+            result, pruned = dm.db.write_sync(write)
+            elapsed = monotonic() - started
         except sqlite3.Error as e:
             logger.error(f"SQLite 寫入失敗: {e}")
             raise
 
+        self._last_snapshot = stores
+        self._last_backup_id = result["id"]
+        self._chain_length = 0 if result["kind"] == "full" else self._chain_length + 1
+        logger.info(
+            f"SQLite 備份成功：#{result['id']} ({'完整基底' if result['kind'] == 'full' else '差異'}) "
+            f"{result['ops']} 筆變更，{result['raw_size'] / 1024:.1f} KiB → 壓縮後 {result['size'] / 1024:.1f} KiB，"
+            f"耗時 {elapsed:.2f}s，清除 {pruned} 份過期備份。"
+        )
 
 def setup(bot: discord.Bot):
     bot.add_cog(AutoBackup(bot))
@@ -123,6 +123,7 @@ class SakuraDrift(commands.Cog):
 
             self._cleanup_old_records()
 
+            self.bot.data_manager.mark_dirty("bot_status")
             await self.bot.data_manager.save_all_async()
             logger.debug(f"事件已保存: {event_type} at {format_timestamp(now)}")
 
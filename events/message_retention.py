@@ -0,0 +1,46 @@
+import discord
+from discord.ext import commands, tasks
+import logging
+import os
+
+logger = logging.getLogger("SakuraBot.events.message_retention")
+
+# 每隔幾秒清掃一次過期的對話訊息
+SWEEP_INTERVAL = max(30.0, float(os.getenv("MESSAGE_SWEEP_INTERVAL", 300)))
+
+
+class MessageRetention(commands.Cog):
+    """
+    ✿ 幽幽子的落花清掃 ✿
+    定時把超過保留時間的對話訊息掃出花園，聊天時不必再順手打掃
+    """
+
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+        self.sweep_task.start()
+
+    def cog_unload(self):
+        self.sweep_task.cancel()
+
+    @tasks.loop(seconds=SWEEP_INTERVAL)
+    async def sweep_task(self):
+        dm = getattr(self.bot, "data_manager", None)
+        if dm is None:
+            return
+        try:
+            result = await dm.sweep_user_messages()
+        except Exception as e:
+            logger.error(f"❌ 清掃過期訊息失敗: {e}", exc_info=True)
+            return
+        if result["purged"]:
+            vacuum = f"，空間回收 {result['vacuum']}" if result["vacuum"] else ""
+            logger.info(
+                f"🍂 已清掃 {result['purged']} 條超過 {dm.message_retention_minutes:g} 分鐘的訊息 "
+                f"({result['batches']} 批，耗時 {result['seconds'] * 1000:.1f} ms{vacuum})；"
+                f"累計 {dm.retention_stats['purged']} 條"
+            )
+
+
+def setup(bot: discord.Bot):
+    bot.add_cog(MessageRetention(bot))
+    logger.info("落花清掃模組已綻放")
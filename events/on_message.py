@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import logging
 import random
 import asyncio
@@ -7,14 +7,21 @@ import time
 from datetime import datetime, timezone, timedelta
 import os
 import sqlite3
+import json
 import openai
 
+from trigger_matcher import TriggerMatcher
+
 logger = logging.getLogger("SakuraBot.events.on_message")
 
 # [ChatAnywhere 專屬修復] 移除 /v1/ 避免新版 SDK 拼接後變成 /v1//v1/ 導致 404
 # 使用 .tech 域名通常比 .org 更穩定
 API_URL = 'https://api.chatanywhere.tech' 
 AUTHOR_ID = int(os.getenv("AUTHOR_ID", 0))
+EASTER_EGG_PATH = "config/on_message.json"
+# 每隔幾秒檢查一次彩蛋設定檔是否被修改 (0 = 關閉自動重新載入，只能用 /reload_easter_eggs)
+EASTER_EGG_WATCH_INTERVAL = float(os.getenv("EASTER_EGG_WATCH_INTERVAL", 5))
+DISCORD_MESSAGE_LIMIT = 2000
 
 # [相容性修復] 自動判斷 openai 套件版本
 # 新版 (>= 1.0.0) 使用 openai.OpenAI，舊版 (< 1.0.0) 使用 openai.ChatCompletion
@@ -33,17 +40,27 @@ class OnMessage(commands.Cog):
         self.current_api_index = 0
 
         # [Debug 修復 #4] 先確保檔案存在，再載入彩蛋配置
-        self.bot.data_manager._initialize_json("config/on_message.json", self._get_default_config())
+        self.bot.data_manager._initialize_json(EASTER_EGG_PATH, self._get_default_config())
         self.easter_eggs = self.bot.data_manager._load_json(
-            "config/on_message.json",
+            EASTER_EGG_PATH,
             self._get_default_config()
         )
+        self.trigger_matcher = self._build_matcher(self.easter_eggs)
+        self._easter_egg_signature = self._file_signature(EASTER_EGG_PATH)
+        # 與 FishRates 相同：鎖在第一次重新載入時 (一定有 event loop) 才建立
+        self._reload_lock = None
+        if EASTER_EGG_WATCH_INTERVAL > 0:
+            self.easter_egg_watcher.change_interval(seconds=EASTER_EGG_WATCH_INTERVAL)
+            self.easter_egg_watcher.start()
 
         # 檢查 API KEY
         for idx, api in enumerate(self.api_keys):
             if not api["key"]:
                 logger.error(f"API {idx} 沒有設置金鑰，請設置 CHATANYWHERE_API 或 CHATANYWHERE_API2 環境變數")
 
+    def cog_unload(self):
+        self.easter_egg_watcher.cancel()
+
     def _get_default_config(self):
         """預設彩蛋配置"""
         return {
@@ -123,75 +140,188 @@ class OnMessage(commands.Cog):
         }
 
     @staticmethod
-    def record_message(user_id, message, db_path):
-        """記錄用戶訊息到資料庫 (同步方法)"""
-        if not user_id or not message or not isinstance(message, str):
+    def _build_matcher(easter_eggs):
+        """依 on_message 原本的判斷順序把所有彩蛋觸發詞編進同一個比對器"""
+        patterns = []
+        for keyword, response in easter_eggs.get("simple_responses", {}).items():
+            patterns.append((keyword, ("simple", response)))
+        for keyword, responses in easter_eggs.get("random_responses", {}).items():
+            patterns.append((keyword, ("random", responses)))
+        for keyword, responses in easter_eggs.get("complex_responses", {}).items():
+            patterns.append((keyword, ("complex", responses)))
+        # 時停與普奇神父的觸發詞原本就會轉小寫後比對
+        jojo = easter_eggs.get("jojo_time_stop", {})
+        patterns.append((jojo.get("trigger", "").lower(), ("jojo", jojo)))
+        pucci = easter_eggs.get("pucci_heaven", {})
+        patterns.append((pucci.get("trigger", "").lower(), ("pucci", pucci)))
+        return TriggerMatcher(patterns)
+
+    @staticmethod
+    def _validate_steps(where, steps, errors):
+        if not isinstance(steps, list) or not steps:
+            errors.append(f"{where} 必須是非空的陣列")
             return
-        try:
-            now_utc = datetime.now(timezone.utc).isoformat()
-            with sqlite3.connect(db_path, check_same_thread=False) as conn:
-                c = conn.cursor()
-                c.execute("""
-                    SELECT id, repeat_count FROM UserMessages 
-                    WHERE user_id = ? AND message = ? AND is_permanent = FALSE
-                """, (user_id, message))
-                row = c.fetchone()
-
-                if row:
-                    new_count = row[1] + 1
-                    is_permanent = new_count >= 10
-                    c.execute("""
-                        UPDATE UserMessages 
-                        SET repeat_count = ?, is_permanent = ? 
-                        WHERE id = ?
-                    """, (new_count, is_permanent, row[0]))
+        for i, step in enumerate(steps):
+            if not isinstance(step, dict):
+                errors.append(f"{where}[{i}] 必須是物件")
+                continue
+            text = step.get("text")
+            if not isinstance(text, str) or not text:
+                errors.append(f"{where}[{i}].text 必須是非空字串")
+            elif len(text) > DISCORD_MESSAGE_LIMIT:
+                errors.append(f"{where}[{i}].text 超過 Discord 的 {DISCORD_MESSAGE_LIMIT} 字上限")
+            delay = step.get("delay", 0)
+            if isinstance(delay, bool) or not isinstance(delay, (int, float)) or delay < 0:
+                errors.append(f"{where}[{i}].delay 必須是不小於 0 的數字")
+
+    @classmethod
+    def _validate_config(cls, config) -> list:
+        """檢查彩蛋設定的結構，回傳所有問題 (空列表代表可以使用)"""
+        if not isinstance(config, dict):
+            return ["最外層必須是物件"]
+        errors = []
+        for section in ("simple_responses", "random_responses", "complex_responses"):
+            entries = config.get(section, {})
+            if not isinstance(entries, dict):
+                errors.append(f"{section} 必須是物件")
+                continue
+            for keyword, value in entries.items():
+                where = f"{section}.{keyword}"
+                if not keyword:
+                    errors.append(f"{section} 含有空白觸發詞 (會攔下所有訊息)")
+                if section == "simple_responses":
+                    if not isinstance(value, str) or not value:
+                        errors.append(f"{where} 必須是非空字串")
+                elif section == "random_responses":
+                    if isinstance(value, list):
+                        if not value or not all(isinstance(v, str) and v for v in value):
+                            errors.append(f"{where} 必須是非空字串或非空的字串陣列")
+                    elif not isinstance(value, str) or not value:
+                        errors.append(f"{where} 必須是非空字串或非空的字串陣列")
                 else:
-                    c.execute("""
-                        INSERT INTO UserMessages (user_id, message, created_at) 
-                        VALUES (?, ?, ?)
-                    """, (user_id, message, now_utc))
-                conn.commit()
-        except sqlite3.Error as e:
-            logger.error(f"記錄訊息失敗: {e}")
+                    cls._validate_steps(where, value, errors)
+        for section in ("jojo_time_stop", "pucci_heaven"):
+            cfg = config.get(section)
+            if not isinstance(cfg, dict):
+                errors.append(f"{section} 必須是物件")
+                continue
+            trigger = cfg.get("trigger")
+            if not isinstance(trigger, str) or not trigger:
+                errors.append(f"{section}.trigger 必須是非空字串 (空白觸發詞會攔下所有訊息)")
+            cls._validate_steps(f"{section}.responses", cfg.get("responses"), errors)
+        return errors
 
     @staticmethod
-    def clean_old_messages(db_path, minutes=30):
-        """清理舊訊息 (同步方法)"""
+    def _file_signature(path):
         try:
-            with sqlite3.connect(db_path, check_same_thread=False) as conn:
-                c = conn.cursor()
-                time_ago = (datetime.now(timezone.utc) - timedelta(minutes=minutes)).isoformat()
-                c.execute("""
-                    DELETE FROM UserMessages 
-                    WHERE created_at < ? AND is_permanent = FALSE
-                """, (time_ago,))
-                deleted_rows = c.rowcount
-                conn.commit()
-                if deleted_rows > 0:
-                    logger.info(f"已刪除 {deleted_rows} 條舊訊息")
-                return deleted_rows
-        except sqlite3.Error as e:
-            logger.error(f"清理舊訊息失敗: {e}")
-            return 0
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
-    @staticmethod
-    def get_user_background_info(user_id, db_path):
-        """獲取用戶背景資訊 (同步方法)"""
+    @classmethod
+    def _compile_easter_eggs(cls, path):
+        """讀取、檢查並編譯彩蛋設定 (在執行緒中執行)；有任何問題都會拋出 ValueError，不影響目前使用中的設定"""
+        started = time.perf_counter()
+        signature = cls._file_signature(path)
         try:
-            with sqlite3.connect(db_path, check_same_thread=False) as conn:
-                c = conn.cursor()
-                c.execute("SELECT info FROM BackgroundInfo WHERE user_id = ?", (user_id,))
-                rows = c.fetchall()
-                return "\n".join([row[0] for row in rows]) if rows else None
-        except sqlite3.Error as e:
-            logger.error(f"獲取背景資訊失敗: {e}")
-            return None
+            with open(path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"無法讀取 {path}: {e}") from e
+        errors = cls._validate_config(config)
+        if errors:
+            raise ValueError("；".join(errors[:10]) + (f" (另有 {len(errors) - 10} 個問題)" if len(errors) > 10 else ""))
+        matcher = cls._build_matcher(config)
+        return config, matcher, signature, time.perf_counter() - started
+
+    async def reload_easter_eggs(self, force: bool = False) -> dict:
+        """
+        重新載入彩蛋設定。讀檔、檢查與編譯都在執行緒中完成，成功後才一次替換比對器；
+        失敗時保留原本的設定並拋出 ValueError。檔案未變更且非 force 時回傳 {"changed": False}。
+        """
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        async with self._reload_lock:
+            if not force and self._file_signature(EASTER_EGG_PATH) == self._easter_egg_signature:
+                return {"changed": False, "triggers": self.trigger_matcher.pattern_count}
+            try:
+                config, matcher, signature, seconds = await asyncio.to_thread(self._compile_easter_eggs, EASTER_EGG_PATH)
+            except ValueError:
+                # 記下這個版本的簽章，壞掉的檔案不會在每次輪詢時重複報錯
+                self._easter_egg_signature = self._file_signature(EASTER_EGG_PATH)
+                raise
+            # on_message 每則訊息只讀一次 self.trigger_matcher，單一屬性賦值即完成替換
+            self.easter_eggs = config
+            self.trigger_matcher = matcher
+            self._easter_egg_signature = signature
+            logger.info(f"🌸 彩蛋設定已重新載入：{matcher.pattern_count} 個觸發詞，耗時 {seconds * 1000:.1f} ms")
+            return {"changed": True, "triggers": matcher.pattern_count, "seconds": seconds}
+
+    @tasks.loop(seconds=5)
+    async def easter_egg_watcher(self):
+        """輪詢設定檔的修改時間與大小，有變更就在背景重新載入"""
+        try:
+            await self.reload_easter_eggs()
+        except ValueError as e:
+            logger.warning(f"⚠️ 彩蛋設定有誤，繼續使用舊設定: {e}")
+        except Exception as e:
+            logger.error(f"❌ 重新載入彩蛋設定失敗: {e}", exc_info=True)
+
+    @staticmethod
+    def record_message(conn, user_id, message):
+        """記錄用戶訊息到資料庫 (寫入工作，在資料庫寫入執行緒中執行)"""
+        if not user_id or not message or not isinstance(message, str):
+            return
+        now_utc = datetime.now(timezone.utc).isoformat()
+        row = conn.execute("""
+            SELECT id, repeat_count FROM UserMessages 
+            WHERE user_id = ? AND message = ? AND is_permanent = FALSE
+        """, (user_id, message)).fetchone()
+
+        if row:
+            new_count = row[1] + 1
+            is_permanent = new_count >= 10
+            conn.execute("""
+                UPDATE UserMessages 
+                SET repeat_count = ?, is_permanent = ? 
+                WHERE id = ?
+            """, (new_count, is_permanent, row[0]))
+        else:
+            conn.execute("""
+                INSERT INTO UserMessages (user_id, message, created_at) 
+                VALUES (?, ?, ?)
+            """, (user_id, message, now_utc))
+
+    @staticmethod
+    def get_user_background_info(conn, user_id):
+        """獲取用戶背景資訊 (讀取工作)"""
+        rows = conn.execute("SELECT info FROM BackgroundInfo WHERE user_id = ? ORDER BY id", (user_id,)).fetchall()
+        return "\n".join([row[0] for row in rows]) if rows else None
+
+    @classmethod
+    def _load_prompt_context(cls, conn, user_id):
+        """在同一條唯讀連線上取得對話歷史與幽幽子的背景資訊"""
+        # 兩個子查詢各自沿 (user_id, created_at) 索引取最新 20 筆再合併，
+        # 避免 OR 條件讓 SQLite 取出兩人的全部訊息後再排序
+        rows = conn.execute("""
+            SELECT message FROM (
+                SELECT * FROM (SELECT message, created_at FROM UserMessages WHERE user_id = ?
+                               ORDER BY created_at DESC LIMIT 20)
+                UNION ALL
+                SELECT * FROM (SELECT message, created_at FROM UserMessages WHERE user_id = 'system'
+                               ORDER BY created_at DESC LIMIT 20)
+            )
+            ORDER BY created_at DESC LIMIT 20
+        """, (user_id,)).fetchall()
+        context = "\n".join([f"{user_id}說: {row[0]}" for row in rows])
+        return context, cls.get_user_background_info(conn, "西行寺 幽幽子")
 
     def generate_response(self, prompt, user_id):
         """生成 AI 回應 (自動相容 openai 新舊版本，針對 ChatAnywhere 優化)"""
         tried_all_apis = False
         original_index = self.current_api_index
-        db_path = self.bot.data_manager.db_path
+        db = self.bot.data_manager.db
 
         while True:
             try:
@@ -212,17 +342,12 @@ class OnMessage(commands.Cog):
                         return "幽幽子今天吃太飽，所有 Key 都在午睡，等會兒再來吧～"
                     continue 
 
-                # 獲取對話歷史與背景資訊 (同步 DB 操作)
-                with sqlite3.connect(db_path, check_same_thread=False) as conn:
-                    c = conn.cursor()
-                    c.execute("""
-                        SELECT message FROM UserMessages 
-                        WHERE user_id = ? OR user_id = 'system'
-                        ORDER BY created_at DESC LIMIT 20
-                    """, (user_id,))
-                    context = "\n".join([f"{user_id}說: {row[0]}" for row in c.fetchall()])
-
-                user_background_info = self.get_user_background_info("西行寺 幽幽子", db_path)
+                # 獲取對話歷史與背景資訊 (本執行緒的長期唯讀連線)
+                try:
+                    context, user_background_info = db.read(self._load_prompt_context, user_id)
+                except sqlite3.Error as e:
+                    logger.error(f"獲取對話歷史失敗: {e}")
+                    context, user_background_info = "", None
                 if not user_background_info:
                     updated_background_info = (
                         "我是西行寺幽幽子，白玉樓的主人，幽靈公主。"
@@ -231,13 +356,12 @@ class OnMessage(commands.Cog):
                         "雖然我的話語總是輕飄飄的，但生與死的流轉，皆在我的掌握之中。"
                         "啊，還有，請不要吝嗇帶點好吃的來呢～"
                     )
-                    with sqlite3.connect(db_path, check_same_thread=False) as conn:
-                        c = conn.cursor()
-                        c.execute("""
-                            INSERT OR REPLACE INTO BackgroundInfo (user_id, info) 
-                            VALUES (?, ?)
-                        """, ("西行寺 幽幽子", updated_background_info))
-                        conn.commit()
+                    # 不需要等待寫入完成，本次回應直接使用這份背景資訊
+                    # BackgroundInfo 每人可有多筆 (見 db_migrations 第 3 版)，只在完全沒有資料時寫入預設值
+                    db.execute("""
+                        INSERT INTO BackgroundInfo (user_id, info) 
+                        SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM BackgroundInfo WHERE user_id = ?)
+                    """, ("西行寺 幽幽子", updated_background_info, "西行寺 幽幽子"))
                 else:
                     updated_background_info = user_background_info
 
@@ -342,7 +466,7 @@ class OnMessage(commands.Cog):
         # [Debug 修復 #3] 統一使用 content_lower 進行所有關鍵字比對
         content_lower = content.lower()
         channel = message.channel
-        db_path = self.bot.data_manager.db_path
+        db = self.bot.data_manager.db
 
         # --- AI 對話處理 ---
         is_reply_to_bot = False
@@ -358,51 +482,42 @@ class OnMessage(commands.Cog):
         if is_reply_to_bot or is_mentioning_bot:
             user_id = str(message.author.id)
             
-            # [Debug 修復 #1] 使用 asyncio.to_thread 避免阻塞 Event Loop
-            await asyncio.to_thread(self.record_message, user_id, content, db_path)
-            await asyncio.to_thread(self.clean_old_messages, db_path)
+            # [Debug 修復 #1] 資料庫寫入交給共用的寫入執行緒，不阻塞 Event Loop
+            # 等待訊息寫入完成，下面產生回應時的對話歷史才會包含這一句
+            try:
+                await db.write(self.record_message, user_id, content)
+            except sqlite3.Error as e:
+                logger.error(f"記錄訊息失敗: {e}")
             
             # [Debug 修復 #1] OpenAI API 丟到執行緒池
             response = await asyncio.to_thread(self.generate_response, content, user_id)
             await channel.send(response)
             return
 
-        # --- 簡單關鍵字回應 ---
-        for keyword, response in self.easter_eggs.get("simple_responses", {}).items():
-            if keyword in content_lower:
-                await channel.send(response)
-                return
-
-        # [Debug 修復 #2] 補上原本遺漏的 random_responses 處理邏輯
-        for keyword, responses in self.easter_eggs.get("random_responses", {}).items():
-            if keyword in content_lower:
-                if isinstance(responses, list) and responses:
-                    await channel.send(random.choice(responses))
+        # --- 彩蛋關鍵字 (簡單 → 隨機 → 複雜 → JOJO 時停 → 普奇神父，一次掃描找出最優先的命中) ---
+        matched = self.trigger_matcher.find(content_lower)
+        if matched is not None:
+            kind, payload = matched
+            if kind == "simple":
+                await channel.send(payload)
+            # [Debug 修復 #2] 補上原本遺漏的 random_responses 處理邏輯
+            elif kind == "random":
+                if isinstance(payload, list) and payload:
+                    await channel.send(random.choice(payload))
                 else:
-                    await channel.send(str(responses))
-                return
-
-        # --- 複雜多步驟回應 ---
-        for keyword, responses in self.easter_eggs.get("complex_responses", {}).items():
-            if keyword in content_lower:
-                await self.handle_complex_response(channel, responses)
-                return
-
-        # --- JOJO 時停 ---
-        jojo = self.easter_eggs.get("jojo_time_stop", {})
-        if jojo.get("trigger", "").lower() in content_lower:
-            await self.handle_complex_response(channel, jojo.get("responses", []))
-            return
-
-        # --- 普奇神父（需刪除訊息）---
-        pucci = self.easter_eggs.get("pucci_heaven", {})
-        if pucci.get("trigger", "").lower() in content_lower:
-            if pucci.get("delete_trigger"):
-                try:
-                    await message.delete()
-                except (discord.Forbidden, discord.NotFound):
-                    await channel.send("⚠️ 無法刪除訊息，請確認我有刪除訊息的權限。")
-            await self.handle_complex_response(channel, pucci.get("responses", []))
+                    await channel.send(str(payload))
+            elif kind == "complex":
+                await self.handle_complex_response(channel, payload)
+            elif kind == "jojo":
+                await self.handle_complex_response(channel, payload.get("responses", []))
+            # --- 普奇神父（需刪除訊息）---
+            elif kind == "pucci":
+                if payload.get("delete_trigger"):
+                    try:
+                        await message.delete()
+                    except (discord.Forbidden, discord.NotFound):
+                        await channel.send("⚠️ 無法刪除訊息，請確認我有刪除訊息的權限。")
+                await self.handle_complex_response(channel, payload.get("responses", []))
             return
 
         # --- 特殊功能 ---
@@ -500,7 +615,7 @@ class OnMessage(commands.Cog):
         """處理關機指令"""
         if message.author.id == AUTHOR_ID:
             await message.channel.send("正在關閉...")
-            await self.bot.data_manager.save_all_async()
+            await self.bot.data_manager.flush()
             await self.bot.close()
         else:
             await message.channel.send("你無權關閉我 >_<")
@@ -545,6 +660,7 @@ class OnMessage(commands.Cog):
             'content': message.content,
             'timestamp': message.created_at.isoformat()
         })
+        self.bot.data_manager.mark_dirty("dm_messages", user_id)
 
         await self.bot.data_manager.save_all_async()
         logger.info(f"私訊記錄: {message.author} - {message.content}")
@@ -4,14 +4,24 @@ import logging
 import json
 import yaml
 import sqlite3
-import copy  # [新增] 用於 save_all_async 的 deepcopy 保護
-from time import time
+import copy
+import shutil
+import contextlib
+import threading
+from collections.abc import Mapping, MutableMapping
+from datetime import datetime, timezone, timedelta
+from time import time, monotonic
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands
 import asyncio
 import argparse
 from license_check import check_license
+from transaction_archive import TransactionArchive, archivable
+from sqlite_service import SQLiteService
+import db_migrations
+import snapshot_codec
+from snapshot_codec import CODECS, codec_for_path, get_codec
 
 # ----------- 靈魂日誌的啟動 -----------
 os.makedirs("logs", exist_ok=True)
@@ -79,6 +89,361 @@ intents.members = True
 bot = discord.Bot(intents=intents, auto_sync_commands=True)
 
 # ----------- 冥界資料管理之靈魂核心 (企業級重構版) -----------
+# SQLite 經濟後端：資料倉 -> (資料表, 值欄位, 鍵深度)；鍵深度 2 為 guild_id/user_id，1 為 guild_id
+ECONOMY_TABLES = {
+    "balance":       ("EconomyBalance",      "amount", 2),
+    "personal_bank": ("EconomyPersonalBank", "data",   2),
+    "credit":        ("EconomyCredit",       "data",   2),
+    "server_vault":  ("EconomyServerVault",  "data",   1),
+}
+
+# 冷資料倉：啟動時不解析，首次存取時才載入，並在 on_ready 後於背景預先載入
+COLD_STORES = ("blackjack_data", "invalid_bet_count", "bot_status", "dm_messages")
+
+# 資料倉檔案不存在時的初始內容 (未列出者為空字典)
+STORE_DEFAULTS = {
+    "bot_status": {"disconnect_count": 0, "reconnect_count": 0, "last_event_time": None},
+}
+
+_UNSET = object()
+
+
+class CompactRecord(MutableMapping):
+    """以 __slots__ 保存常用欄位的帳戶紀錄，對外仍表現為 dict (get / setdefault / [] / in)
+
+    每位玩家一個 dict 的額外開銷在數十萬筆帳戶時相當可觀；固定欄位改放在 slot 中，
+    不認識的欄位才會放進 _extra。複製 (deepcopy) 時會還原為一般 dict，方便序列化。
+    """
+    __slots__ = ("_extra",)
+    FIELDS = ()
+
+    def __init__(self, data=None):
+        for field in self.FIELDS:
+            setattr(self, field, _UNSET)
+        self._extra = None
+        if data:
+            self.update(data)
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is _UNSET:
+                raise KeyError(key)
+            return value
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return default if value is _UNSET else value
+        return default if self._extra is None else self._extra.get(key, default)
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELDS:
+            if getattr(self, key) is _UNSET:
+                raise KeyError(key)
+            setattr(self, key, _UNSET)
+        else:
+            if self._extra is None:
+                raise KeyError(key)
+            del self._extra[key]
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field) is not _UNSET:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+
+class UserConfigRecord(CompactRecord):
+    """user_config[guild_id][user_id]：職業、體力、背包與工作冷卻"""
+    __slots__ = FIELDS = ("job", "sub_job", "stamina", "max_stamina", "backpack", "work_cooldown")
+
+
+class CreditRecord(CompactRecord):
+    """credit[guild_id][user_id]：信用分數與回復時間"""
+    __slots__ = FIELDS = ("score", "last_time_recovery", "last_work_recovery")
+
+
+class RecordTable(dict):
+    """單一伺服器的帳戶表：寫入的 dict 會自動轉為 record_type"""
+    __slots__ = ("record_type",)
+
+    def __init__(self, record_type, data=None):
+        super().__init__()
+        self.record_type = record_type
+        if data:
+            self.update(data)
+
+    def _wrap(self, value):
+        if isinstance(value, dict) and not isinstance(value, RecordTable):
+            return self.record_type(value)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, self._wrap(value))
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+
+class AccountStore(RecordTable):
+    """guild_id -> RecordTable 的資料倉"""
+    __slots__ = ()
+
+    def _wrap(self, value):
+        if isinstance(value, dict) and not isinstance(value, RecordTable):
+            return RecordTable(self.record_type, value)
+        return value
+
+
+# 以精簡帳戶紀錄保存的資料倉
+COMPACT_STORES = {
+    "user_config": UserConfigRecord,
+    "credit": CreditRecord,
+}
+
+
+class StripedLocks:
+    """以帳戶鍵 (guild_id, user_id) 或伺服器鍵 (guild_id,) 分段的 asyncio 鎖
+
+    鍵會被雜湊到固定數量的鎖上，不相關的伺服器與玩家可以同時進行；
+    同時需要多個鍵時 (對戰、借貸、稅收) 一律依鎖的編號由小到大取得，避免互相等待而死鎖。
+    鎖不可重入：持有鎖的期間不要再對任何鍵呼叫 hold()。
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [asyncio.Lock() for _ in range(max(1, stripes))]
+
+    def _stripe(self, key) -> int:
+        if not isinstance(key, tuple):
+            key = (key,)
+        return hash(tuple(str(k) for k in key)) % len(self._locks)
+
+    @contextlib.asynccontextmanager
+    async def hold(self, *keys):
+        """取得所有鍵對應的鎖 (async with dm.locks.hold((guild_id, user_id), (guild_id,)))"""
+        acquired = []
+        try:
+            for index in sorted({self._stripe(key) for key in keys}):
+                await self._locks[index].acquire()
+                acquired.append(index)
+            yield
+        finally:
+            for index in reversed(acquired):
+                self._locks[index].release()
+
+    @contextlib.asynccontextmanager
+    async def hold_all(self):
+        """依序取得所有鎖 (資料還原等需要暫停所有帳戶操作的情境)"""
+        acquired = []
+        try:
+            for lock in self._locks:
+                await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+class LatencyHistogram:
+    """以對數刻度分桶的耗時分佈 (0.1 ms 起每桶加倍)，記憶體固定，可從任何執行緒記錄"""
+
+    BOUNDS = tuple(0.0001 * 2 ** i for i in range(22))
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+
+    def record(self, seconds: float, size: int = 0):
+        index = next((i for i, bound in enumerate(self.BOUNDS) if seconds <= bound), len(self.BOUNDS))
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.bytes += size
+
+    def percentile(self, q: float) -> float:
+        """回傳第 q 百分位所在分桶的上界 (最後一桶以最大值代替)"""
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "mean": self.total / self.count if self.count else 0.0,
+            "bytes": self.bytes,
+        }
+
+
+class IOMetrics:
+    """讀寫操作的耗時分佈：名稱 -> LatencyHistogram (例如 save_json、save:balance)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def record(self, name: str, seconds: float, size: int = 0):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(seconds, size)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._histograms.items())}
+
+    def log_summary(self, prefix: str = ""):
+        """將操作層級 (不含單一資料倉) 的分佈寫入日誌"""
+        for name, s in self.summary().items():
+            if ":" in name:
+                continue
+            logger.info(
+                f"⏱️ {prefix}{name}: {s['count']} 次，p50 {s['p50'] * 1000:.1f} ms / p95 {s['p95'] * 1000:.1f} ms / "
+                f"p99 {s['p99'] * 1000:.1f} ms / 最大 {s['max'] * 1000:.1f} ms，累計 {s['bytes'] / 1024:.1f} KiB"
+            )
+
+
+# _load_json 等靜態方法也會被指令直接呼叫，統計放在模組層級
+IO_METRICS = IOMetrics()
+
+
+class ConfigSnapshot:
+    """config.json 的一次解析結果與預先建立的索引 (建立後不再修改，重新載入時整份替換)"""
+    __slots__ = ("data", "mtime", "jobs", "shop_items", "shop_items_by_name", "fish", "fish_by_rarity")
+
+    def __init__(self, data: dict, mtime=None):
+        self.data = data
+        self.mtime = mtime
+
+        jobs = data.get("jobs", {})
+        # 舊版設定把職業表包在只有一個元素的陣列裡
+        if isinstance(jobs, list):
+            jobs = jobs[0] if jobs else {}
+        self.jobs = jobs if isinstance(jobs, dict) else {}
+
+        self.shop_items = [item for item in data.get("shop_item") or [] if isinstance(item, dict)]
+        self.shop_items_by_name = {item.get("name"): item for item in self.shop_items}
+
+        self.fish = [fish for fish in data.get("fish") or [] if isinstance(fish, dict)]
+        self.fish_by_rarity = {}
+        for fish in self.fish:
+            self.fish_by_rarity.setdefault(fish.get("rarity", "common").lower(), []).append(fish)
+
+
+class ConfigCache:
+    """共用的 config.json 快取：只解析一次，檔案 mtime 改變時自動重新載入"""
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot = ConfigSnapshot({})
+        self._last_check = monotonic()
+        self._failed_mtime = None
+        self.reload()
+
+    def current(self) -> ConfigSnapshot:
+        """取得目前的設定；每 check_interval 秒最多檢查一次檔案是否被修改"""
+        now = monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            # 同一個版本解析失敗過就不再重試，等檔案再次被修改
+            if mtime is not None and mtime not in (self._snapshot.mtime, self._failed_mtime):
+                self.reload()
+        return self._snapshot
+
+    def reload(self) -> bool:
+        """重新解析設定檔；失敗時保留舊的設定"""
+        mtime = None
+        try:
+            # 先取 mtime 再讀取，讀取途中若又被修改，下次檢查仍會發現
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f) or {}
+        except Exception as e:
+            self._failed_mtime = mtime
+            logger.error(f"無法載入設定檔 {self.path}，繼續使用目前的設定: {e}")
+            return False
+        snapshot = ConfigSnapshot(data, mtime)
+        self._snapshot = snapshot
+        logger.info(f"⚙️ 設定檔已載入：職業 {len(snapshot.jobs)} 種，商品 {len(snapshot.shop_items)} 項，魚種 {len(snapshot.fish)} 種")
+        return True
+
+
+def _deep_sizeof(obj, seen: set) -> int:
+    """粗估物件樹佔用的記憶體 (共用的物件只計算一次)"""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, Mapping):
+        for key, value in obj.items():
+            size += _deep_sizeof(key, seen) + _deep_sizeof(value, seen)
+        extra = getattr(obj, "_extra", None)
+        if extra:
+            size += sys.getsizeof(extra)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += _deep_sizeof(item, seen)
+    return size
+
+
+def _to_plain(obj):
+    """json.dumps 的 default：把精簡帳戶紀錄轉回 dict"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
 class SakuraDataManager:
     """管理幽幽子花園中的資料，猶如櫻瓣隨風飄舞 (企業級記憶體快取與雙重鎖保護)"""
     
@@ -97,58 +462,293 @@ class SakuraDataManager:
             os.makedirs(directory, exist_ok=True)
 
         # Locks 先設為 None，在 Event Loop 啟動後初始化 (相容 Python 3.10+)
-        self.balance_lock = None
+        self.locks = None
+        self.lock_stripes = int(os.getenv("LOCK_STRIPES", 64))
         self.save_lock = None
         
-        # 在線備份狀態標記
+        # 維護標記：為 True 時攔截修改類指令 (在線備份使用時間點快照，不再需要暫停指令)
         self.is_backing_up = False
 
-        # 1. Economy (經濟系統)
-        self._initialize_json(f"{self.economy_dir}/balance.json")
-        self.balance = self._load_json(f"{self.economy_dir}/balance.json")
+        # 背景寫入 (write-behind)：合併保存請求的窗口秒數與髒資料最長存活秒數
+        self.save_window = min(5.0, max(0.25, float(os.getenv("SAVE_COALESCE_WINDOW", 1.0))))
+        self.max_dirty_age = max(self.save_window, float(os.getenv("SAVE_MAX_DIRTY_AGE", 10.0)))
+        self._save_requested = None
+        self._flush_task = None
+        self._dirty_since = None
 
-        self._initialize_json(f"{self.economy_dir}/server_vault.json")
-        self.server_vault = self._load_json(f"{self.economy_dir}/server_vault.json")
-        
-        self._initialize_json(f"{self.economy_dir}/personal_bank.json")
-        self.personal_bank = self._load_json(f"{self.economy_dir}/personal_bank.json")
+        # 經濟資料的儲存後端：json (預設，整檔寫入) 或 sqlite (config/sakura_bot.db，逐列 UPSERT)
+        self.economy_backend = os.getenv("ECONOMY_BACKEND", "json").strip().lower()
+        if self.economy_backend not in ("json", "sqlite"):
+            logger.warning(f"⚠️ 未知的 ECONOMY_BACKEND={self.economy_backend}，改用 json")
+            self.economy_backend = "json"
 
-        self._initialize_json(f"{self.economy_dir}/credit.json")
-        self.credit = self._load_json(f"{self.economy_dir}/credit.json")
+        # 資料倉名稱 (即屬性名) -> (檔案路徑, 格式)
+        self.store_files = {
+            "balance":           (f"{self.economy_dir}/balance.json",              "json"),
+            "server_vault":      (f"{self.economy_dir}/server_vault.json",         "json"),
+            "personal_bank":     (f"{self.economy_dir}/personal_bank.json",        "json"),
+            "credit":            (f"{self.economy_dir}/credit.json",               "json"),
+            "blackjack_data":    (f"{self.game_state_dir}/blackjack.json",         "json"),
+            "invalid_bet_count": (f"{self.game_state_dir}/invalid_bets.json",      "json"),
+            "bot_status":        (f"{self.bot_state_dir}/bot_status.json",         "json"),
+            "dm_messages":       (f"{self.config_dir}/dm_messages.json",           "json"),
+            "fishingbackpack":   (f"{self.player_data_dir}/fishingbackpack.json",  "json"),
+            "user_config":       (f"{self.player_data_dir}/user_config.json",      "json"),
+        }
 
-        # 2. Game State (遊戲狀態)
-        self._initialize_json(f"{self.game_state_dir}/blackjack.json")
-        self.blackjack_data = self._load_json(f"{self.game_state_dir}/blackjack.json")
-        
-        self._initialize_json(f"{self.game_state_dir}/invalid_bets.json")
-        self.invalid_bet_count = self._load_json(f"{self.game_state_dir}/invalid_bets.json")
+        # 資料倉檔案的編碼：json (預設) 或 binary (附校驗和的快照，需自行啟用)；切換後舊檔會在載入時一次性轉換
+        try:
+            self.codec = get_codec(os.getenv("STORE_CODEC", "json"))
+        except ValueError as e:
+            logger.warning(f"⚠️ {e}，改用 json")
+            self.codec = CODECS["json"]
 
-        # 3. Bot State (Bot 狀態)
-        BOT_STATUS_DEFAULT = {"disconnect_count": 0, "reconnect_count": 0, "last_event_time": None}
-        self._initialize_json(f"{self.bot_state_dir}/bot_status.json", BOT_STATUS_DEFAULT)
-        self.bot_status = self._load_json(f"{self.bot_state_dir}/bot_status.json", BOT_STATUS_DEFAULT)
+        # 已停用的舊格式：store -> (舊檔案路徑, 格式)，載入時若仍存在會一次性轉換為新格式
+        # user_config 原為 YAML，PyYAML 的純 Python 解析與輸出是啟動與保存中最慢的一段
+        self.legacy_store_files = {
+            "user_config":   (f"{self.player_data_dir}/user_config.yml",       "yaml"),
+        }
+
+        # 以伺服器分片的資料倉：economy/balance/<guild_id>.json 等，寫入只會重寫被修改的伺服器檔案
+        self.sharded_stores = set()
+        if os.getenv("SHARDED_STORAGE", "1").strip().lower() not in ("0", "false", "no"):
+            self.sharded_stores = {"user_config"}
+            if self.economy_backend == "json":
+                self.sharded_stores |= {"balance", "server_vault", "personal_bank", "credit"}
+
+        self.db_path = os.path.join(self.config_dir, "sakura_bot.db")
+        # 整個程式共用的資料庫連線：一條寫入執行緒批次提交，讀取使用各執行緒的長期唯讀連線
+        self.db = SQLiteService(self.db_path, batch_size=int(os.getenv("SQLITE_WRITE_BATCH", 256)), metrics=IO_METRICS)
+        self._init_db()
 
-        self._initialize_json(f"{self.config_dir}/dm_messages.json")
-        self.dm_messages = self._load_json(f"{self.config_dir}/dm_messages.json")
+        # 交易日誌的背景寫入：指令只把紀錄放進緩衝區，由背景任務批次寫入 Transactions 資料表
+        self._txn_buffer = []
+        self._txn_requested = None
+        self._txn_task = None
+        self._import_legacy_transactions()
+
+        # 超過保留天數的交易移到不可變的 mmap 分段檔，熱資料表只保留近期紀錄
+        self.txn_archive = TransactionArchive(os.path.join(self.economy_dir, "transactions_archive"))
+        self.txn_archive_days = max(1, int(os.getenv("TXN_ARCHIVE_DAYS", 90)))
+        self.txn_segment_rows = max(1000, int(os.getenv("TXN_SEGMENT_ROWS", 1_000_000)))
+
+        # AI 對話的短期記憶 (UserMessages)：非永久訊息的保留分鐘數，由背景清掃任務分批刪除
+        self.message_retention_minutes = max(1.0, float(os.getenv("MESSAGE_RETENTION_MINUTES", 30)))
+        self.message_sweep_batch = max(100, int(os.getenv("MESSAGE_SWEEP_BATCH", 1000)))
+        # 刪除後的空間回收：incremental (預設，第一次空閒頁過多時完整 VACUUM 並切換為遞增回收)、full 或 off
+        self.vacuum_mode = os.getenv("DB_VACUUM_MODE", "incremental").strip().lower()
+        if self.vacuum_mode not in ("incremental", "full", "off"):
+            logger.warning(f"⚠️ 未知的 DB_VACUUM_MODE={self.vacuum_mode}，改用 incremental")
+            self.vacuum_mode = "incremental"
+        self.vacuum_free_ratio = min(0.9, max(0.01, float(os.getenv("DB_VACUUM_FREE_RATIO", 0.2))))
+        self.vacuum_pages = max(1, int(os.getenv("DB_VACUUM_PAGES", 2000)))
+        self._last_full_vacuum = None
+        self.retention_stats = {"runs": 0, "purged": 0, "batches": 0, "vacuums": 0, "last": None}
+
+        # 靜態設定 (職業、商品、魚種)：共用快取，修改 config.json 後會自動重新載入
+        self.config = ConfigCache(os.path.join(self.config_dir, "config.json"),
+                                  float(os.getenv("CONFIG_RELOAD_INTERVAL", 2.0)))
+
+        # 各資料倉的載入耗時與大小：store -> {"seconds": float, "bytes": int}
+        self.load_stats = {}
+        # 各資料倉最近一次寫入：store -> {"seconds": float, "at": epoch, "mode": "snapshot" | "log"}
+        self.save_stats = {}
+        # 讀寫耗時分佈 (p50/p95/p99) 定期寫入日誌的間隔秒數，0 代表不寫
+        self.io_metrics = IO_METRICS
+        self.metrics_log_interval = float(os.getenv("METRICS_LOG_INTERVAL", 3600))
+        self._last_metrics_log = monotonic()
+        self._prefetch_task = None
+
+        # 冷資料倉 (遊戲狀態、Bot 狀態、私訊紀錄) 延後到首次存取或 on_ready 後的背景預載
+        self.lazy_stores = set()
+        if os.getenv("LAZY_STORES", "1").strip().lower() not in ("0", "false", "no"):
+            self.lazy_stores = set(COLD_STORES)
+
+        # 1. Economy (經濟系統)
+        if self.economy_backend == "sqlite":
+            started = monotonic()
+            self._load_economy_from_db()
+            elapsed = monotonic() - started
+            # 經濟資料共用同一個資料庫檔案，無法分別計算大小
+            for store in ECONOMY_TABLES:
+                self.load_stats[store] = {"seconds": elapsed, "bytes": None}
+            logger.info(f"📂 經濟資料已自 SQLite 載入，耗時 {elapsed * 1000:.1f} ms")
+        else:
+            self.balance = self._timed_load("balance")
+            self.server_vault = self._timed_load("server_vault")
+            self.personal_bank = self._timed_load("personal_bank")
+            self.credit = self._timed_load("credit")
+
+        # 2. Game State / 3. Bot State (遊戲與 Bot 狀態)
+        for store in COLD_STORES:
+            if store not in self.lazy_stores:
+                setattr(self, store, self._timed_load(store))
 
         # 4. Player Data (玩家數據)
-        self._initialize_json(f"{self.player_data_dir}/fishingbackpack.json")
-        self.fishingbackpack = self._load_json(f"{self.player_data_dir}/fishingbackpack.json")
-        
-        self._initialize_yaml(f"{self.player_data_dir}/user_config.yml")
-        self.user_config = self._load_yaml(f"{self.player_data_dir}/user_config.yml")
+        self.fishingbackpack = self._timed_load("fishingbackpack")
+        self.user_config = self._timed_load("user_config")
+
+        # 髒標記：store -> 被修改的鍵路徑集合 (guild_id[, user_id])；None 代表整個資料倉
+        self._dirty = {}
+
+        # 寫時複製的資料倉版本：store -> 唯讀的樹，未修改的子樹在各版本之間共用
+        # _version_dirty 與 _dirty 結構相同，只追蹤已建立版本的資料倉，並在刷新版本時才被消耗
+        self._versions = {}
+        self._version_dirty = {}
+
+        # 變更日誌：檔案型資料倉的每次保存只追加被修改的項目，定期再壓實 (compaction) 回快照檔
+        self.mutation_log_path = os.path.join(self.data_dir, "mutations.log")
+        self.use_mutation_log = os.getenv("MUTATION_LOG", "1").strip().lower() not in ("0", "false", "no")
+        self.compact_interval = float(os.getenv("COMPACT_INTERVAL", 300))
+        self.compact_log_bytes = int(os.getenv("COMPACT_LOG_BYTES", 8 * 1024 * 1024))
+        self._pending_compaction = {}
+        self._last_compaction = monotonic()
+        self.restore_path = os.path.join(self.data_dir, "restore.pending")
+        self._apply_pending_restore()
+        if self.use_mutation_log:
+            self._replay_mutation_log()
 
         self.black_hole_users = set()
-        self._init_db()
+
+    def __getattr__(self, name: str):
+        # 只有在屬性不存在時才會被呼叫：冷資料倉於首次存取時同步載入
+        if name in COLD_STORES and name in self.__dict__.get("lazy_stores", ()):
+            data = self._timed_load(name)
+            setattr(self, name, data)
+            logger.info(f"📂 冷資料倉 {name} 已於首次存取時載入")
+            return data
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def is_loaded(self, store: str) -> bool:
+        """資料倉是否已載入記憶體 (不會觸發延遲載入)"""
+        return store in self.__dict__
+
+    def _store_disk_size(self, store: str) -> int:
+        """資料倉在磁碟上的大小 (分片資料倉為所有分片檔案的總和)"""
+        path = self._store_path(store)
+        shard_dir = self._shard_dir(store)
+        paths = [path]
+        if store in self.sharded_stores and os.path.isdir(shard_dir):
+            ext = os.path.splitext(path)[1]
+            paths = [os.path.join(shard_dir, name) for name in os.listdir(shard_dir) if name.endswith(ext)]
+        total = 0
+        for p in paths:
+            try:
+                total += os.path.getsize(p)
+            except OSError:
+                pass
+        return total
+
+    def _timed_load(self, store: str) -> dict:
+        """載入資料倉並記錄耗時與大小 (不會設定屬性，可在背景執行緒中呼叫)"""
+        started = monotonic()
+        self._convert_store_files(store)
+        data = self._compact_store(store, self._load_file_store(store))
+        elapsed = monotonic() - started
+        size = self._store_disk_size(store)
+        self.load_stats[store] = {"seconds": elapsed, "bytes": size}
+        IO_METRICS.record(f"load:{store}", elapsed, size)
+        logger.info(f"📂 {store} 載入完成：{size / 1024:.1f} KiB，耗時 {elapsed * 1000:.1f} ms")
+        return data
+
+    @staticmethod
+    def _compact_store(store: str, data: dict) -> dict:
+        """將資料倉中的帳戶轉為精簡紀錄 (只適用於 COMPACT_STORES)"""
+        record_type = COMPACT_STORES.get(store)
+        if record_type is None or not isinstance(data, dict):
+            return data
+        return AccountStore(record_type, data)
+
+    def start_prefetch(self):
+        """在背景執行緒中預先載入尚未載入的冷資料倉 (必須在事件循環中呼叫，重複呼叫無副作用)"""
+        if self._prefetch_task is not None:
+            return
+        self._prefetch_task = asyncio.create_task(self._prefetch_cold_stores())
+
+    async def _prefetch_cold_stores(self):
+        for store in COLD_STORES:
+            if self.is_loaded(store):
+                continue
+            try:
+                data = await asyncio.to_thread(self._timed_load, store)
+            except Exception as e:
+                logger.error(f"❌ 背景預載 {store} 失敗，將於首次存取時再試: {e}", exc_info=True)
+                continue
+            # 等待期間若已被首次存取同步載入，保留記憶體中的版本
+            if not self.is_loaded(store):
+                setattr(self, store, data)
+        logger.info("🌸 冷資料倉已全部於背景預載完成")
 
     def setup_locks(self):
         """在事件循環啟動後建立 Lock (必須在 async 環境中呼叫)"""
-        if self.balance_lock is None:
-            self.balance_lock = asyncio.Lock()
+        if self.locks is None:
+            self.locks = StripedLocks(self.lock_stripes)
         if self.save_lock is None:
             self.save_lock = asyncio.Lock()
         logger.info("🔒 asyncio.Lock 已在事件循環中初始化完畢")
 
+    def mark_dirty(self, store: str, *keys):
+        """標記資料倉已被修改，下次保存時只寫入被標記的資料倉
+
+        keys 為被修改項目的鍵路徑 (例如 guild_id, user_id)，省略時代表整個資料倉都需要寫入。
+        """
+        if store not in self.store_files:
+            logger.warning(f"⚠️ 未知的資料倉 {store}，忽略髒標記")
+            return
+        if not self._dirty:
+            self._dirty_since = monotonic()
+        path = {tuple(str(k) for k in keys)} if keys else None
+        self._merge_dirty(self._dirty, store, path)
+        if store in self._versions:
+            self._merge_dirty(self._version_dirty, store, path)
+
+    @staticmethod
+    def _merge_dirty(target: dict, store: str, keys):
+        """把一組髒鍵合併進 target (與 _dirty 相同結構)"""
+        if keys is None:
+            target[store] = None
+        elif target.setdefault(store, set()) is not None:
+            target[store] |= keys
+
+    def mark_all_dirty(self):
+        """將所有資料倉標記為需要完整寫入"""
+        if not self._dirty:
+            self._dirty_since = monotonic()
+        for store in self.store_files:
+            if not self.is_loaded(store):
+                continue
+            self._dirty[store] = None
+            if store in self._versions:
+                self._version_dirty[store] = None
+
+    def start_flusher(self):
+        """啟動背景寫入任務 (必須在事件循環中呼叫，重複呼叫無副作用)"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        self._save_requested = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"💾 背景寫入任務已啟動 (合併窗口 {self.save_window}s，最長延遲 {self.max_dirty_age}s)")
+
+    async def _flush_loop(self):
+        """等待保存請求，在窗口內合併連續的請求後一次寫入"""
+        while True:
+            await self._save_requested.wait()
+            while True:
+                self._save_requested.clear()
+                # 持續有請求時延後寫入，但髒資料存活不得超過 max_dirty_age
+                dirty_since = self._dirty_since if self._dirty_since is not None else monotonic()
+                timeout = min(self.save_window, dirty_since + self.max_dirty_age - monotonic())
+                if timeout <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._save_requested.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"背景寫入失敗: {e}", exc_info=True)
+
     async def check_backup_status(self, ctx_or_interaction, command_name: str) -> bool:
         """檢查是否正在備份。如果是，則攔截指令並回覆用戶。"""
         if self.is_backing_up:
@@ -195,102 +795,1046 @@ class SakuraDataManager:
     def _load_json(file_path: str, default: dict = None) -> dict:
         if default is None: default = {}
         try:
+            started = monotonic()
             with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f) or default
+                data = json.load(f) or default
+                IO_METRICS.record("load_json", monotonic() - started, f.tell())
+            return data
         except Exception as e:
             logger.error(f"無法載入 JSON 檔案 {file_path}: {e}")
             return default
 
     @staticmethod
-    def _save_json(file_path: str, data: dict):
+    def _save_json(file_path: str, data: dict) -> bool:
         try:
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            # 先寫暫存檔再原子替換，寫入中途崩潰也不會留下半截檔案
+            tmp_path = f"{file_path}.tmp"
+            started = monotonic()
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4, ensure_ascii=False, default=_to_plain)
+                size = f.tell()
+            os.replace(tmp_path, file_path)
+            IO_METRICS.record("save_json", monotonic() - started, size)
+            return True
         except Exception as e:
             logger.error(f"無法保存 JSON 檔案 {file_path}: {e}")
+            return False
+
+    @staticmethod
+    def _load_encoded(file_path: str, codec, default: dict = None) -> dict:
+        if default is None: default = {}
+        try:
+            started = monotonic()
+            with open(file_path, "rb") as f:
+                blob = f.read()
+            data = codec.loads(blob) or default
+            IO_METRICS.record(f"load_{codec.name}", monotonic() - started, len(blob))
+            return data
+        except Exception as e:
+            logger.error(f"無法載入 {codec.name} 檔案 {file_path}: {e}")
+            return default
+
+    @staticmethod
+    def _save_encoded(file_path: str, codec, data) -> bool:
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            # 先寫暫存檔再原子替換，寫入中途崩潰也不會留下半截檔案
+            tmp_path = f"{file_path}.tmp"
+            started = monotonic()
+            blob = codec.dumps(data)
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, file_path)
+            IO_METRICS.record(f"save_{codec.name}", monotonic() - started, len(blob))
+            return True
+        except Exception as e:
+            logger.error(f"無法保存 {codec.name} 檔案 {file_path}: {e}")
+            return False
 
     @staticmethod
     def _load_yaml(file_path: str, default: dict = None) -> dict:
         if default is None: default = {}
         try:
+            started = monotonic()
             with open(file_path, "r", encoding="utf-8") as f:
-                return yaml.safe_load(f) or default
+                data = yaml.safe_load(f) or default
+                IO_METRICS.record("load_yaml", monotonic() - started, f.tell())
+            return data
         except Exception as e:
             logger.error(f"無法載入 YAML 檔案 {file_path}: {e}")
             return default
 
     @staticmethod
-    def _save_yaml(file_path: str, data: dict):
+    def _save_yaml(file_path: str, data: dict) -> bool:
         try:
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            with open(file_path, "w", encoding="utf-8") as f:
+            tmp_path = f"{file_path}.tmp"
+            started = monotonic()
+            with open(tmp_path, "w", encoding="utf-8") as f:
                 yaml.safe_dump(data, f, allow_unicode=True)
+                size = f.tell()
+            os.replace(tmp_path, file_path)
+            IO_METRICS.record("save_yaml", monotonic() - started, size)
+            return True
         except Exception as e:
             logger.error(f"無法保存 YAML 檔案 {file_path}: {e}")
+            return False
+
+    def _shard_dir(self, store: str) -> str:
+        return os.path.splitext(self.store_files[store][0])[0]
+
+    def _store_path(self, store: str) -> str:
+        """資料倉實際使用的檔案路徑：JSON 類資料倉的副檔名由目前的編碼 (STORE_CODEC) 決定"""
+        path, fmt = self.store_files[store]
+        if fmt == "yaml":
+            return path
+        return os.path.splitext(path)[0] + self.codec.ext
+
+    def _read_file(self, file_path: str, default=None):
+        """依副檔名讀取資料檔 (YAML、JSON 或二進位快照)，失敗時回傳 default"""
+        if file_path.endswith((".yml", ".yaml")):
+            return self._load_yaml(file_path, default)
+        return self._load_encoded(file_path, codec_for_path(file_path) or self.codec, default)
+
+    def _write_file(self, file_path: str, data) -> bool:
+        """依副檔名寫入資料檔 (原子替換)"""
+        if file_path.endswith((".yml", ".yaml")):
+            return self._save_yaml(file_path, data)
+        return self._save_encoded(file_path, codec_for_path(file_path) or self.codec, data)
+
+    def _load_file_store(self, store: str, sharded: bool = None) -> dict:
+        """載入以檔案保存的資料倉；分片資料倉若仍是單一檔案，會先遷移為每個伺服器一個檔案
+
+        找不到目前編碼的檔案時，會改讀其他編碼的同名檔案 (雙讀)，例如切換 STORE_CODEC 後尚未轉換的舊檔。
+        """
+        path = self._store_path(store)
+        if sharded is None:
+            sharded = store in self.sharded_stores
+        if not sharded:
+            default = STORE_DEFAULTS.get(store)
+            existing = self._find_store_file(path)
+            if existing is None:
+                self._write_file(path, copy.deepcopy(default) if default is not None else {})
+                logger.info(f"已創建資料檔: {path}")
+                existing = path
+            return self._read_file(existing, copy.deepcopy(default))
+
+        shard_dir = self._shard_dir(store)
+        if not os.path.isdir(shard_dir):
+            existing = self._find_store_file(path)
+            # 遷移後原檔會被改名，讀取失敗時必須中止，不能以空資料建立分片
+            data = (self._strict_read(existing) or {}) if existing else {}
+            self._migrate_to_shards(store, data)
+            return data
+
+        return self._read_shard_dir(path, shard_dir)
+
+    def _read_shard_dir(self, path: str, shard_dir: str) -> dict:
+        ext = os.path.splitext(path)[1]
+        shards = {}
+        for name in os.listdir(shard_dir):
+            codec = codec_for_path(name)
+            if codec is None:
+                continue
+            guild_id = name[:-len(codec.ext)]
+            # 同一個伺服器同時有多種編碼時以目前的編碼為準
+            if guild_id not in shards or codec.ext == ext:
+                shards[guild_id] = os.path.join(shard_dir, name)
+        return {guild_id: self._read_file(shard_path) for guild_id, shard_path in shards.items()}
+
+    def read_store_file(self, store: str) -> dict:
+        """直接讀取資料倉在磁碟上的內容 (不載入記憶體，也不建立、遷移或轉換檔案)，可在背景執行緒中呼叫
+
+        供備份讀取尚未載入的冷資料倉：未載入代表沒有未寫回的修改，磁碟上的檔案就是目前的內容。
+        """
+        path = self._store_path(store)
+        shard_dir = self._shard_dir(store)
+        if store in self.sharded_stores and os.path.isdir(shard_dir):
+            return self._read_shard_dir(path, shard_dir)
+        default = STORE_DEFAULTS.get(store)
+        existing = self._find_store_file(path)
+        if existing is None:
+            return copy.deepcopy(default) if default is not None else {}
+        return self._read_file(existing, copy.deepcopy(default))
+
+    @staticmethod
+    def _find_store_file(path: str):
+        """回傳 path 本身，或其他編碼的同名檔案；都不存在時回傳 None"""
+        if os.path.exists(path):
+            return path
+        base = os.path.splitext(path)[0]
+        for codec in CODECS.values():
+            if os.path.exists(base + codec.ext):
+                return base + codec.ext
+        return None
+
+    def _write_verified(self, file_path: str, data):
+        """寫入後以嚴格讀取讀回並比對內容；不一致時中止，呼叫端不可在此之前改名原檔"""
+        if not self._write_file(file_path, data):
+            raise RuntimeError(f"無法寫入 {file_path}")
+        if self._strict_read(file_path) != snapshot_codec.canonical(data):
+            logger.critical(f"❌ {file_path} 讀回的內容與原始資料不一致，已中止轉換 (原檔保持不動)")
+            raise RuntimeError(f"{file_path} 往返檢查失敗")
+
+    def _convert_file(self, old_path: str, new_path: str):
+        """將舊檔案轉為新路徑的格式，往返檢查通過後才把舊檔改名為 .migrated
+
+        新檔案已存在時 (上次轉換在改名前中斷) 以新檔案為準，但仍須能完整讀取才會改名舊檔。
+        """
+        if os.path.exists(new_path):
+            self._strict_read(new_path)
+        else:
+            self._write_verified(new_path, self._strict_read(old_path))
+        os.replace(old_path, f"{old_path}.migrated")
+
+    def _convert_store_files(self, store: str):
+        """一次性轉換資料倉的舊檔案，讓之後的讀寫只面對目前的格式：
+
+        1. legacy_store_files 中的舊格式 (例如 user_config.yml)
+        2. 切換 STORE_CODEC 後留下的其他編碼檔案 (例如 .json -> .ysnap)
+        單一檔案與分片目錄中的分片都會被轉換；中途中斷時，下次啟動會繼續轉換。
+        """
+        path = self._store_path(store)
+        ext = os.path.splitext(path)[1]
+        shard_dir = self._shard_dir(store)
+        sharded = store in self.sharded_stores
+        old_files = []
+        legacy = self.legacy_store_files.get(store)
+        if legacy is not None:
+            old_files.append(legacy[0])
+        if self.store_files[store][1] != "yaml":
+            old_files.extend(os.path.splitext(path)[0] + codec.ext for codec in CODECS.values() if codec.ext != ext)
+
+        started = monotonic()
+        converted = 0
+        for old_path in old_files:
+            if not os.path.exists(old_path):
+                continue
+            if sharded:
+                # 分片目錄已存在時，單一舊檔只是切換分片設定前的殘留
+                if not os.path.isdir(shard_dir) or not os.listdir(shard_dir):
+                    self._migrate_to_shards(store, self._strict_read(old_path) or {})
+                # _migrate_to_shards 可能已經把同名的舊檔改名
+                if os.path.exists(old_path):
+                    os.replace(old_path, f"{old_path}.migrated")
+            else:
+                self._convert_file(old_path, path)
+            converted += 1
+
+        old_exts = {os.path.splitext(p)[1] for p in old_files} - {ext}
+        if sharded and old_exts and os.path.isdir(shard_dir):
+            for name in os.listdir(shard_dir):
+                old_ext = next((e for e in old_exts if name.endswith(e)), None)
+                if old_ext is None:
+                    continue
+                self._convert_file(os.path.join(shard_dir, name),
+                                   os.path.join(shard_dir, name[:-len(old_ext)] + ext))
+                converted += 1
+
+        if converted:
+            logger.info(f"📦 已將 {store} 的 {converted} 個舊格式檔案轉換為 {ext} "
+                        f"(耗時 {monotonic() - started:.2f}s)，原檔保留為 .migrated")
+
+    @staticmethod
+    def _strict_read(file_path: str):
+        """讀取失敗時中止 (不使用會回傳預設值的 _load_*)，避免把空資料寫成新檔後丟掉舊檔"""
+        try:
+            if file_path.endswith((".yml", ".yaml")):
+                with open(file_path, "r", encoding="utf-8") as f:
+                    return yaml.safe_load(f) or {}
+            return snapshot_codec.read_file(file_path)
+        except Exception as e:
+            logger.critical(f"❌ 無法讀取 {file_path}，為避免遺失資料已中止轉換，請修復後重新啟動: {e}")
+            raise
+
+    def _migrate_to_shards(self, store: str, data: dict):
+        """單一檔案 -> 分片目錄：先寫入暫存目錄再整個改名，中途中斷時原檔仍完整可用
+
+        每個分片寫入後都會讀回比對，全部通過才會啟用分片目錄並改名原檔。
+        """
+        if not isinstance(data, dict):
+            logger.critical(f"❌ {store} 的原始資料不是以伺服器為鍵的物件，已中止分片遷移")
+            raise ValueError(f"{store} 的資料格式不正確，無法拆分為分片")
+        path = self._store_path(store)
+        shard_dir = self._shard_dir(store)
+        tmp_dir = f"{shard_dir}.migrating"
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        ext = os.path.splitext(path)[1]
+        for guild_id, guild_data in data.items():
+            self._write_verified(os.path.join(tmp_dir, f"{guild_id}{ext}"), guild_data)
+        os.replace(tmp_dir, shard_dir)
+        existing = self._find_store_file(path)
+        if existing:
+            os.replace(existing, f"{existing}.migrated")
+            logger.info(f"📦 已將 {existing} 拆分為 {len(data)} 個伺服器分片 ({shard_dir})，原檔保留為 {existing}.migrated")
 
     def _init_db(self):
-        self.db_path = os.path.join(self.config_dir, "sakura_bot.db")
         try:
-            with sqlite3.connect(self.db_path, check_same_thread=False) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''CREATE TABLE IF NOT EXISTS UserMessages (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT, message TEXT, repeat_count INTEGER DEFAULT 0, is_permanent BOOLEAN DEFAULT FALSE, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-                cursor.execute('''CREATE TABLE IF NOT EXISTS BackgroundInfo (user_id TEXT PRIMARY KEY, info TEXT)''')
-                conn.commit()
-                logger.info("已初始化 SQLite 資料庫")
+            previous, current = self.db.write_sync(self._create_tables)
+            if previous != current:
+                logger.info(f"已初始化 SQLite 資料庫 (結構版本 {previous} → {current})")
+            else:
+                logger.info(f"已初始化 SQLite 資料庫 (結構版本 {current})")
         except sqlite3.Error as e:
             logger.error(f"無法初始化資料庫: {e}")
 
-    def _save_snapshot(self, snapshot: dict):
-        """將快照資料寫入檔案 (純同步，供 save_all_async 使用)"""
-        self._save_json(f"{self.economy_dir}/balance.json",               snapshot["balance"])
-        self._save_json(f"{self.economy_dir}/server_vault.json",          snapshot["server_vault"])
-        self._save_json(f"{self.economy_dir}/personal_bank.json",         snapshot["personal_bank"])
-        self._save_json(f"{self.economy_dir}/credit.json",                snapshot["credit"])
-        self._save_json(f"{self.game_state_dir}/blackjack.json",          snapshot["blackjack_data"])
-        self._save_json(f"{self.game_state_dir}/invalid_bets.json",       snapshot["invalid_bet_count"])
-        self._save_json(f"{self.bot_state_dir}/bot_status.json",          snapshot["bot_status"])
-        self._save_json(f"{self.config_dir}/dm_messages.json",            snapshot["dm_messages"])
-        self._save_json(f"{self.player_data_dir}/fishingbackpack.json",   snapshot["fishingbackpack"])
-        self._save_yaml(f"{self.player_data_dir}/user_config.yml",        snapshot["user_config"])
+    def _create_tables(self, conn: sqlite3.Connection) -> tuple:
+        """套用版本化遷移 (db_migrations)，再建立目前經濟後端需要的表格；整個過程在同一個交易中"""
+        versions = db_migrations.migrate(conn)
+        cursor = conn.cursor()
+        if self.economy_backend == "sqlite":
+            for table, column, depth in ECONOMY_TABLES.values():
+                column_type = "REAL" if column == "amount" else "TEXT"
+                if depth == 2:
+                    cursor.execute(f'''CREATE TABLE IF NOT EXISTS {table} (guild_id TEXT NOT NULL, user_id TEXT NOT NULL, {column} {column_type}, PRIMARY KEY (guild_id, user_id)) WITHOUT ROWID''')
+                else:
+                    cursor.execute(f'''CREATE TABLE IF NOT EXISTS {table} (guild_id TEXT PRIMARY KEY, {column} {column_type})''')
+        return versions
+
+    def _load_economy_from_db(self):
+        """從 SQLite 載入經濟資料；首次啟用時自動從既有 JSON 檔匯入一次"""
+        try:
+            imported = self.db.fetchone("SELECT value FROM StorageMeta WHERE key = 'economy_imported_at'")
+            if imported is None:
+                self._import_economy_from_json()
+            for store, data in self.db.read(self._read_economy_tables).items():
+                setattr(self, store, self._compact_store(store, data))
+            logger.info(f"已從 SQLite 載入經濟資料 ({len(self.balance)} 個伺服器)")
+        except sqlite3.Error as e:
+            logger.critical(f"無法從 SQLite 載入經濟資料: {e}")
+            raise
+
+    @staticmethod
+    def _read_economy_tables(conn: sqlite3.Connection) -> dict:
+        stores = {}
+        for store, (table, column, depth) in ECONOMY_TABLES.items():
+            data = stores[store] = {}
+            if depth == 2:
+                for guild_id, user_id, value in conn.execute(f"SELECT guild_id, user_id, {column} FROM {table}"):
+                    data.setdefault(guild_id, {})[user_id] = value if column == "amount" else json.loads(value)
+            else:
+                for guild_id, value in conn.execute(f"SELECT guild_id, {column} FROM {table}"):
+                    data[guild_id] = json.loads(value)
+        return stores
+
+    def _import_economy_from_json(self):
+        """一次性匯入：把 economy/*.json 的內容搬進 SQLite (原 JSON 檔保留不動)"""
+        changes = {}
+        for store in ECONOMY_TABLES:
+            data = self._load_file_store(store, sharded=os.path.isdir(self._shard_dir(store)))
+            changes[store] = {"replace": [()], "upsert": self._economy_rows(store, data, [()])["upsert"], "delete": []}
+
+        def write(conn):
+            for store, change in changes.items():
+                self._write_economy_rows(conn, store, change)
+            conn.execute("INSERT OR REPLACE INTO StorageMeta (key, value) VALUES ('economy_imported_at', ?)", (str(time()),))
+
+        self.db.write_sync(write)
+        counts = {store: len(change["upsert"]) for store, change in changes.items()}
+        logger.info(f"📦 已將經濟 JSON 匯入 SQLite: {counts}")
+
+    @staticmethod
+    def _economy_rows(store: str, data: dict, keys) -> dict:
+        """將髒鍵轉換為 SQLite 列變更 (在 save_lock 內呼叫，值會序列化成獨立副本)
+
+        keys 為鍵路徑列表；空路徑 () 代表整個資料倉，(guild_id,) 代表整個伺服器。
+        """
+        table, column, depth = ECONOMY_TABLES[store]
+        encode = (lambda v: float(v)) if column == "amount" else (lambda v: json.dumps(v, ensure_ascii=False, default=_to_plain))
+        change = {"replace": [], "upsert": [], "delete": []}
+        for key in keys:
+            key = key[:depth]
+            if not key:
+                change["replace"].append(())
+                scopes = [(g,) for g in data]
+            elif len(key) < depth:
+                change["replace"].append(key)
+                scopes = [key]
+            else:
+                scopes = None
+            if scopes is not None:
+                for (guild_id,) in scopes:
+                    guild_data = data.get(guild_id)
+                    if guild_data is None:
+                        continue
+                    if depth == 1:
+                        change["upsert"].append((guild_id, encode(guild_data)))
+                    else:
+                        change["upsert"].extend((guild_id, user_id, encode(v)) for user_id, v in guild_data.items())
+                continue
+            value = data.get(key[0], {}) if depth == 2 else data
+            value = value.get(key[-1]) if isinstance(value, dict) else None
+            if value is None:
+                change["delete"].append(key)
+            else:
+                change["upsert"].append((*key, encode(value)))
+        return change
+
+    @classmethod
+    def _write_economy_changes(cls, conn: sqlite3.Connection, changes: dict):
+        for store, change in changes.items():
+            cls._write_economy_rows(conn, store, change)
+
+    @staticmethod
+    def _write_economy_rows(conn: sqlite3.Connection, store: str, change: dict):
+        table, column, depth = ECONOMY_TABLES[store]
+        for scope in change["replace"]:
+            if scope:
+                conn.execute(f"DELETE FROM {table} WHERE guild_id = ?", scope)
+            else:
+                conn.execute(f"DELETE FROM {table}")
+        if change["delete"]:
+            where = "guild_id = ? AND user_id = ?" if depth == 2 else "guild_id = ?"
+            conn.executemany(f"DELETE FROM {table} WHERE {where}", change["delete"])
+        if change["upsert"]:
+            if depth == 2:
+                conn.executemany(
+                    f"INSERT INTO {table} (guild_id, user_id, {column}) VALUES (?, ?, ?) "
+                    f"ON CONFLICT(guild_id, user_id) DO UPDATE SET {column} = excluded.{column}",
+                    change["upsert"])
+            else:
+                conn.executemany(
+                    f"INSERT INTO {table} (guild_id, {column}) VALUES (?, ?) "
+                    f"ON CONFLICT(guild_id) DO UPDATE SET {column} = excluded.{column}",
+                    change["upsert"])
+
+    def store_version(self, store: str) -> dict:
+        """取得資料倉目前的唯讀版本 (必須在事件循環的執行緒中呼叫)
+
+        只有自上次取版本以來被 mark_dirty 標記的路徑會被重新複製，並以路徑複製 (path copying)
+        產生新的根節點；未修改的子樹與舊版本共用，因此成本只與修改量相關。
+        回傳的版本之後不會再被修改，可以安全地交給其他執行緒讀取。
+        """
+        live = getattr(self, store)
+        version = self._versions.get(store)
+        if version is None or self._version_dirty.get(store, ()) is None:
+            # 首次取用或整個資料倉被標記時才完整複製一次
+            self._version_dirty.pop(store, None)
+            version = copy.deepcopy(live)
+            self._versions[store] = version
+            return version
+
+        paths = self._version_dirty.pop(store, None)
+        if not paths:
+            return version
+        version = dict(version)
+        for path in paths:
+            new_node, live_node = version, live
+            for depth, k in enumerate(path):
+                last = depth == len(path) - 1
+                if not isinstance(live_node, dict) or k not in live_node:
+                    new_node.pop(k, None)
+                    break
+                live_node = live_node[k]
+                if last or not isinstance(live_node, dict):
+                    new_node[k] = copy.deepcopy(live_node)
+                    break
+                # 沿路徑複製容器，不影響共用這個子樹的舊版本
+                child = new_node.get(k)
+                child = dict(child) if isinstance(child, dict) else {}
+                new_node[k] = child
+                new_node = child
+        self._versions[store] = version
+        return version
+
+    def snapshot(self, stores=None) -> dict:
+        """取得多個資料倉在同一時間點的唯讀版本，供備份等背景工作在其他執行緒中讀取"""
+        return {store: self.store_version(store) for store in (stores or self.store_files)}
+
+    def _snapshot_store(self, store: str, keys):
+        """在 save_lock 內擷取單一資料倉的待寫內容：SQLite 後端只取被修改的列，其餘取寫時複製的版本"""
+        if self.economy_backend == "sqlite" and store in ECONOMY_TABLES:
+            # 列變更在擷取時就已序列化，不需要另外維護版本
+            return self._economy_rows(store, getattr(self, store), [()] if keys is None else keys)
+        data = self.store_version(store)
+        if store in self.sharded_stores:
+            # 分片資料倉只寫入被修改的伺服器；值為 None 代表該伺服器已被移除
+            if keys is None:
+                return {"full": True, "shards": data}
+            guild_ids = {key[0] for key in keys}
+            return {"full": False, "shards": {g: data.get(g) for g in guild_ids}}
+        return data
+
+    def _save_snapshot(self, snapshot: dict) -> list:
+        """將快照資料寫入檔案 (純同步，供 save_all_async 使用)，只寫入快照中包含的資料倉
+
+        回傳寫入失敗的資料倉名稱，供呼叫端重新標記為髒。
+        """
+        snapshot_started = monotonic()
+        failed = []
+        economy_changes = {}
+        for store, data in snapshot.items():
+            if self.economy_backend == "sqlite" and store in ECONOMY_TABLES:
+                economy_changes[store] = data
+                continue
+            started = monotonic()
+            if store in self.sharded_stores:
+                saved = self._save_shards(store, data)
+            else:
+                saved = self._write_file(self._store_path(store), data)
+            if not saved:
+                failed.append(store)
+            else:
+                self._record_save(store, monotonic() - started, "snapshot")
+
+        if economy_changes:
+            # 同一次保存的經濟變更放在同一個交易中，例如借貸會同時改動國庫、餘額與私人銀行
+            try:
+                started = monotonic()
+                self.db.write_sync(self._write_economy_changes, economy_changes)
+                for store in economy_changes:
+                    self._record_save(store, monotonic() - started, "sqlite")
+            except sqlite3.Error as e:
+                logger.error(f"無法寫入 SQLite 經濟資料: {e}")
+                failed.extend(economy_changes)
+        IO_METRICS.record("save_snapshot", monotonic() - snapshot_started)
+        return failed
+
+    def _record_save(self, store: str, seconds: float, mode: str):
+        self.save_stats[store] = {"seconds": seconds, "at": time(), "mode": mode}
+        IO_METRICS.record(f"save:{store}", seconds)
+
+    def _save_shards(self, store: str, snapshot: dict) -> bool:
+        shard_dir = self._shard_dir(store)
+        ext = os.path.splitext(self._store_path(store))[1]
+        ok = True
+        for guild_id, guild_data in snapshot["shards"].items():
+            shard_path = os.path.join(shard_dir, f"{guild_id}{ext}")
+            if guild_data is None:
+                ok = self._remove_file(shard_path) and ok
+            elif not self._write_file(shard_path, guild_data):
+                ok = False
+        if snapshot["full"] and os.path.isdir(shard_dir):
+            for name in os.listdir(shard_dir):
+                if name.endswith(ext) and name[:-len(ext)] not in snapshot["shards"]:
+                    ok = self._remove_file(os.path.join(shard_dir, name)) and ok
+        return ok
+
+    @staticmethod
+    def _remove_file(file_path: str) -> bool:
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            return True
+        except OSError as e:
+            logger.error(f"無法刪除檔案 {file_path}: {e}")
+            return False
+
+    def _uses_mutation_log(self, store: str) -> bool:
+        # SQLite 後端本身就是逐列寫入，不需要再經過變更日誌
+        return self.use_mutation_log and not (self.economy_backend == "sqlite" and store in ECONOMY_TABLES)
+
+    def _mutation_records(self, store: str, keys) -> list:
+        """在 save_lock 內把髒鍵序列化為日誌行 (序列化即快照，成本只與修改量相關)"""
+        data = getattr(self, store)
+        now = time()
+        lines = []
+        for key in ([()] if keys is None else keys):
+            node, found = data, True
+            for k in key:
+                if isinstance(node, dict) and k in node:
+                    node = node[k]
+                else:
+                    found = False
+                    break
+            record = {"t": now, "s": store, "k": list(key)}
+            if found:
+                record["v"] = node
+            else:
+                record["d"] = 1
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_to_plain))
+        return lines
+
+    def _append_mutation_log(self, lines: list) -> bool:
+        try:
+            started = monotonic()
+            payload = ("\n".join(lines) + "\n").encode("utf-8")
+            with open(self.mutation_log_path, "ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            IO_METRICS.record("append_log", monotonic() - started, len(payload))
+            return True
+        except OSError as e:
+            logger.error(f"無法寫入變更日誌 {self.mutation_log_path}: {e}")
+            return False
+
+    def _truncate_mutation_log(self):
+        try:
+            with open(self.mutation_log_path, "w", encoding="utf-8") as f:
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logger.error(f"無法清空變更日誌 {self.mutation_log_path}: {e}")
+
+    def _apply_pending_restore(self):
+        """套用離線還原工具 (backup_tool.py restore) 留下的還原檔：整份取代資料倉後寫回"""
+        if not os.path.exists(self.restore_path):
+            return
+        started = monotonic()
+        # 還原點取代一切，還原前尚未壓實的變更一併捨棄
+        self._truncate_mutation_log()
+        if not self._replay_log_file(self.restore_path, "還原檔"):
+            logger.critical(f"❌ 無法套用還原檔 {self.restore_path}，請檢查後重新啟動")
+            raise RuntimeError("pending restore could not be applied")
+        os.remove(self.restore_path)
+        logger.info(f"♻️ 已套用離線還原 (耗時 {monotonic() - started:.2f}s)")
+
+    def _replay_mutation_log(self):
+        """啟動時將上次壓實後的變更重新套用到快照上，並立即壓實"""
+        if os.path.exists(self.mutation_log_path) and self._replay_log_file(self.mutation_log_path, "變更日誌"):
+            self._truncate_mutation_log()
+
+    def _replay_log_file(self, path: str, label: str) -> bool:
+        """將日誌格式的檔案套用到記憶體並寫回快照，成功 (或無內容) 時回傳 True"""
+        replayed = {}
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    store, key = record["s"], tuple(record["k"])
+                except (ValueError, KeyError):
+                    # 崩潰時最後一行可能只寫了一半
+                    logger.warning(f"⚠️ 略過損毀的{label} (第 {line_no} 行)")
+                    continue
+                if store not in self.store_files:
+                    continue
+                if not key:
+                    setattr(self, store, self._compact_store(store, record.get("v", {})))
+                else:
+                    node = getattr(self, store)
+                    for k in key[:-1]:
+                        node = node.setdefault(k, {})
+                    if "v" in record:
+                        node[key[-1]] = record["v"]
+                    else:
+                        node.pop(key[-1], None)
+                self._merge_dirty(replayed, store, None if not key else {key})
+                count += 1
+        if count:
+            failed = self._save_snapshot({store: self._snapshot_store(store, keys) for store, keys in replayed.items()})
+            if failed:
+                logger.error(f"重放{label}後無法寫回快照: {failed}，保留檔案")
+                return False
+            logger.info(f"♻️ 已重放 {count} 筆{label}並寫回快照")
+        return True
+
+    def _compaction_due(self) -> bool:
+        if not self._pending_compaction:
+            return False
+        if monotonic() - self._last_compaction >= self.compact_interval:
+            return True
+        try:
+            return os.path.getsize(self.mutation_log_path) >= self.compact_log_bytes
+        except OSError:
+            return False
+
+    async def _compact_locked(self):
+        """將日誌中累積的變更寫回快照檔並清空日誌 (呼叫端必須持有 save_lock)"""
+        pending, self._pending_compaction = self._pending_compaction, {}
+        started = monotonic()
+        snapshot = {store: self._snapshot_store(store, keys) for store, keys in pending.items()}
+        IO_METRICS.record("capture", monotonic() - started)
+        failed = await asyncio.to_thread(self._save_snapshot, snapshot)
+        self._last_compaction = monotonic()
+        if failed:
+            # 日誌仍完整保留，下次再試
+            for store in failed:
+                self._merge_dirty(self._pending_compaction, store, None)
+            return
+        await asyncio.to_thread(self._truncate_mutation_log)
+        logger.info(f"🗜️ 變更日誌已壓實: {', '.join(snapshot)}")
+
+    async def compact(self):
+        """立即壓實變更日誌"""
+        if self.save_lock is None:
+            self.save_all()
+            return
+        async with self.save_lock:
+            if self._pending_compaction:
+                await self._compact_locked()
 
     def save_all(self):
-        """將所有資料封存 (同步版本)"""
-        self._save_snapshot({
-            "balance":           self.balance,
-            "server_vault":      self.server_vault,
-            "personal_bank":     self.personal_bank,
-            "credit":            self.credit,
-            "blackjack_data":    self.blackjack_data,
-            "invalid_bet_count": self.invalid_bet_count,
-            "bot_status":        self.bot_status,
-            "dm_messages":       self.dm_messages,
-            "fishingbackpack":   self.fishingbackpack,
-            "user_config":       self.user_config
-        })
+        """將所有資料封存 (同步版本，無論髒標記與否都完整寫入，並清空變更日誌)"""
+        if self._txn_buffer and self._write_transactions(self._txn_buffer):
+            self._txn_buffer = []
+        # 完整寫入時捨棄舊版本重新複製，作為漏掉 mark_dirty 的修改的最後保險
+        self._versions.clear()
+        self._version_dirty.clear()
+        # 尚未載入的冷資料倉沒有任何修改，不需要寫回
+        failed = self._save_snapshot({store: self._snapshot_store(store, None)
+                                      for store in self.store_files if self.is_loaded(store)})
+        self._dirty.clear()
+        self._dirty_since = None
+        if self.use_mutation_log and not failed:
+            self._pending_compaction.clear()
+            self._truncate_mutation_log()
+
+    def record_transaction(self, guild_id, user_id, amount: float, transaction_type: str, **details):
+        """記錄一筆經濟交易 (不等待磁碟 I/O，必須在事件循環中呼叫)
+
+        details 為額外欄位 (例如 item、quantity)，會以 JSON 保存。
+        """
+        self._txn_buffer.append((str(guild_id), str(user_id), float(amount), transaction_type, time(),
+                                 json.dumps(details, ensure_ascii=False) if details else None))
+        if self._txn_task is None or self._txn_task.done():
+            self._txn_requested = asyncio.Event()
+            self._txn_task = asyncio.create_task(self._transaction_writer())
+        self._txn_requested.set()
+
+    async def _transaction_writer(self):
+        while True:
+            await self._txn_requested.wait()
+            self._txn_requested.clear()
+            await self.flush_transactions()
+
+    async def flush_transactions(self):
+        """把緩衝區中的交易一次寫入資料庫；失敗時放回緩衝區等待下次重試"""
+        if not self._txn_buffer:
+            return
+        batch, self._txn_buffer = self._txn_buffer, []
+        try:
+            await self.db.write(self._insert_transactions, batch)
+        except sqlite3.Error as e:
+            logger.error(f"❌ 交易記錄寫入失敗 ({len(batch)} 筆，稍後重試): {e}")
+            self._txn_buffer[:0] = batch
+
+    @staticmethod
+    def _insert_transactions(conn: sqlite3.Connection, rows: list):
+        conn.executemany(
+            "INSERT INTO Transactions (guild_id, user_id, amount, type, ts, details) VALUES (?, ?, ?, ?, ?, ?)",
+            rows)
+
+    def _write_transactions(self, rows: list) -> bool:
+        """同步寫入交易 (關機保存與舊資料匯入使用)"""
+        try:
+            self.db.write_sync(self._insert_transactions, rows)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"❌ 交易記錄寫入失敗 ({len(rows)} 筆，稍後重試): {e}")
+            return False
+
+    def query_transactions(self, guild_id, user_id, transaction_type: str = None, since: float = None,
+                           until: float = None, before: tuple = None, limit: int = 10) -> list:
+        """由新到舊查詢某用戶的交易紀錄 (同步，請以 asyncio.to_thread 呼叫)
+
+        before 為上一頁最後一筆的 (ts, id)，以索引位置接續翻頁，不需要 OFFSET 掃過前面的紀錄。
+        近期紀錄來自 Transactions 資料表，舊紀錄來自封存分段檔，兩者依 (ts, id) 合併。
+        """
+        sql = "SELECT id, amount, type, ts, details FROM Transactions WHERE guild_id = ? AND user_id = ?"
+        params = [str(guild_id), str(user_id)]
+        if transaction_type:
+            sql += " AND type = ?"
+            params.append(transaction_type)
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND ts < ?"
+            params.append(until)
+        if before is not None:
+            sql += " AND (ts < ? OR (ts = ? AND id < ?))"
+            params.extend((before[0], before[0], before[1]))
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit)
+        rows = self.db.fetchall(sql, params)
+        results = {row[0]: {"id": row[0], "amount": row[1], "type": row[2], "ts": row[3],
+                            "details": json.loads(row[4]) if row[4] else {}} for row in rows}
+        # 封存到一半時同一筆紀錄可能同時存在於兩邊，以 id 去重
+        for record in self.txn_archive.query(guild_id, user_id, transaction_type, since, until, before, limit):
+            results.setdefault(record["id"], record)
+        return sorted(results.values(), key=lambda r: (r["ts"], r["id"]), reverse=True)[:limit]
+
+    def archive_transactions(self) -> dict:
+        """將超過 txn_archive_days 天的交易移入封存分段檔 (同步，請以 asyncio.to_thread 呼叫)
+
+        先寫好分段檔再從資料表刪除；若中途中斷，下次執行時會先清掉最新分段中已封存的紀錄。
+        掃描進度 (高水位) 與刪除在同一個交易中寫入 StorageMeta，下次從高水位之後接續，
+        不必每次都從頭掃過留在資料表中的舊紀錄 (例如無法封存的非數字 ID)。
+        """
+        cutoff = time() - self.txn_archive_days * 86400
+        stats = {"segments": 0, "records": 0}
+        delete = "DELETE FROM Transactions WHERE id = ?"
+        latest = self.txn_archive.latest()
+        # 每個分段的刪除在同一個交易中提交，只要最大 id 還在資料表就代表上次沒刪完
+        if latest is not None and self.db.fetchone("SELECT 1 FROM Transactions WHERE id = ?", (latest.max_id,)):
+            ids = [(i,) for i in latest.ids()]
+            self.db.write_sync(lambda conn: conn.executemany(delete, ids))
+        row = self.db.fetchone("SELECT value FROM StorageMeta WHERE key = 'txn_archive_high_water'")
+        last_id = int(row[0]) if row else 0
+        # 高水位只能推進到第一筆還沒過期的紀錄之前 (匯入的舊紀錄 id 與時間不一定同序)，它過期後才會被掃到
+        young = self.db.fetchone("SELECT id FROM Transactions WHERE id > ? AND ts >= ? ORDER BY id LIMIT 1",
+                                 (last_id, cutoff))
+        ceiling = young[0] - 1 if young else None
+
+        def commit(conn, ids, high_water):
+            conn.executemany(delete, ids)
+            conn.execute("INSERT OR REPLACE INTO StorageMeta (key, value) VALUES ('txn_archive_high_water', ?)",
+                         (str(high_water),))
+
+        while True:
+            rows = self.db.fetchall(
+                "SELECT id, guild_id, user_id, amount, type, ts, details FROM Transactions "
+                "WHERE ts < ? AND id > ? ORDER BY id LIMIT ?",
+                (cutoff, last_id, self.txn_segment_rows))
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            high_water = last_id if ceiling is None else min(last_id, ceiling)
+            rows = [row for row in rows if archivable(row[1], row[2], row[4])]
+            if rows:
+                self.txn_archive.add_segment(rows)
+                stats["segments"] += 1
+                stats["records"] += len(rows)
+            self.db.write_sync(commit, [(row[0],) for row in rows], high_water)
+        return stats
+
+    @staticmethod
+    def _delete_expired_messages(conn: sqlite3.Connection, cutoff: str, limit: int) -> int:
+        # 子查詢條件與部分索引 idx_usermessages_expiry 一致，只掃描過期的那一段
+        return conn.execute(
+            "DELETE FROM UserMessages WHERE id IN (SELECT id FROM UserMessages "
+            "WHERE created_at < ? AND is_permanent = FALSE LIMIT ?)",
+            (cutoff, limit)).rowcount
+
+    async def sweep_user_messages(self) -> dict:
+        """刪除超過保留時間的非永久對話訊息，回傳本次統計並累計到 retention_stats
+
+        每批最多 message_sweep_batch 列、各自一個寫入工作，批次之間其他寫入 (記錄訊息、交易日誌) 可以插隊。
+        """
+        started = monotonic()
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=self.message_retention_minutes)).isoformat()
+        purged = batches = 0
+        while True:
+            deleted = await self.db.write(self._delete_expired_messages, cutoff, self.message_sweep_batch)
+            purged += deleted
+            batches += 1
+            if deleted < self.message_sweep_batch:
+                break
+        vacuum = await self._reclaim_free_pages() if purged else None
+        elapsed = monotonic() - started
+        IO_METRICS.record("retention_sweep", elapsed)
+        result = {"purged": purged, "batches": batches, "vacuum": vacuum, "seconds": elapsed, "at": time()}
+        stats = self.retention_stats
+        stats["runs"] += 1
+        stats["purged"] += purged
+        stats["batches"] += batches
+        stats["vacuums"] += vacuum is not None
+        stats["last"] = result
+        return result
+
+    @staticmethod
+    def _page_stats(conn: sqlite3.Connection) -> tuple:
+        return tuple(conn.execute(f"PRAGMA {name}").fetchone()[0] for name in ("page_count", "freelist_count", "auto_vacuum"))
+
+    async def _reclaim_free_pages(self):
+        """依 vacuum_mode 回收刪除後留下的空閒頁，回傳執行的動作 (沒有動作時為 None)
+
+        遞增模式每次最多歸還 vacuum_pages 頁，只鎖住資料庫很短的時間；
+        完整 VACUUM 會重寫整個檔案，只在空閒頁比例超過 vacuum_free_ratio 時執行，且一天最多一次。
+        """
+        if self.vacuum_mode == "off":
+            return None
+        page_count, free_pages, auto_vacuum = await self.db.read_async(self._page_stats)
+        if not free_pages:
+            return None
+        if self.vacuum_mode == "incremental" and auto_vacuum == 2:
+            pages = min(free_pages, self.vacuum_pages)
+            await asyncio.wrap_future(self.db.maintenance(
+                lambda conn: conn.execute(f"PRAGMA incremental_vacuum({pages})").fetchall()))
+            return f"incremental:{pages}"
+        if free_pages / page_count < self.vacuum_free_ratio:
+            return None
+        if self._last_full_vacuum is not None and monotonic() - self._last_full_vacuum < 86400:
+            return None
+
+        def vacuum(conn):
+            if self.vacuum_mode == "incremental":
+                # auto_vacuum 的變更要等 VACUUM 重建檔案後才生效，之後就能遞增回收
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
+        self._last_full_vacuum = monotonic()
+        await asyncio.wrap_future(self.db.maintenance(vacuum))
+        logger.info(f"🧹 資料庫已完整 VACUUM (回收 {free_pages}/{page_count} 頁)")
+        return "full"
+
+    async def export_readable(self, directory: str = None) -> dict:
+        """將目前所有已載入的資料倉匯出為縮排 JSON 供人工閱讀 (不影響正在使用的檔案)，回傳 store -> 位元組數"""
+        directory = directory or os.path.join(self.data_dir, "export", datetime.now().strftime("%Y%m%d-%H%M%S"))
+        versions = self.snapshot([store for store in self.store_files if self.is_loaded(store)])
+
+        def write():
+            os.makedirs(directory, exist_ok=True)
+            return {store: snapshot_codec.export_readable(data, os.path.join(directory, f"{store}.json"))
+                    for store, data in versions.items()}
+
+        sizes = await asyncio.to_thread(write)
+        logger.info(f"📤 已匯出 {len(sizes)} 個資料倉至 {directory}")
+        return sizes
+
+    async def data_stats(self) -> dict:
+        """各資料倉的筆數、粗估記憶體、磁碟大小與最近一次載入/寫入 (尚未載入的冷資料倉不會被載入)
+
+        記憶體是在寫時複製的版本上估算 (與即時資料共用未修改的子樹)，因此可以在背景執行緒中走訪。
+        """
+        versions = self.snapshot([store for store in self.store_files if self.is_loaded(store)])
+        dirty, pending = sorted(self._dirty), len(self._txn_buffer)
+        stats = await asyncio.to_thread(self._measure_stores, versions)
+        stats.update(dirty_stores=dirty, pending_transactions=pending, io=self.io_metrics.summary())
+        return stats
+
+    def _measure_stores(self, versions: dict) -> dict:
+        stores = {}
+        for store in self.store_files:
+            data = versions.get(store)
+            entries = nested = memory = None
+            if isinstance(data, Mapping):
+                entries = len(data)
+                nested = sum(len(v) for v in data.values() if isinstance(v, Mapping))
+                memory = _deep_sizeof(data, set())
+            in_db = self.economy_backend == "sqlite" and store in ECONOMY_TABLES
+            stores[store] = {
+                "loaded": store in versions,
+                "entries": entries,
+                "nested_entries": nested,
+                "memory_bytes": memory,
+                "disk_bytes": None if in_db else self._store_disk_size(store),
+                "load": self.load_stats.get(store),
+                "last_save": self.save_stats.get(store),
+            }
+
+        def file_size(path):
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return 0
+
+        return {
+            "stores": stores,
+            "mutation_log_bytes": file_size(self.mutation_log_path),
+            "database_bytes": file_size(self.db_path),
+            "transaction_archive": self.txn_archive.stats(),
+            "database": self.db.stats(),
+            "retention": dict(self.retention_stats),
+        }
+
+    def _import_legacy_transactions(self):
+        """將舊版 economy/transactions.json 一次性匯入 Transactions 資料表，完成後改名保留"""
+        path = os.path.join(self.economy_dir, "transactions.json")
+        if not os.path.exists(path):
+            return
+        # 不使用 _load_json：讀取失敗時它會回傳空字典，匯入 0 筆後原檔就被改名了
+        try:
+            legacy = self._strict_read(path)
+        except Exception:
+            logger.error(f"❌ 舊交易紀錄未匯入，已保留 {path}，修復後重新啟動即會再次匯入")
+            return
+        if not isinstance(legacy, dict):
+            logger.error(f"❌ {path} 不是以伺服器為鍵的物件，已保留原檔、略過匯入")
+            return
+        rows = []
+        for guild_id, entries in legacy.items():
+            for entry in entries if isinstance(entries, list) else []:
+                entry = dict(entry)
+                try:
+                    ts = datetime.fromisoformat(entry.pop("timestamp")).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    ts = 0.0
+                user_id = entry.pop("user_id", "")
+                amount = entry.pop("amount", 0.0)
+                transaction_type = entry.pop("type", "unknown")
+                rows.append((str(guild_id), str(user_id), float(amount), transaction_type, ts,
+                             json.dumps(entry, ensure_ascii=False) if entry else None))
+        if not self._write_transactions(rows):
+            return
+        os.replace(path, f"{path}.migrated")
+        logger.info(f"📒 已將 {len(rows)} 筆舊交易紀錄匯入 SQLite 交易日誌")
+
+    async def replace_all(self, stores: dict) -> list:
+        """以還原的資料整份取代資料倉並完整寫回，回傳寫入失敗的資料倉
+
+        取代在同一個事件循環步驟內完成 (期間持有所有帳戶鎖)，指令不會看到新舊混雜的狀態。
+        呼叫端應先設定 is_backing_up 以攔截修改類指令。
+        """
+        stores = {store: data for store, data in stores.items() if store in self.store_files}
+        async with self.save_lock, self.locks.hold_all():
+            for store, data in stores.items():
+                setattr(self, store, self._compact_store(store, data))
+                self._versions.pop(store, None)
+                self._version_dirty.pop(store, None)
+                self._dirty.pop(store, None)
+                self._pending_compaction.pop(store, None)
+            snapshot = {store: self._snapshot_store(store, None) for store in stores}
+            failed = await asyncio.to_thread(self._save_snapshot, snapshot)
+            for store in failed:
+                self.mark_dirty(store)
+            # 日誌中還留著被取代資料倉的舊變更，必須清空，避免崩潰重啟後被重放到還原資料上
+            if self.use_mutation_log and not failed:
+                if self._pending_compaction:
+                    await self._compact_locked()
+                else:
+                    await asyncio.to_thread(self._truncate_mutation_log)
+        logger.info(f"♻️ 已以還原資料取代: {', '.join(stores)}")
+        return failed
 
     async def save_all_async(self):
-        """異步保存，先對所有 dict 做 deepcopy 再寫入，確保絕對安全"""
+        """請求保存：交由背景寫入任務合併後寫入，指令本身不再等待磁碟 I/O"""
+        if self._flush_task is None or self._flush_task.done():
+            await self.flush()
+            return
+        self._save_requested.set()
+
+    async def flush(self):
+        """立即寫入所有髒資料倉 (供關機、重啟與備份使用)，只複製被標記的項目"""
         if self.save_lock is None:
             logger.warning("⚠️ save_lock 尚未初始化，直接同步保存")
             self.save_all()
             return
 
+        await self.flush_transactions()
         async with self.save_lock:
-            snapshot = {
-                "balance":           copy.deepcopy(self.balance),
-                "server_vault":      copy.deepcopy(self.server_vault),
-                "personal_bank":     copy.deepcopy(self.personal_bank),
-                "credit":            copy.deepcopy(self.credit),
-                "blackjack_data":    copy.deepcopy(self.blackjack_data),
-                "invalid_bet_count": copy.deepcopy(self.invalid_bet_count),
-                "bot_status":        copy.deepcopy(self.bot_status),
-                "dm_messages":       copy.deepcopy(self.dm_messages),
-                "fishingbackpack":   copy.deepcopy(self.fishingbackpack),
-                "user_config":       copy.deepcopy(self.user_config)
-            }
-        await asyncio.to_thread(self._save_snapshot, snapshot)
-        logger.info("💾 數據已安全保存 (Deepcopy 保護)")
+            dirty, self._dirty = self._dirty, {}
+            self._dirty_since = None
+            if not dirty:
+                return
+            # 擷取階段在事件循環中執行 (取代舊版的整份 deepcopy)，期間指令會被阻塞，因此單獨統計
+            started = monotonic()
+            snapshot, log_lines, logged = {}, [], {}
+            for store, keys in dirty.items():
+                if self._uses_mutation_log(store):
+                    log_lines.extend(self._mutation_records(store, keys))
+                    logged[store] = keys
+                else:
+                    snapshot[store] = self._snapshot_store(store, keys)
+            IO_METRICS.record("capture", monotonic() - started)
+
+            # 寫入也在鎖內進行，避免較舊的快照晚於較新的快照落盤
+            failed = await asyncio.to_thread(self._save_snapshot, snapshot) if snapshot else []
+            if logged:
+                started = monotonic()
+                if await asyncio.to_thread(self._append_mutation_log, log_lines):
+                    elapsed = monotonic() - started
+                    for store, keys in logged.items():
+                        self._merge_dirty(self._pending_compaction, store, keys)
+                        self._record_save(store, elapsed, "log")
+                else:
+                    failed.extend(logged)
+            for store in failed:
+                self.mark_dirty(store)
+
+            if self._compaction_due():
+                await self._compact_locked()
+        logger.info(f"💾 數據已安全保存: {', '.join(dirty)}")
+        if self.metrics_log_interval and monotonic() - self._last_metrics_log >= self.metrics_log_interval:
+            self._last_metrics_log = monotonic()
+            IO_METRICS.log_summary()
 
 
 # ----------- 幽幽子的靈魂啟動 -----------
@@ -304,6 +1848,8 @@ bot.run_mode = args.mode
 async def on_ready():
     # 確保 Locks 在 Event Loop 運行後才初始化 (解決 Python 3.10+ 的 RuntimeError)
     bot.data_manager.setup_locks()
+    bot.data_manager.start_flusher()
+    bot.data_manager.start_prefetch()
     logger.info(f"🌸 幽幽子已甦醒！目前服侍 {len(bot.guilds)} 個伺服器，擁有 {len(bot.users)} 位靈魂。")
 
 # ----------- 載入指令與事件的花瓣 -----------
@@ -331,4 +1877,6 @@ except Exception as e:
     logger.critical(f"幽幽子遭遇致命錯誤: {e}", exc_info=True)
     bot.data_manager.save_all()
 finally:
+    bot.data_manager.txn_archive.close()
+    bot.data_manager.db.close()
     logger.info("靈魂已歸於寂靜")
@@ -0,0 +1,115 @@
+"""
+✿ 幽幽子的快照編碼 ✿
+資料倉檔案的可替換編碼層 (只使用標準函式庫)：
+
+    json    UTF-8 JSON (預設，不縮排)，可直接閱讀與手動修改
+    binary  附版本與 CRC32 校驗的快照 (需以 STORE_CODEC=binary 自行啟用)：固定檔頭 + 不縮排的 UTF-8 JSON
+
+binary 檔頭 (小端序，20 bytes)：
+    magic "YYSN" | 格式版本 u16 | 內容編碼 u8 | 保留 u8 | CRC32 u32 | 內容長度 u64
+內容一律是與 Python 版本無關的 JSON，換了直譯器版本也讀得回來；精簡帳戶紀錄等 Mapping 會寫成一般物件。
+內容編碼欄位保留給日後的其他編碼，目前只有 JSON。
+"""
+import json
+import struct
+import zlib
+from collections.abc import Mapping
+
+MAGIC = b"YYSN"
+FORMAT_VERSION = 1
+ENCODING_JSON = 0
+HEADER = struct.Struct("<4sHBBIQ")
+
+
+class CodecError(ValueError):
+    """快照檔案無法辨識、版本不支援或校驗失敗"""
+
+
+def _json_default(obj):
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonCodec:
+    name = "json"
+    ext = ".json"
+
+    def __init__(self, indent: int = None):
+        self.indent = indent
+
+    def dumps(self, data) -> bytes:
+        separators = None if self.indent else (",", ":")
+        return json.dumps(data, ensure_ascii=False, indent=self.indent, separators=separators,
+                          default=_json_default).encode("utf-8")
+
+    def loads(self, payload: bytes):
+        return json.loads(payload)
+
+
+class BinaryCodec:
+    name = "binary"
+    ext = ".ysnap"
+
+    def dumps(self, data) -> bytes:
+        payload = JsonCodec().dumps(data)
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, ENCODING_JSON, 0, zlib.crc32(payload), len(payload))
+        return header + payload
+
+    def loads(self, blob: bytes):
+        if len(blob) < HEADER.size:
+            raise CodecError("快照檔案過短")
+        magic, version, encoding, _, checksum, length = HEADER.unpack_from(blob, 0)
+        if magic != MAGIC:
+            raise CodecError("不是幽幽子的快照檔案")
+        if version > FORMAT_VERSION or encoding != ENCODING_JSON:
+            raise CodecError(f"不支援的快照版本 {version} (編碼 {encoding})")
+        payload = memoryview(blob)[HEADER.size:]
+        if len(payload) != length:
+            raise CodecError(f"快照長度不符 (應為 {length}，實際 {len(payload)})，檔案可能被截斷")
+        if zlib.crc32(payload) != checksum:
+            raise CodecError("快照校驗和不符，資料可能已損毀")
+        try:
+            return json.loads(bytes(payload))
+        except ValueError as e:
+            raise CodecError(f"無法解讀快照內容: {e}") from e
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), BinaryCodec())}
+
+
+def get_codec(name: str):
+    try:
+        return CODECS[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f"未知的編碼 {name!r}，可用: {', '.join(CODECS)}") from None
+
+
+def codec_for_path(path: str):
+    """依副檔名判斷編碼 (無法判斷時回傳 None)"""
+    for codec in CODECS.values():
+        if path.endswith(codec.ext):
+            return codec
+    return None
+
+
+def read_file(path: str):
+    """以副檔名對應的編碼讀取整個檔案"""
+    codec = codec_for_path(path)
+    if codec is None:
+        raise CodecError(f"無法依副檔名判斷 {path} 的編碼")
+    with open(path, "rb") as f:
+        return codec.loads(f.read())
+
+
+def canonical(data):
+    """資料寫入 JSON 類編碼再讀回後的樣子 (例如數字鍵會變成字串)，供轉換後的往返檢查比對"""
+    return json.loads(JsonCodec().dumps(data))
+
+
+def export_readable(data, path: str) -> int:
+    """將資料寫成縮排的 JSON 供人工閱讀，回傳寫入的位元組數"""
+    payload = JsonCodec(indent=4).dumps(data)
+    with open(path, "wb") as f:
+        f.write(payload)
+    return len(payload)
@@ -0,0 +1,81 @@
+"""
+✿ 幽幽子的快照工具 ✿
+在 Bot 停機時檢查或匯出二進位快照 (.ysnap)。
+
+    python snapshot_tool.py verify <檔案或目錄>...
+    python snapshot_tool.py export <檔案或目錄>... [-o 輸出目錄]
+
+export 會把每個快照寫成縮排的 JSON (預設放在原檔旁邊，副檔名 .export.json)，原檔不會被修改。
+Bot 執行中需要匯出時，請改用資料管理器的 export_readable()。
+"""
+import argparse
+import os
+import sys
+from time import monotonic
+
+import snapshot_codec
+
+
+def _iter_snapshots(paths: list):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.endswith(snapshot_codec.BinaryCodec.ext):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def cmd_verify(args) -> int:
+    bad = 0
+    for path in _iter_snapshots(args.paths):
+        started = monotonic()
+        try:
+            data = snapshot_codec.read_file(path)
+        except (OSError, ValueError) as e:
+            print(f"❌ {path}: {e}")
+            bad += 1
+            continue
+        entries = len(data) if isinstance(data, dict) else "-"
+        print(f"✅ {path}: {entries} 筆，{os.path.getsize(path) / 1024:.1f} KiB，{(monotonic() - started) * 1000:.1f} ms")
+    return 1 if bad else 0
+
+
+def cmd_export(args) -> int:
+    bad = 0
+    for path in _iter_snapshots(args.paths):
+        try:
+            data = snapshot_codec.read_file(path)
+        except (OSError, ValueError) as e:
+            print(f"❌ {path}: {e}", file=sys.stderr)
+            bad += 1
+            continue
+        base = os.path.splitext(path)[0]
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            # 保留相對路徑資訊，避免不同目錄下的同名分片互相覆蓋
+            base = os.path.join(args.output, base.replace(os.sep, "_").lstrip("._"))
+        out_path = f"{base}.export.json"
+        size = snapshot_codec.export_readable(data, out_path)
+        print(f"📤 {path} -> {out_path} ({size / 1024:.1f} KiB)")
+    return 1 if bad else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="幽幽子的快照工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    verify = sub.add_parser("verify", help="檢查快照的版本與校驗和")
+    verify.add_argument("paths", nargs="+")
+    export = sub.add_parser("export", help="將快照匯出為可閱讀的 JSON")
+    export.add_argument("paths", nargs="+")
+    export.add_argument("-o", "--output", help="輸出目錄 (預設為原檔旁邊)")
+
+    args = parser.parse_args(argv)
+    handlers = {"verify": cmd_verify, "export": cmd_export}
+    return handlers[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+✿ 幽幽子的資料庫侍從 ✿
+config/sakura_bot.db 的共用存取層：
+
+    寫入  一條專屬寫入執行緒 + 佇列，佇列中累積的工作合併在同一個交易中提交 (每個工作各自一個 SAVEPOINT，
+          失敗只會回滾自己)；呼叫端可以 await、同步等待，或不等待結果
+    讀取  每個執行緒一條長期保持的唯讀連線 (WAL 模式下讀取不會被寫入阻塞)，
+          async 呼叫端以 read_async 交給執行緒池
+
+所有連線都開著 sqlite3 內建的 prepared statement 快取，SQL 請寫成固定字串並以參數傳值，
+同一句 SQL 只會在每條連線上編譯一次。
+寫入工作收到的是寫入連線本身：不要自行 commit / rollback，也不要把連線帶出工作之外。
+VACUUM 等不能在交易中執行的維護工作請用 maintenance()，它會在寫入執行緒上單獨、在交易之外執行。
+"""
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from time import monotonic
+
+logger = logging.getLogger("SakuraBot.sqlite_service")
+
+STATEMENT_CACHE_SIZE = 256
+_STOP = object()
+
+
+class SQLiteService:
+    def __init__(self, db_path: str, batch_size: int = 256, busy_timeout: float = 5.0, metrics=None):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.busy_timeout = busy_timeout
+        # 與資料管理器共用的 IOMetrics (可為 None)：db_read、db_commit
+        self.metrics = metrics
+        self._queue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+        self._stats = {"jobs": 0, "failed_jobs": 0, "batches": 0, "largest_batch": 0, "reads": 0}
+        self._stats_lock = threading.Lock()
+
+        self._writer_conn = self._connect()
+        self._writer_conn.execute("PRAGMA journal_mode=WAL")
+        self._thread = threading.Thread(target=self._writer_loop, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        # isolation_level=None：交易完全由寫入執行緒以 BEGIN / COMMIT 控制
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if readonly:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    # ---------- 寫入 ----------
+
+    def submit(self, fn, *args) -> Future:
+        """把寫入工作 fn(conn, *args) 交給寫入執行緒，回傳在提交後才完成的 Future"""
+        if self._closed:
+            raise RuntimeError("資料庫侍從已關閉")
+        future = Future()
+        self._queue.put((fn, args, future, False))
+        return future
+
+    def maintenance(self, fn, *args) -> Future:
+        """在寫入執行緒上、交易之外單獨執行 fn(conn, *args) (例如 VACUUM)，期間其他寫入會排隊等候"""
+        if self._closed:
+            raise RuntimeError("資料庫侍從已關閉")
+        future = Future()
+        self._queue.put((fn, args, future, True))
+        return future
+
+    def execute(self, sql: str, params=()) -> Future:
+        """單句寫入的捷徑，Future 的結果為影響的列數"""
+        return self.submit(lambda conn: conn.execute(sql, params).rowcount)
+
+    async def write(self, fn, *args):
+        """在事件循環中等待寫入工作提交完成並取得其回傳值"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def write_sync(self, fn, *args):
+        """在一般執行緒 (或尚未啟動事件循環時) 同步等待寫入完成；不可在寫入工作內呼叫"""
+        return self.submit(fn, *args).result()
+
+    def _writer_loop(self):
+        conn = self._writer_conn
+        pending = None
+        while True:
+            job = pending if pending is not None else self._queue.get()
+            pending = None
+            if job is _STOP:
+                break
+            if job[3]:
+                self._run_maintenance(conn, job)
+                continue
+            batch = [job]
+            # 佇列中已經排隊的工作一起提交，交易與 fsync 成本由整批分攤
+            while len(batch) < self.batch_size:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP or job[3]:
+                    # 維護工作與關閉請求維持排隊順序，等這一批提交後再處理
+                    pending = job
+                    break
+                batch.append(job)
+            self._run_batch(conn, batch)
+        conn.close()
+
+    def _run_maintenance(self, conn: sqlite3.Connection, job):
+        fn, args, future, _ = job
+        if not future.set_running_or_notify_cancel():
+            return
+        started = monotonic()
+        try:
+            future.set_result(fn(conn, *args))
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            future.set_exception(e)
+        if self.metrics is not None:
+            self.metrics.record("db_maintenance", monotonic() - started)
+
+    def _run_batch(self, conn: sqlite3.Connection, batch: list):
+        started = monotonic()
+        results = []
+        failed = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, future, _ in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT job")
+                try:
+                    results.append((future, fn(conn, *args), None))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append((future, None, e))
+                    failed += 1
+            conn.execute("COMMIT")
+        except Exception as e:
+            # BEGIN / COMMIT 本身失敗 (例如磁碟已滿)：整批都沒有寫入
+            logger.error(f"❌ 資料庫批次寫入失敗 ({len(batch)} 個工作): {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for fn, args, future, _ in batch:
+                if not future.done():
+                    if not future.running():
+                        future.set_running_or_notify_cancel()
+                    future.set_exception(e)
+            return
+        # 提交之後才通知呼叫端，拿到結果時資料已經落地
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+        with self._stats_lock:
+            self._stats["jobs"] += len(batch)
+            self._stats["failed_jobs"] += failed
+            self._stats["batches"] += 1
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+        if self.metrics is not None:
+            self.metrics.record("db_commit", monotonic() - started)
+
+    # ---------- 讀取 ----------
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise RuntimeError("資料庫侍從已關閉")
+            conn = self._local.conn = self._connect(readonly=True)
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def read(self, fn, *args):
+        """以目前執行緒的唯讀連線同步執行 fn(conn, *args)"""
+        started = monotonic()
+        try:
+            return fn(self._reader(), *args)
+        finally:
+            with self._stats_lock:
+                self._stats["reads"] += 1
+            if self.metrics is not None:
+                self.metrics.record("db_read", monotonic() - started)
+
+    def fetchall(self, sql: str, params=()) -> list:
+        return self.read(lambda conn: conn.execute(sql, params).fetchall())
+
+    def fetchone(self, sql: str, params=()):
+        return self.read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def read_async(self, fn, *args):
+        """在執行緒池中讀取，不阻塞事件循環"""
+        return await asyncio.to_thread(self.read, fn, *args)
+
+    # ---------- 其他 ----------
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["readers"] = len(self._readers)
+        return stats
+
+    def close(self, timeout: float = 10.0):
+        """等佇列中的寫入全部提交後關閉所有連線 (可重複呼叫)"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 模組都放在專案根目錄 (main.py 旁)，直接以 pytest 執行時也要能匯入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
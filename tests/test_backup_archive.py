@@ -0,0 +1,110 @@
+import copy
+import sqlite3
+
+import pytest
+
+import backup_archive
+
+
+def _snapshots():
+    """兩份相鄰的快照：未修改的子樹沿用同一個物件，與寫時複製的版本相同"""
+    day1 = {
+        "balance": {"g1": {"u1": 10.0, "u2": 20.0}, "g2": {"u3": 30.0}},
+        "user_config": {"u1": {"job": "漁夫"}, "u9": {"job": "廚師"}},
+        "bot_status": ["idle"],
+    }
+    day2 = {
+        "balance": {
+            "g1": {"u1": 15.0, "u4": 1.0},      # 修改、刪除與新增第二層鍵
+            "g2": day1["balance"]["g2"],        # 未修改：同一個物件
+        },
+        "user_config": {"u1": day1["user_config"]["u1"]},   # 刪除第一層鍵
+        "bot_status": ["busy"],                               # 非 dict 的資料倉整個替換
+        "credit": {"g1": {"u1": {"score": 700}}},             # 新的資料倉
+    }
+    return day1, day2
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    backup_archive.ensure_schema(conn)
+    yield conn
+    conn.close()
+
+
+def test_diff_ops_skips_shared_subtrees():
+    day1, _ = _snapshots()
+    assert list(backup_archive.diff_ops(day1, day1)) == []
+    # 內容相同但不是同一個物件的子樹也不會輸出 (非 dict 的資料倉只比較 identity，變動時整個替換)
+    same_values = {store: copy.deepcopy(data) if isinstance(data, dict) else data for store, data in day1.items()}
+    assert list(backup_archive.diff_ops(day1, same_values)) == []
+
+
+def test_diff_ops_applied_to_previous_gives_snapshot():
+    day1, day2 = _snapshots()
+    state = copy.deepcopy(day1)
+    for op in backup_archive.diff_ops(day1, day2):
+        backup_archive.apply_op(state, op)
+    assert state == day2
+
+
+def test_full_ops_rebuild_from_empty():
+    day1, _ = _snapshots()
+    state = {}
+    for op in backup_archive.full_ops(day1):
+        backup_archive.apply_op(state, op)
+    assert state == day1
+
+
+def test_restore_backup_round_trip(conn):
+    day1, day2 = _snapshots()
+    full = backup_archive.write_backup(conn, day1, "2026-01-01T04:00:00")
+    delta = backup_archive.write_backup(conn, day2, "2026-01-02T04:00:00", day1, full["id"])
+    assert (full["kind"], delta["kind"]) == ("full", "delta")
+    assert delta["ops"] < full["ops"]
+
+    assert backup_archive.backup_chain(conn, delta["id"]) == [full["id"], delta["id"]]
+    assert backup_archive.restore_backup(conn, full["id"]) == day1
+    assert backup_archive.restore_backup(conn, delta["id"]) == day2
+
+
+def test_restore_backup_detects_corruption(conn):
+    day1, _ = _snapshots()
+    backup_id = backup_archive.write_backup(conn, day1, "2026-01-01T04:00:00")["id"]
+    conn.execute(f"UPDATE {backup_archive.BACKUP_TABLE} SET checksum = ? WHERE id = ?", ("0" * 64, backup_id))
+    with pytest.raises(ValueError):
+        backup_archive.restore_backup(conn, backup_id)
+    assert backup_archive.restore_backup(conn, backup_id, verify=False) == day1
+
+
+def _write_chain(conn, kinds):
+    """依 kinds ("full"/"delta") 寫入一連串備份，回傳 [(id, 當時的快照)]"""
+    written = []
+    previous = parent_id = None
+    for day, kind in enumerate(kinds, 1):
+        snapshot = {"balance": {"g1": {"u1": float(day)}}, "day": day}
+        if kind == "full":
+            previous = parent_id = None
+        result = backup_archive.write_backup(conn, snapshot, f"2026-01-{day:02d}", previous, parent_id)
+        assert result["kind"] == kind
+        written.append((result["id"], snapshot))
+        previous, parent_id = snapshot, result["id"]
+    return written
+
+
+def test_prune_backups_keeps_base_of_retained_deltas(conn):
+    written = _write_chain(conn, ["full", "delta", "delta", "full", "delta"])
+    ids = [backup_id for backup_id, _ in written]
+
+    # 保留最近 3 份 (#3~#5)：#3 是差異，必須連同它的基底 #1 與 #2 一起保留
+    assert backup_archive.prune_backups(conn, 3) == 0
+    # 保留最近 2 份 (#4~#5)：#4 是完整基底，之前的整條鏈都可以刪除
+    assert backup_archive.prune_backups(conn, 2) == 3
+    assert [b["id"] for b in backup_archive.list_backups(conn)] == ids[3:]
+    for backup_id, snapshot in written[3:]:
+        assert backup_archive.restore_backup(conn, backup_id) == snapshot
+
+
+def test_prune_backups_on_empty_table(conn):
+    assert backup_archive.prune_backups(conn, 7) == 0
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+from transaction_archive import SEGMENT_PREFIX, SEGMENT_SUFFIX, Segment, TransactionArchive, archivable, write_segment
+
+GUILD = "100000000000000001"
+
+
+def _rows(start_id: int, count: int, users=("11", "22"), ts0: float = 1_000.0):
+    """(id, guild_id, user_id, amount, type, ts, details)；每兩筆共用同一個時間戳，測試同時間以 id 排序"""
+    rows = []
+    for i in range(count):
+        txn_id = start_id + i
+        details = json.dumps({"n": txn_id}) if txn_id % 3 else None
+        rows.append((txn_id, GUILD, users[i % len(users)], float(txn_id), "work" if i % 4 else "shop",
+                     ts0 + txn_id // 2, details))
+    return rows
+
+
+def _expected(rows, user_id):
+    """與逐筆掃描相同的結果：該用戶的紀錄由新到舊"""
+    mine = [r for r in rows if r[2] == user_id]
+    return [r[0] for r in sorted(mine, key=lambda r: (r[5], r[0]), reverse=True)]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = TransactionArchive(str(tmp_path / "archive"))
+    yield archive
+    archive.close()
+
+
+def test_archivable():
+    assert archivable(GUILD, "42", "work")
+    assert not archivable("guild", "42", "work")
+    assert not archivable(GUILD, str(2 ** 64), "work")
+    assert not archivable(GUILD, "42", "交易類型超過十六位元組")
+
+
+def test_segment_round_trip(tmp_path):
+    rows = _rows(1, 50)
+    path = str(tmp_path / "one.ytx")
+    assert write_segment(path, rows) == 50
+    segment = Segment(path)
+    try:
+        assert (segment.count, segment.max_id) == (50, 50)
+        found = segment.find(int(GUILD), 11, limit=100)
+        assert [r["id"] for r in found] == _expected(rows, "11")
+        by_id = {r[0]: r for r in rows}
+        for record in found:
+            row = by_id[record["id"]]
+            assert (record["amount"], record["type"], record["ts"]) == (row[3], row[4], row[5])
+            assert record["details"] == (json.loads(row[6]) if row[6] else {})
+        assert sorted(segment.ids()) == list(range(1, 51))
+    finally:
+        segment.close()
+
+
+def test_segment_find_filters(tmp_path):
+    rows = _rows(1, 60)
+    path = str(tmp_path / "one.ytx")
+    write_segment(path, rows)
+    segment = Segment(path)
+    try:
+        guild = int(GUILD)
+        assert segment.find(guild, 33) == []
+        assert segment.find(guild + 1, 11) == []
+        assert [r["id"] for r in segment.find(guild, 11, limit=3)] == _expected(rows, "11")[:3]
+        assert all(r["type"] == "shop" for r in segment.find(guild, 11, transaction_type="shop", limit=100))
+        window = segment.find(guild, 22, since=1_010.0, until=1_020.0, limit=100)
+        assert window and all(1_010.0 <= r["ts"] < 1_020.0 for r in window)
+    finally:
+        segment.close()
+
+
+def test_before_cursor_pages_without_gaps(archive):
+    rows = _rows(1, 200)
+    archive.add_segment(rows[:120])
+    archive.add_segment(rows[120:])
+
+    pages, before = [], None
+    while True:
+        page = archive.query(GUILD, "22", before=before, limit=7)
+        if not page:
+            break
+        pages.extend(r["id"] for r in page)
+        # 游標是上一頁最後一筆的 (ts, id)，同一時間戳的紀錄以 id 區分
+        before = (page[-1]["ts"], page[-1]["id"])
+    assert pages == _expected(rows, "22")
+
+
+def test_segments_are_named_in_write_order(archive):
+    # 較晚封存的紀錄 id 可以比既有分段小 (例如匯入的舊紀錄較晚過期)
+    newer = archive.add_segment(_rows(1_000, 10))
+    older = archive.add_segment(_rows(1, 10))
+    names = sorted(os.listdir(archive.directory))
+    assert names == [f"{SEGMENT_PREFIX}{n:016d}{SEGMENT_SUFFIX}" for n in (1, 2)]
+    assert os.path.basename(newer.path) == names[0]
+    assert archive.latest() is older
+    assert archive.stats()["records"] == 20
+
+    # 新開的封存庫 (例如重新啟動後) 依序號找到同一個最新分段
+    reopened = TransactionArchive(archive.directory)
+    try:
+        assert reopened.latest().path == older.path
+        assert reopened.latest().max_id == 10
+    finally:
+        reopened.close()
+
+
+def test_close_releases_segments(archive):
+    archive.add_segment(_rows(1, 10))
+    segment = archive.latest()
+    archive.close()
+    with pytest.raises(ValueError):
+        segment.find(int(GUILD), 11)
+    # 關閉後再查詢會重新開啟分段檔
+    assert archive.query(GUILD, "11", limit=100)
@@ -0,0 +1,57 @@
+import random
+
+from trigger_matcher import TriggerMatcher
+
+
+def linear_scan(patterns, text):
+    """原本 on_message 的判斷方式：依序 `keyword in text`，第一個命中就停止"""
+    for pattern, payload in patterns:
+        if pattern in text:
+            return payload
+    return None
+
+
+def test_earlier_pattern_wins_over_earlier_position():
+    patterns = [("櫻花", "sakura"), ("幽幽子", "yuyuko")]
+    matcher = TriggerMatcher(patterns)
+    assert matcher.find("幽幽子在看櫻花") == "sakura"
+    assert matcher.find("幽幽子") == "yuyuko"
+    assert matcher.find("妖夢") is None
+    assert matcher.pattern_count == 2
+
+
+def test_shorter_earlier_pattern_inside_longer_one():
+    patterns = [("za warudo", "jojo"), ("warudo", "short"), ("the world", "pucci")]
+    matcher = TriggerMatcher(patterns)
+    assert matcher.find("za warudo!") == "jojo"
+    assert matcher.find("warudo") == "short"
+    # 只能經由失敗連結找到的後綴命中
+    patterns = [("bc", "suffix"), ("abcd", "long")]
+    assert TriggerMatcher(patterns).find("xabcd") == "suffix"
+
+
+def test_duplicate_pattern_keeps_first_payload():
+    matcher = TriggerMatcher([("hi", 1), ("hi", 2), ("h", 3)])
+    assert matcher.find("oh hi") == 1
+    assert matcher.find("oh") == 3
+    assert matcher.pattern_count == 2
+
+
+def test_empty_pattern_matches_everything():
+    patterns = [("abc", "abc"), ("", "empty")]
+    matcher = TriggerMatcher(patterns)
+    assert matcher.find("xabcx") == "abc"
+    assert matcher.find("") == "empty"
+    assert TriggerMatcher([]).find("anything") is None
+
+
+def test_matches_linear_scan_on_random_inputs():
+    rng = random.Random(2024)
+    alphabet = "ab幽子"
+    for _ in range(300):
+        patterns = [("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))), index)
+                    for index in range(rng.randint(1, 12))]
+        matcher = TriggerMatcher(patterns)
+        for _ in range(20):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 15)))
+            assert matcher.find(text) == linear_scan(patterns, text), (patterns, text)
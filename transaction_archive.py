@@ -0,0 +1,221 @@
+"""
+✿ 幽幽子的交易封存庫 ✿
+把過了保留期的交易紀錄從 SQLite 移到不可變的定長二進位分段檔，以 mmap 唯讀查詢。
+
+分段檔格式 (小端序)：
+    檔頭   HEADER                      魔數、版本、紀錄數、附註區位置、最大交易 id、時間範圍
+    紀錄   RECORD × count              依 (guild_id, user_id, ts, id) 排序，每筆 64 bytes
+    附註   UTF-8 JSON 串接              紀錄以 (offset, length) 指向自己的 details
+查詢只在 mmap 上二分搜尋該用戶的區段，不會把整個分段讀進 Python heap。
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+
+logger = logging.getLogger("SakuraBot.transaction_archive")
+
+MAGIC = b"YYTX"
+VERSION = 1
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".ytx"
+
+# magic, version, record_size, count, details_offset, max_id, min_ts, max_ts
+HEADER = struct.Struct("<4sHHQQQdd")
+# guild_id, user_id, ts, id, amount, type, details_offset, details_length
+RECORD = struct.Struct("<QQdQd16sII")
+# 排序鍵只需要紀錄的前四個欄位
+KEY = struct.Struct("<QQdQ")
+
+
+def archivable(guild_id: str, user_id: str, transaction_type: str) -> bool:
+    """定長格式只能容納數字 ID 與 16 bytes 以內的交易類型，其餘紀錄留在 SQLite"""
+    return (str(guild_id).isdigit() and str(user_id).isdigit() and int(guild_id) < 2 ** 64
+            and int(user_id) < 2 ** 64 and len(transaction_type.encode("utf-8")) <= 16)
+
+
+def write_segment(path: str, rows: list) -> int:
+    """將 (id, guild_id, user_id, amount, type, ts, details) 紀錄寫成分段檔，回傳寫入的紀錄數
+
+    先寫暫存檔並 fsync，再以 os.replace 原子替換；分段檔寫好後就不再修改。
+    """
+    records = sorted(
+        (int(guild_id), int(user_id), float(ts), int(txn_id), float(amount), transaction_type, details)
+        for txn_id, guild_id, user_id, amount, transaction_type, ts, details in rows
+    )
+    details_blob = bytearray()
+    body = bytearray()
+    for guild_id, user_id, ts, txn_id, amount, transaction_type, details in records:
+        encoded = details.encode("utf-8") if details else b""
+        body += RECORD.pack(guild_id, user_id, ts, txn_id, amount, transaction_type.encode("utf-8"),
+                            len(details_blob), len(encoded))
+        details_blob += encoded
+
+    header = HEADER.pack(MAGIC, VERSION, RECORD.size, len(records), HEADER.size + len(body),
+                         max(r[3] for r in records), min(r[2] for r in records), max(r[2] for r in records))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(body)
+        f.write(details_blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class Segment:
+    """單一分段檔的 mmap 唯讀視圖"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.count, self.details_offset, self.max_id, self.min_ts, self.max_ts = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self._mm.close()
+            raise ValueError(f"{path} 不是可辨識的交易分段檔")
+
+    def close(self):
+        self._mm.close()
+
+    @property
+    def size(self) -> int:
+        return len(self._mm)
+
+    def _key(self, index: int) -> tuple:
+        return KEY.unpack_from(self._mm, HEADER.size + index * RECORD.size)
+
+    def _bisect(self, lo: int, hi: int, target: tuple, width: int) -> int:
+        """回傳 [lo, hi) 中第一筆排序鍵前 width 個欄位 >= target 的位置"""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[:width] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _read(self, index: int) -> dict:
+        guild_id, user_id, ts, txn_id, amount, raw_type, offset, length = \
+            RECORD.unpack_from(self._mm, HEADER.size + index * RECORD.size)
+        start = self.details_offset + offset
+        return {
+            "id": txn_id,
+            "amount": amount,
+            "type": raw_type.rstrip(b"\0").decode("utf-8"),
+            "ts": ts,
+            "details": json.loads(self._mm[start:start + length]) if length else {},
+        }
+
+    def find(self, guild_id: int, user_id: int, transaction_type: str = None, since: float = None,
+             until: float = None, before: tuple = None, limit: int = 10) -> list:
+        """由新到舊回傳某用戶最多 limit 筆紀錄，條件與 SakuraDataManager.query_transactions 相同"""
+        if not self.count or (since is not None and self.max_ts < since):
+            return []
+        lo = self._bisect(0, self.count, (guild_id, user_id), 2)
+        hi = self._bisect(lo, self.count, (guild_id, user_id + 1), 2)
+        if until is not None:
+            hi = self._bisect(lo, hi, (guild_id, user_id, until), 3)
+        if before is not None:
+            hi = self._bisect(lo, hi, (guild_id, user_id, float(before[0]), int(before[1])), 4)
+
+        results = []
+        for index in range(hi - 1, lo - 1, -1):
+            if len(results) >= limit:
+                break
+            record = self._read(index)
+            if since is not None and record["ts"] < since:
+                break
+            if transaction_type and record["type"] != transaction_type:
+                continue
+            results.append(record)
+        return results
+
+    def ids(self):
+        for index in range(self.count):
+            yield self._key(index)[3]
+
+
+class TransactionArchive:
+    """目錄中所有分段檔的集合 (新增分段時才重新掃描目錄)
+
+    查詢執行緒與封存執行緒會同時使用，已開啟的分段表只在 _lock 內修改，
+    segments() 回傳的是當下的快照 (tuple)，呼叫端迭代期間不受新增分段影響。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def segments(self) -> tuple:
+        if not os.path.isdir(self.directory):
+            return ()
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        with self._lock:
+            for name in names:
+                if name not in self._segments:
+                    try:
+                        self._segments[name] = Segment(os.path.join(self.directory, name))
+                    except (OSError, ValueError) as e:
+                        logger.error(f"❌ 無法開啟交易分段檔 {name}: {e}")
+            return tuple(self._segments[name] for name in names if name in self._segments)
+
+    @staticmethod
+    def _sequence(name: str) -> int:
+        try:
+            return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+        except ValueError:
+            return 0
+
+    def add_segment(self, rows: list) -> Segment:
+        """以一批紀錄建立新的分段檔 (只能由單一封存執行緒呼叫)
+
+        分段依寫入順序編號而不是依交易 id：較晚過期的舊紀錄 id 可能比既有分段小，
+        依序號排序時 latest() 一定是最後寫入的分段，新分段也不會覆寫已經開啟的檔案。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        sequence = 1 + max((self._sequence(name) for name in os.listdir(self.directory)
+                            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)), default=0)
+        path = os.path.join(self.directory, f"{SEGMENT_PREFIX}{sequence:016d}{SEGMENT_SUFFIX}")
+        write_segment(path, rows)
+        opened = Segment(path)
+        with self._lock:
+            # 查詢執行緒可能已經從目錄掃描到並開啟了同一個分段
+            segment = self._segments.setdefault(os.path.basename(path), opened)
+        if segment is not opened:
+            opened.close()
+        return segment
+
+    def latest(self):
+        """最後寫入的分段 (中斷復原用)"""
+        segments = self.segments()
+        return segments[-1] if segments else None
+
+    def query(self, guild_id, user_id, transaction_type: str = None, since: float = None,
+              until: float = None, before: tuple = None, limit: int = 10) -> list:
+        if not (str(guild_id).isdigit() and str(user_id).isdigit()):
+            return []
+        results = []
+        for segment in self.segments():
+            results.extend(segment.find(int(guild_id), int(user_id), transaction_type, since, until, before, limit))
+        results.sort(key=lambda r: (r["ts"], r["id"]), reverse=True)
+        return results[:limit]
+
+    def stats(self) -> dict:
+        segments = self.segments()
+        return {
+            "segments": len(segments),
+            "records": sum(s.count for s in segments),
+            "bytes": sum(s.size for s in segments),
+        }
+
+    def close(self):
+        with self._lock:
+            segments, self._segments = self._segments, {}
+        for segment in segments.values():
+            segment.close()
@@ -0,0 +1,74 @@
+"""
+✿ 幽幽子的關鍵字網 ✿
+Aho-Corasick 多模式比對：一次掃過訊息就找出「優先順序最高」的觸發詞。
+
+觸發詞依加入順序決定優先順序 (越早加入越優先)，與逐一 `keyword in text` 並在第一個命中時停止的結果相同；
+每則訊息的比對成本只與訊息長度相關，不會隨彩蛋數量增加。
+"""
+
+_NONE = float("inf")
+
+
+class TriggerMatcher:
+    """建立後不再修改；重新載入設定時整個替換即可 (讀取端不需要加鎖)"""
+
+    __slots__ = ("_goto", "_fail", "_best", "_payloads", "pattern_count")
+
+    def __init__(self, patterns):
+        """patterns: 依優先順序排列的 (觸發詞, 附帶資料)；同一個觸發詞只保留最先出現的一筆"""
+        goto = [{}]
+        best = [_NONE]
+        payloads = []
+        seen = set()
+        for pattern, payload in patterns:
+            if pattern in seen:
+                continue
+            seen.add(pattern)
+            priority = len(payloads)
+            payloads.append(payload)
+            node = 0
+            for ch in pattern:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    best.append(_NONE)
+                node = nxt
+            best[node] = min(best[node], priority)
+
+        # 以 BFS 建立失敗連結，並把後綴上可命中的最佳優先順序合併到每個節點
+        fail = [0] * len(goto)
+        queue = []
+        for nxt in goto[0].values():
+            best[nxt] = min(best[nxt], best[0])
+            queue.append(nxt)
+        for node in queue:
+            for ch, nxt in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                best[nxt] = min(best[nxt], best[fail[nxt]])
+                queue.append(nxt)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+        self._payloads = payloads
+        self.pattern_count = len(payloads)
+
+    def find(self, text: str):
+        """回傳 text 中優先順序最高的觸發詞的附帶資料，沒有命中時回傳 None"""
+        goto, fail, best = self._goto, self._fail, self._best
+        found = best[0]
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if best[node] < found:
+                found = best[node]
+                if found == 0:
+                    break
+        return None if found is _NONE else self._payloads[found]